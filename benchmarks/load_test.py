@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Prueba de carga end-to-end de full_reprocess contra el simulador local
+Levanta src/propreports_simulator.py en un puerto libre, apunta el exportador
+a él y ejecuta full_reprocess en un directorio temporal. Reporta peticiones/s,
+días/s, reintentos y re-logins, y verifica que todos los trades llegaron.
+
+Uso:
+    python benchmarks/load_test.py --days 90 --latency 0.05 --error-rate 0.05 --session-requests 20
+    python benchmarks/load_test.py --throttle-rate 10 --max-concurrent 4 --output resultados.json
+"""
+
+import os
+import io
+import sys
+import json
+import glob
+import time
+import argparse
+import tempfile
+from contextlib import redirect_stdout
+from datetime import datetime, timedelta
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT_DIR, 'src'))
+
+from propreports_simulator import PropReportsSimulator
+
+USERNAME = 'LOADTEST01'
+PASSWORD = 'loadtest'
+
+
+def count_exported(exports_dir):
+    """Días y trades escritos por el exportador"""
+    days = 0
+    trades = 0
+    for path in glob.glob(os.path.join(exports_dir, 'daily', '*.json')):
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        days += 1
+        trades += len(data.get('trades', []))
+    return days, trades
+
+
+def expected_trades(simulator, days_back):
+    """Trades que el simulador sirve para el período de full_reprocess"""
+    end = datetime.now()
+    current = end - timedelta(days=days_back)
+    total = 0
+    while current.date() <= end.date():
+        if current.weekday() < 5:
+            total += simulator.trades_per_day
+        current += timedelta(days=1)
+    return total
+
+
+def run_load_test(args):
+    simulator = PropReportsSimulator(
+        username=USERNAME, password=PASSWORD,
+        trades_per_day=args.trades_per_day, seed=args.seed,
+        latency=args.latency, latency_per_day=args.latency_per_day,
+        error_rate=args.error_rate, throttle_rate=args.throttle_rate,
+        max_concurrent=args.max_concurrent, retry_after=args.retry_after,
+        session_ttl=args.session_ttl, session_requests=args.session_requests,
+        max_rows=args.max_rows
+    )
+    base_url = simulator.start()
+
+    with tempfile.TemporaryDirectory(prefix='propreports-load-') as workdir:
+        previous_cwd = os.getcwd()
+        os.chdir(workdir)
+        # Configuración antes de importar: el limiter compartido lee el entorno una sola vez
+        os.environ.update({
+            'PROPREPORTS_DOMAIN': base_url,
+            'PROPREPORTS_USER': USERNAME,
+            'PROPREPORTS_PASS': PASSWORD,
+            'EXPORT_OUTPUT_DIR': os.path.join(workdir, 'exports'),
+        })
+        if args.max_inflight:
+            os.environ['PROPREPORTS_MAX_INFLIGHT'] = str(args.max_inflight)
+        if args.rate_limit:
+            os.environ['PROPREPORTS_RATE_LIMIT'] = str(args.rate_limit)
+        try:
+            from full_reprocess import full_reprocess
+
+            print(f"🧪 Simulador en {base_url}: {args.days} días, {args.trades_per_day} trades/día")
+            output = io.StringIO()
+            started = time.perf_counter()
+            if args.verbose:
+                full_reprocess(args.days)
+            else:
+                with redirect_stdout(output):
+                    full_reprocess(args.days)
+            elapsed = time.perf_counter() - started
+
+            days_written, trades_written = count_exported(os.environ['EXPORT_OUTPUT_DIR'])
+        finally:
+            os.chdir(previous_cwd)
+            simulator.stop()
+
+    stats = simulator.snapshot()
+    expected = expected_trades(simulator, args.days)
+    return {
+        'createdAt': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'config': {key: value for key, value in vars(args).items() if key not in ('output', 'verbose')},
+        'elapsedSeconds': round(elapsed, 3),
+        'requestsPerSecond': round(stats['requests'] / elapsed, 2) if elapsed else None,
+        'reportsPerSecond': round(stats['reports'] / elapsed, 2) if elapsed else None,
+        'daysPerSecond': round(days_written / elapsed, 2) if elapsed else None,
+        'daysWritten': days_written,
+        'tradesWritten': trades_written,
+        'tradesExpected': expected,
+        'complete': trades_written == expected,
+        'server': stats
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Prueba de carga de full_reprocess contra el simulador')
+    parser.add_argument('--days', type=int, default=60, help='Días a reprocesar')
+    parser.add_argument('--trades-per-day', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--latency', type=float, default=0.05)
+    parser.add_argument('--latency-per-day', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--throttle-rate', type=float, default=0.0)
+    parser.add_argument('--max-concurrent', type=int, default=0)
+    parser.add_argument('--retry-after', type=int, default=1)
+    parser.add_argument('--session-ttl', type=float, default=0.0)
+    parser.add_argument('--session-requests', type=int, default=0)
+    parser.add_argument('--max-rows', type=int, default=0)
+    parser.add_argument('--max-inflight', type=int, help='PROPREPORTS_MAX_INFLIGHT del cliente')
+    parser.add_argument('--rate-limit', type=float, help='PROPREPORTS_RATE_LIMIT del cliente')
+    parser.add_argument('--output', help='Guardar el resultado en JSON')
+    parser.add_argument('--verbose', action='store_true', help='Mostrar la salida de full_reprocess')
+    args = parser.parse_args(argv)
+
+    result = run_load_test(args)
+    server = result['server']
+    print(f"\n⏱️  {result['elapsedSeconds']:.2f}s | {result['requestsPerSecond']} req/s | "
+          f"{result['daysPerSecond']} días/s")
+    print(f"📡 Reportes: {server['reports']} | Logins: {server['logins']} | 429: {server['throttled']} | "
+          f"503: {server['overloaded']} | 500: {server['errors']} | Sesiones expiradas: {server['expiredSessions']} | "
+          f"Concurrencia máx.: {server['maxInFlight']}")
+    status = "✅" if result['complete'] else "❌"
+    print(f"{status} Trades escritos: {result['tradesWritten']} de {result['tradesExpected']} "
+          f"({result['daysWritten']} archivos diarios)")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2)
+        print(f"💾 Resultado guardado en {args.output}")
+    return 0 if result['complete'] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
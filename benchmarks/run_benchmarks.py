@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+Suite de benchmarks de PropReports Auto-Exporter
+Mide el parser y los generadores sobre datos sintéticos deterministas
+(ver src/synthetic_data.py) a distintos tamaños y guarda los resultados
+en JSON para comparar versiones.
+
+Uso:
+    python benchmarks/run_benchmarks.py                       # 1k, 100k y 1M trades
+    python benchmarks/run_benchmarks.py --sizes 1k,100k --repeat 5
+    python benchmarks/run_benchmarks.py --compare benchmarks/results/anterior.json
+"""
+
+import os
+import io
+import sys
+import json
+import math
+import time
+import platform
+import argparse
+import statistics
+import subprocess
+import tempfile
+from contextlib import redirect_stdout
+from datetime import datetime
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC_DIR = os.path.join(ROOT_DIR, 'src')
+sys.path.insert(0, SRC_DIR)
+
+from synthetic_data import generate_trades, render_report_html, daily_file_data, SYNTHETIC_ACCOUNT
+
+RESULTS_DIR = os.path.join(ROOT_DIR, 'benchmarks', 'results')
+YEAR = 2024
+TRADING_DAYS = 252
+
+
+def parse_size(text):
+    """'1k' -> 1000, '1M' -> 1000000"""
+    text = text.strip()
+    multiplier = {'k': 1000, 'K': 1000, 'm': 1000000, 'M': 1000000}.get(text[-1])
+    return int(float(text[:-1]) * multiplier) if multiplier else int(text)
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT_DIR,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except Exception:
+        return 'unknown'
+
+
+def measure(func, repeat):
+    """Ejecuta func `repeat` veces con la salida silenciada y devuelve los tiempos"""
+    samples = []
+    for _ in range(repeat):
+        with redirect_stdout(io.StringIO()):
+            started = time.perf_counter()
+            func()
+            samples.append(time.perf_counter() - started)
+    return samples
+
+
+class Dataset:
+    """Un año sintético de trades escrito como árbol exports/ en workdir"""
+
+    def __init__(self, workdir, trades, seed):
+        self.workdir = workdir
+        self.trades_per_day = max(1, math.ceil(trades / TRADING_DAYS))
+        self.trades_by_day = generate_trades(f"{YEAR}-01-02", TRADING_DAYS, self.trades_per_day, seed=seed)
+        self.total = sum(len(day) for day in self.trades_by_day.values())
+
+        daily_dir = os.path.join(workdir, 'exports', 'daily')
+        os.makedirs(daily_dir, exist_ok=True)
+        for date_str, day_trades in self.trades_by_day.items():
+            with open(os.path.join(daily_dir, f"{date_str}.json"), 'w', encoding='utf-8') as f:
+                json.dump(daily_file_data(date_str, day_trades), f, indent=2, ensure_ascii=False)
+
+    def all_trades(self):
+        return [trade for day in self.trades_by_day.values() for trade in day]
+
+
+def benchmark_parse_number(dataset, exporter_cls):
+    exporter = exporter_cls('localhost', SYNTHETIC_ACCOUNT, '')
+    samples = []
+    for trade in dataset.all_trades():
+        samples.extend((f"{trade['entry']:.2f}", f"({abs(trade['pnl']):,.2f})", f"${trade['net']:,.2f}"))
+    parse = exporter._parse_number
+    return lambda: [parse(text) for text in samples], len(samples)
+
+
+def benchmark_parse_trades_html(dataset, exporter_cls):
+    exporter = exporter_cls('localhost', SYNTHETIC_ACCOUNT, '')
+    html = render_report_html(dataset.trades_by_day)
+    return lambda: exporter.parse_trades_html(html), dataset.total
+
+
+def benchmark_export_to_json(dataset, exporter_cls):
+    exporter = exporter_cls('localhost', SYNTHETIC_ACCOUNT, '')
+    trades = dataset.all_trades()
+    output_dir = os.path.join(dataset.workdir, 'bench-export')
+
+    def run():
+        filename = exporter.export_to_json(trades, output_dir)
+        os.remove(filename)
+    return run, dataset.total
+
+
+def benchmark_weekly_summaries(dataset, _):
+    from weekly_summary import generate_weekly_summary
+    mondays = sorted({d for d in dataset.trades_by_day if datetime.strptime(d, '%Y-%m-%d').weekday() == 0})
+    return lambda: [generate_weekly_summary(day, force=True) for day in mondays], dataset.total
+
+
+def benchmark_monthly_summaries(dataset, _):
+    from monthly_summary import generate_monthly_summary
+    return lambda: [generate_monthly_summary(YEAR, month, force=True) for month in range(1, 13)], dataset.total
+
+
+def benchmark_enhanced_metrics(dataset, _):
+    from generate_dashboard_data import get_year_data, calculate_enhanced_metrics
+    return lambda: calculate_enhanced_metrics(get_year_data(YEAR)), dataset.total
+
+
+def benchmark_calendar(dataset, _):
+    from generate_calendar import build_calendar
+    return lambda: build_calendar(YEAR, force=True, update_readme=False), dataset.total
+
+
+# (nombre, función, necesita PropReportsExporter); el orden importa: monthly lee los semanales
+BENCHMARKS = [
+    ('parse_number', benchmark_parse_number, True),
+    ('parse_trades_html', benchmark_parse_trades_html, True),
+    ('export_to_json', benchmark_export_to_json, True),
+    ('weekly_summary', benchmark_weekly_summaries, False),
+    ('monthly_summary', benchmark_monthly_summaries, False),
+    ('calculate_enhanced_metrics', benchmark_enhanced_metrics, False),
+    ('calendar', benchmark_calendar, False),
+]
+
+
+def run_size(label, trades, args, selected):
+    """Genera el dataset de un tamaño y ejecuta los benchmarks seleccionados"""
+    results = []
+    try:
+        from propreports_exporter import PropReportsExporter
+    except ImportError as e:
+        PropReportsExporter = None
+        print(f"⚠️  Benchmarks del exportador omitidos ({e})")
+
+    with tempfile.TemporaryDirectory(prefix='propreports-bench-') as workdir:
+        previous_cwd = os.getcwd()
+        os.chdir(workdir)
+        try:
+            started = time.perf_counter()
+            dataset = Dataset(workdir, trades, args.seed)
+            print(f"\n📦 {label}: {dataset.total:,} trades "
+                  f"({dataset.trades_per_day}/día) generados en {time.perf_counter() - started:.1f}s")
+
+            for name, factory, needs_exporter in BENCHMARKS:
+                if name not in selected:
+                    continue
+                if needs_exporter and PropReportsExporter is None:
+                    continue
+                func, items = factory(dataset, PropReportsExporter)
+                samples = measure(func, args.repeat)
+                result = {
+                    'benchmark': name,
+                    'size': label,
+                    'trades': dataset.total,
+                    'items': items,
+                    'repeat': args.repeat,
+                    'min': round(min(samples), 6),
+                    'median': round(statistics.median(samples), 6),
+                    'mean': round(statistics.mean(samples), 6),
+                    'itemsPerSecond': round(items / min(samples), 1) if min(samples) > 0 else None
+                }
+                results.append(result)
+                print(f"  {name:<28} {result['min']:>10.4f}s  {result['itemsPerSecond'] or 0:>14,.0f} items/s")
+        finally:
+            os.chdir(previous_cwd)
+    return results
+
+
+def compare(current, baseline_path):
+    """Imprime la variación respecto a un archivo de resultados anterior"""
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    previous = {(r['benchmark'], r['size']): r for r in baseline.get('results', [])}
+
+    print(f"\n📈 Comparación con {baseline.get('commit', '?')} ({os.path.basename(baseline_path)})")
+    print(f"  {'Benchmark':<28} {'Tamaño':>7} {'Antes':>10} {'Ahora':>10} {'Cambio':>8}")
+    for result in current:
+        old = previous.get((result['benchmark'], result['size']))
+        if not old:
+            continue
+        ratio = old['min'] / result['min'] if result['min'] else float('inf')
+        print(f"  {result['benchmark']:<28} {result['size']:>7} {old['min']:>10.4f} {result['min']:>10.4f} {ratio:>7.2f}x")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmarks de PropReports Auto-Exporter')
+    parser.add_argument('--sizes', default='1k,100k,1M', help='Tamaños en trades separados por coma')
+    parser.add_argument('--repeat', type=int, default=3, help='Repeticiones por benchmark (se reporta el mínimo)')
+    parser.add_argument('--only', help='Benchmarks a ejecutar separados por coma')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='Archivo JSON de resultados (por defecto benchmarks/results/)')
+    parser.add_argument('--compare', help='Resultados anteriores contra los que comparar')
+    args = parser.parse_args(argv)
+
+    names = [name for name, _, _ in BENCHMARKS]
+    selected = set(args.only.split(',')) if args.only else set(names)
+    unknown = selected - set(names)
+    if unknown:
+        parser.error(f"benchmarks desconocidos: {', '.join(sorted(unknown))} (disponibles: {', '.join(names)})")
+
+    # Los generadores leen la ruta de exports al importarse: relativa al workdir de cada tamaño
+    os.environ['EXPORT_OUTPUT_DIR'] = 'exports'
+
+    results = []
+    for label in args.sizes.split(','):
+        results.extend(run_size(label.strip(), parse_size(label), args, selected))
+
+    commit = git_commit()
+    report = {
+        'createdAt': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'commit': commit,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'seed': args.seed,
+        'results': results
+    }
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{commit}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"\n💾 Resultados guardados en {output}")
+
+    if args.compare:
+        compare(results, args.compare)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
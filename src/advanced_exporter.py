@@ -5,19 +5,37 @@ Permite exportar y re-exportar múltiples días
 """
 
 import os
-import json
 from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
 from propreports_exporter import PropReportsExporter
 from daily_exporter import obfuscate_account
+from checkpoint import RunJournal, account_key
+from fetch_strategy import ChunkedFetcher, split_into_chunks
+from trade_index import TradeIndex
+from trade_cube import TradeCube
+from trade_log import TradeLog
+from tracing import traced, finish_run
+from metrics import enable_metrics, write_textfile
+from stable_output import write_json
+from daily_store import daily_exists
 
-def export_date_range(start_date, end_date, force_update=False):
+@traced('export.range')
+def export_date_range(start_date, end_date, force_update=False, journal=None):
     """
     Exporta un rango de fechas, con opción de forzar actualización
     
+    Los días pendientes se piden a report.php en bloques de varios días que
+    se dividen automáticamente si la petición falla por tamaño. Los bloques se
+    descargan en paralelo (PROPREPORTS_MAX_INFLIGHT workers) a través del
+    limiter compartido; la escritura de archivos se hace en orden de fecha.
+    
     Args:
         start_date: Fecha inicial (datetime o string YYYY-MM-DD)
         end_date: Fecha final (datetime o string YYYY-MM-DD)
         force_update: Si True, sobrescribe archivos existentes
+        journal: RunJournal opcional; los días ya completados se saltan
+                 y cada día procesado se registra al terminar (si falla el
+                 login, todos los días pendientes quedan como fallidos)
     """
     # Configuración
     DOMAIN = os.getenv('PROPREPORTS_DOMAIN', 'zim.propreports.com')
@@ -30,108 +48,185 @@ def export_date_range(start_date, end_date, force_update=False):
     if isinstance(end_date, str):
         end_date = datetime.strptime(end_date, '%Y-%m-%d')
     
-    # Crear exportador
-    exporter = PropReportsExporter(DOMAIN, USERNAME, PASSWORD)
+    # Nueva estructura simplificada
+    base_dir = os.getenv('EXPORT_OUTPUT_DIR', 'exports')
+    daily_dir = os.path.join(base_dir, "daily")
     
-    # Login
-    if not exporter.login():
-        print("❌ Error en login")
-        return []
+    # Asegurar que el directorio existe
+    os.makedirs(daily_dir, exist_ok=True)
     
-    exported_files = []
+    # Determinar los días pendientes
+    pending_dates = []
     current_date = start_date
+    # Los días que fallaron tienen un archivo vacío provisorio: se reintentan igual
+    failed_days = set(journal.failed_days()) if journal else set()
     
     while current_date <= end_date:
         date_str = current_date.strftime('%Y-%m-%d')
+        current_date += timedelta(days=1)
         
-        # Nueva estructura simplificada
-        base_dir = os.getenv('EXPORT_OUTPUT_DIR', 'exports')
-        daily_dir = os.path.join(base_dir, "daily")
-        
-        # Asegurar que el directorio existe
-        os.makedirs(daily_dir, exist_ok=True)
-        
-        filename = os.path.join(daily_dir, f"{date_str}.json")
+        # Saltar días ya completados en una ejecución anterior (--resume)
+        if journal and journal.is_day_done(date_str):
+            print(f"⏭️  {date_str}: Ya completado según el journal")
+            continue
         
-        if os.path.exists(filename) and not force_update:
+        if daily_exists(date_str, base_dir) and not force_update and date_str not in failed_days:
             print(f"⏭️  {date_str}: Archivo ya existe (usar force_update=True para sobrescribir)")
-            current_date += timedelta(days=1)
             continue
         
-        print(f"\n📅 Procesando {date_str}...")
-        
-        # Obtener trades del día
-        html_content = exporter.get_trades_page(date_str, date_str)
-        if html_content:
-            trades = exporter.parse_trades_html(html_content)
-            
-            # Filtrar solo trades de ese día
-            day_trades = [t for t in trades if t.get('date') == date_str]
-            
-            # Preparar datos
-            daily_data = {
-                'exportDate': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                'account': obfuscate_account(USERNAME),
-                'date': date_str,
-                'trades': day_trades,
-                'summary': {
-                    'totalTrades': len(day_trades),
-                    'totalPnL': round(sum(t.get('pnl', 0) for t in day_trades), 2),
-                    'totalCommissions': round(sum(t.get('commission', 0) for t in day_trades), 2),
-                    'netPnL': round(sum(t.get('net', 0) if t.get('net', 0) != 0 else (t.get('pnl', 0) - t.get('commission', 0)) for t in day_trades), 2),
-                    'winningTrades': len([t for t in day_trades if t.get('pnl', 0) > 0]),
-                    'losingTrades': len([t for t in day_trades if t.get('pnl', 0) < 0]),
-                    'symbols': list(set(t.get('symbol', '') for t in day_trades if t.get('symbol')))
-                },
-                'metadata': {
-                    'reprocessed': os.path.exists(filename),
-                    'processedAt': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                }
-            }
-            
-            # Guardar
-            with open(filename, 'w', encoding='utf-8') as f:
-                json.dump(daily_data, f, indent=2, ensure_ascii=False)
-            
-            action = "♻️  Actualizado" if daily_data['metadata']['reprocessed'] else "✅ Creado"
-            print(f"  {action}: {len(day_trades)} trades, P&L: ${daily_data['summary']['netPnL']}")
-            exported_files.append(filename)
-        else:
-            # Si no hay trades, crear archivo vacío
-            print(f"  ⚠️  No se encontraron trades para {date_str}")
-            
-            # Crear archivo vacío solo si no existe
-            if not os.path.exists(filename):
-                empty_data = {
-                    'exportDate': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                    'account': obfuscate_account(USERNAME),
-                    'date': date_str,
-                    'trades': [],
-                    'summary': {
-                        'totalTrades': 0,
-                        'totalPnL': 0,
-                        'totalCommissions': 0,
-                        'netPnL': 0,
-                        'winningTrades': 0,
-                        'losingTrades': 0,
-                        'symbols': []
-                    },
-                    'metadata': {
-                        'reprocessed': False,
-                        'processedAt': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                        'note': 'No trades found for this date'
-                    }
-                }
-                
-                with open(filename, 'w', encoding='utf-8') as f:
-                    json.dump(empty_data, f, indent=2, ensure_ascii=False)
-                
-                exported_files.append(filename)
-        
-        current_date += timedelta(days=1)
+        pending_dates.append(date_str)
     
+    if not pending_dates:
+        return []
+    
+    # Crear exportador
+    exporter = PropReportsExporter(DOMAIN, USERNAME, PASSWORD)
+    
+    # Login: sin sesión ningún día pendiente se exportó, el journal los deja para --resume
+    if not exporter.login():
+        print("❌ Error en login")
+        if journal:
+            for date_str in pending_dates:
+                journal.mark_day(date_str, 'failed', error='login')
+        return []
+    
+    # Descargar en bloques de días consecutivos (tamaño aprendido por cuenta)
+    fetcher = ChunkedFetcher(exporter)
+    index = TradeIndex()
+    cube = TradeCube.load()
+    trade_log = TradeLog.load()
+    chunks = split_into_chunks(pending_dates, fetcher.chunk_days)
+    print(f"📦 {len(pending_dates)} días en {len(chunks)} bloques de hasta {fetcher.chunk_days} días")
+    
+    exported_files = []
+    workers = min(exporter.limiter.max_in_flight, len(chunks))
+    
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        # map conserva el orden de fechas aunque las descargas terminen desordenadas
+        for chunk, (trades_by_date, failed_dates) in zip(chunks, pool.map(fetcher.fetch_chunk, chunks)):
+            for date_str in chunk:
+                exported = _save_fetched_day(daily_dir, date_str, trades_by_date.get(date_str),
+                                             date_str in failed_dates, USERNAME, journal, index, cube, trade_log)
+                if exported:
+                    exported_files.append(exported)
+    
+    fetcher.save()
+    index.save()
+    cube.save()
+    trade_log.save()
     return exported_files
 
+def _save_fetched_day(daily_dir, date_str, day_trades, failed, username, journal, index=None, cube=None,
+                      trade_log=None):
+    """Guarda el resultado descargado de un día y lo registra en el journal"""
+    filename = os.path.join(daily_dir, f"{date_str}.json")
+    print(f"\n📅 Procesando {date_str}...")
+    
+    if not failed:
+        saved = write_daily_file(filename, date_str, day_trades, username, index, cube, trade_log)
+        
+        if journal:
+            journal.mark_day(date_str, 'done', trades=len(day_trades))
+        return saved
+    
+    exported = None
+    # Si no hay trades, crear archivo vacío
+    print(f"  ⚠️  No se encontraron trades para {date_str}")
+    
+    # Crear archivo vacío solo si no existe (tampoco en el archivo del mes)
+    if not daily_exists(date_str, os.path.dirname(daily_dir)):
+        exported = write_empty_daily_file(filename, date_str, username)
+        if cube is not None:
+            cube.replace_day(date_str, [], filename)
+        if trade_log is not None:
+            trade_log.replace_day(date_str, [], filename)
+    
+    # El día queda pendiente para reintentarlo con --resume
+    if journal:
+        journal.mark_day(date_str, 'failed', error='No se pudo obtener el reporte')
+    return exported
+
+def write_daily_file(filename, date_str, trades, username, index=None, cube=None, trade_log=None):
+    """
+    Guarda el archivo diario con los trades de esa fecha
+    
+    Con un TradeIndex, el archivo solo se reescribe si el conjunto de trades
+    del día cambió respecto a lo ya exportado; devuelve None si no hubo cambios.
+    Con un TradeCube, las celdas del día se recalculan al escribir; con un
+    TradeLog, el día se agrega al log de trades (tombstone + reemplazo).
+    """
+    # Filtrar solo trades de ese día
+    day_trades = [t for t in trades if t.get('date') == date_str]
+    
+    if index is not None:
+        index.seed_from_file(date_str, filename)
+        diff = index.diff_day(date_str, day_trades)
+        if not diff['changed'] and daily_exists(date_str, os.path.dirname(os.path.dirname(filename))):
+            print(f"  ⏸️  Sin cambios: {len(day_trades)} trades")
+            return None
+        if diff['known']:
+            print(f"  🔀 {len(diff['added'])} trades nuevos, {len(diff['removed'])} eliminados")
+        index.upsert_day(date_str, day_trades)
+    
+    # Preparar datos
+    daily_data = {
+        'exportDate': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'account': obfuscate_account(username),
+        'date': date_str,
+        'trades': day_trades,
+        'summary': {
+            'totalTrades': len(day_trades),
+            'totalPnL': round(sum(t.get('pnl', 0) for t in day_trades), 2),
+            'totalCommissions': round(sum(t.get('commission', 0) for t in day_trades), 2),
+            'netPnL': round(sum(t.get('net', 0) if t.get('net', 0) != 0 else (t.get('pnl', 0) - t.get('commission', 0)) for t in day_trades), 2),
+            'winningTrades': len([t for t in day_trades if t.get('pnl', 0) > 0]),
+            'losingTrades': len([t for t in day_trades if t.get('pnl', 0) < 0]),
+            'symbols': sorted(set(t.get('symbol', '') for t in day_trades if t.get('symbol')))
+        },
+        'metadata': {
+            'reprocessed': os.path.exists(filename),
+            'processedAt': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        }
+    }
+    
+    # Guardar
+    write_json(filename, daily_data)
+    if cube is not None:
+        cube.replace_day(date_str, day_trades, filename)
+    if trade_log is not None:
+        trade_log.replace_day(date_str, day_trades, filename)
+    
+    action = "♻️  Actualizado" if daily_data['metadata']['reprocessed'] else "✅ Creado"
+    print(f"  {action}: {len(day_trades)} trades, P&L: ${daily_data['summary']['netPnL']}")
+    return filename
+
+def write_empty_daily_file(filename, date_str, username):
+    """Guarda un archivo diario vacío para mantener el registro del día"""
+    empty_data = {
+        'exportDate': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'account': obfuscate_account(username),
+        'date': date_str,
+        'trades': [],
+        'summary': {
+            'totalTrades': 0,
+            'totalPnL': 0,
+            'totalCommissions': 0,
+            'netPnL': 0,
+            'winningTrades': 0,
+            'losingTrades': 0,
+            'symbols': []
+        },
+        'metadata': {
+            'reprocessed': False,
+            'processedAt': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'note': 'No trades found for this date'
+        }
+    }
+    
+    write_json(filename, empty_data)
+    
+    return filename
+
 def reprocess_recent_days(days_back=3, force=True):
     """
     Reprocesa los últimos N días (útil para trades que aparecen con delay)
@@ -148,9 +243,35 @@ def reprocess_recent_days(days_back=3, force=True):
     
     return export_date_range(start_date, end_date, force_update=force)
 
+def export_range_resumable(start_date, end_date, force_update=False, resume=False):
+    """
+    Exporta un rango registrando el progreso en un journal
+    
+    Con resume=True continúa la última ejecución incompleta del mismo rango:
+    salta los días ya completados y reintenta solo los que fallaron.
+    """
+    username = os.getenv('PROPREPORTS_USER', 'ZIMDASE9C64')
+    run_key = f"range_{account_key(username)}_{start_date}_{end_date}"
+    journal = RunJournal(run_key, resume=resume, params={'start': start_date, 'end': end_date})
+    
+    if journal.resumed:
+        failed = journal.failed_days()
+        print(f"♻️  Reanudando ejecución anterior ({len(journal.data['days'])} días registrados, {len(failed)} fallidos)")
+    
+    exported_files = export_date_range(start_date, end_date, force_update=force_update, journal=journal)
+    
+    if not journal.finish():
+        print(f"⚠️  Días con error: {', '.join(journal.failed_days())} (usar --resume para reintentar)")
+    
+    return exported_files
+
 if __name__ == "__main__":
     import sys
     
+    enable_metrics()
+    resume = '--resume' in sys.argv
+    sys.argv = [arg for arg in sys.argv if arg != '--resume']
+    
     if len(sys.argv) > 1:
         if sys.argv[1] == "reprocess":
             # Reprocesar últimos días
@@ -162,11 +283,14 @@ if __name__ == "__main__":
                 start = sys.argv[2]
                 end = sys.argv[3]
                 force = len(sys.argv) > 4 and sys.argv[4] == "force"
-                export_date_range(start, end, force_update=force)
+                export_range_resumable(start, end, force_update=force, resume=resume)
             else:
-                print("Uso: python advanced_exporter.py range YYYY-MM-DD YYYY-MM-DD [force]")
+                print("Uso: python advanced_exporter.py range YYYY-MM-DD YYYY-MM-DD [force] [--resume]")
     else:
         # Por defecto, exportar hoy y reprocesar últimos 2 días
         print("🚀 Exportación con reprocesamiento automático")
         export_date_range(datetime.now(), datetime.now())  # Hoy
-        reprocess_recent_days(2, force=True)  # Últimos 2 días
\ No newline at end of file
+        reprocess_recent_days(2, force=True)  # Últimos 2 días
+    
+    finish_run('advanced_exporter')
+    write_textfile(run='advanced_exporter')
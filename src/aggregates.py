@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""
+Agregados incrementales diarios, semanales y mensuales
+Mantiene totales por día, semana ISO y mes que se actualizan en O(trades nuevos)
+en lugar de recalcular los resúmenes a partir de todos los archivos diarios.
+Los resúmenes semanales y mensuales toman sus totales de acá.
+
+Cada día guarda el origen (hash del contenido) de su archivo diario y sync()
+alinea los agregados con exports/daily como el cubo (daily_store.sync_days).
+Semana y mes se recalculan sumando sus días (a lo sumo 31), así que no
+acumulan error de redondeo por sumas y restas sucesivas.
+
+Persistencia: exports/.state/aggregates.json es una foto completa y
+aggregates.journal.jsonl recibe, en cada save(), una línea por día cambiado
+con su bucket nuevo (O(días cambiados), no O(historial)). Al cargar se
+reproduce el journal sobre la foto; save(checkpoint=True), o un journal de
+más de PROPREPORTS_AGGREGATES_CHECKPOINT líneas (por defecto 500), reescribe
+la foto y vacía el journal.
+"""
+
+import os
+import json
+import heapq
+from datetime import datetime, timedelta
+from state_store import load_state, save_state, state_path
+from daily_store import sync_days
+
+AGGREGATES_STATE_FILE = "aggregates.json"
+AGGREGATES_JOURNAL_FILE = "aggregates.journal.jsonl"
+AGGREGATES_VERSION = 2
+CHECKPOINT_LINES = int(os.getenv('PROPREPORTS_AGGREGATES_CHECKPOINT', '500'))
+
+SUM_FIELDS = ('trades', 'grossPnL', 'commissions', 'netPnL', 'winningTrades', 'losingTrades', 'winPnL', 'lossPnL')
+
+
+def trade_net(trade):
+    """P&L neto del trade (mismo criterio que los archivos diarios)"""
+    net = trade.get('net', 0)
+    return net if net != 0 else trade.get('pnl', 0) - trade.get('commission', 0)
+
+
+def empty_bucket():
+    bucket = {field: 0 for field in SUM_FIELDS}
+    bucket['symbols'] = {}
+    return bucket
+
+
+def fold_trade(bucket, trade, sign=1):
+    """Suma (sign=1) o resta (sign=-1) un trade en un bucket"""
+    pnl = trade.get('pnl', 0)
+    bucket['trades'] += sign
+    bucket['grossPnL'] += sign * pnl
+    bucket['commissions'] += sign * trade.get('commission', 0)
+    bucket['netPnL'] += sign * trade_net(trade)
+    if pnl > 0:
+        bucket['winningTrades'] += sign
+        bucket['winPnL'] += sign * pnl
+    elif pnl < 0:
+        bucket['losingTrades'] += sign
+        bucket['lossPnL'] += sign * pnl
+
+    symbol = trade.get('symbol')
+    if symbol:
+        count = bucket['symbols'].get(symbol, 0) + sign
+        if count > 0:
+            bucket['symbols'][symbol] = count
+        else:
+            bucket['symbols'].pop(symbol, None)
+    return bucket
+
+
+def merge_bucket(target, source, sign=1):
+    """Suma (o resta) un bucket completo sobre otro"""
+    for field in SUM_FIELDS:
+        target[field] += sign * source[field]
+    for symbol, count in source['symbols'].items():
+        total = target['symbols'].get(symbol, 0) + sign * count
+        if total > 0:
+            target['symbols'][symbol] = total
+        else:
+            target['symbols'].pop(symbol, None)
+    return target
+
+
+def period_keys(date_str):
+    """Claves de semana ISO (YYYY-WXX) y mes (YYYY-MM) de una fecha"""
+    date = datetime.strptime(date_str, '%Y-%m-%d')
+    iso_year, iso_week, _ = date.isocalendar()
+    return f"{iso_year}-W{iso_week:02d}", date_str[:7]
+
+
+def period_dates(key):
+    """Fechas YYYY-MM-DD de una semana ISO (YYYY-WXX) o un mes (YYYY-MM)"""
+    if '-W' in key:
+        start = datetime.strptime(f"{key}-1", '%G-W%V-%u')
+        days = 7
+    else:
+        start = datetime.strptime(f"{key}-01", '%Y-%m-%d')
+        days = 31
+    dates = [(start + timedelta(days=i)).strftime('%Y-%m-%d') for i in range(days)]
+    return [d for d in dates if '-W' in key or d.startswith(key)]
+
+
+def bucket_summary(bucket):
+    """Convierte un bucket al formato 'summary' de los archivos diarios"""
+    return {
+        'totalTrades': bucket['trades'],
+        'totalPnL': round(bucket['grossPnL'], 2),
+        'totalCommissions': round(bucket['commissions'], 2),
+        'netPnL': round(bucket['netPnL'], 2),
+        'winningTrades': bucket['winningTrades'],
+        'losingTrades': bucket['losingTrades'],
+        'symbols': sorted(bucket['symbols'])
+    }
+
+
+class TopN:
+    """
+    Los N mayores elementos según una clave, en memoria O(N)
+
+    Equivale a sorted(items, key=key, reverse=True)[:n] (mismo orden en empates)
+    sin guardar todos los elementos; para los N menores usar una clave negada.
+    """
+
+    def __init__(self, n, key):
+        self.n = n
+        self.key = key
+        self.heap = []
+        self.seq = 0
+
+    def push(self, item):
+        # -seq: en empates gana el elemento visto primero, como en un sort estable
+        entry = (self.key(item), -self.seq, item)
+        self.seq += 1
+        if len(self.heap) < self.n:
+            heapq.heappush(self.heap, entry)
+        elif entry[:2] > self.heap[0][:2]:
+            heapq.heapreplace(self.heap, entry)
+
+    def items(self):
+        return [entry[2] for entry in sorted(self.heap, key=lambda e: e[:2], reverse=True)]
+
+
+class RunningAggregates:
+    """Agregados persistentes por día, semana y mes (foto + journal de días cambiados)"""
+
+    def __init__(self):
+        state = load_state(AGGREGATES_STATE_FILE, {})
+        if state.get('version') != AGGREGATES_VERSION:
+            # Formato viejo: sync() reconstruye los días desde los archivos diarios
+            state = {}
+        self.daily = state.get('daily', {})
+        self.weekly = state.get('weekly', {})
+        self.monthly = state.get('monthly', {})
+        self.changed = set()
+        self.journal_lines = 0
+        self._replay()
+
+    @property
+    def days(self):
+        # Interfaz de daily_store.sync_days: {fecha: {'source': ...}}
+        return self.daily
+
+    def day(self, date_str):
+        return self.daily.get(date_str)
+
+    def _replay(self):
+        """Aplica las líneas del journal (bucket completo de cada día cambiado) sobre la foto"""
+        try:
+            with open(state_path(AGGREGATES_JOURNAL_FILE), 'r', encoding='utf-8') as f:
+                lines = f.readlines()
+        except OSError:
+            return
+        for line in lines:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                break  # Línea a medio escribir
+            if record['bucket'] is None:
+                self.daily.pop(record['date'], None)
+            else:
+                self.daily[record['date']] = record['bucket']
+            self._refresh_periods(record['date'])
+            self.journal_lines += 1
+        # Lo reproducido ya está en el journal
+        self.changed.clear()
+
+    def _refresh_periods(self, date_str):
+        """Recalcula la semana y el mes de la fecha sumando sus días en orden"""
+        for key, periods in zip(period_keys(date_str), (self.weekly, self.monthly)):
+            bucket = empty_bucket()
+            for day_str in period_dates(key):
+                day = self.daily.get(day_str)
+                if day:
+                    merge_bucket(bucket, day)
+            if bucket['trades'] or key in periods:
+                periods[key] = bucket
+        self.changed.add(date_str)
+
+    def add_trades(self, date_str, trades, sign=1):
+        """Aplica trades nuevos (o eliminados con sign=-1) al día, semana y mes"""
+        day = self.daily.setdefault(date_str, empty_bucket())
+        for trade in trades:
+            fold_trade(day, trade, sign)
+        self._refresh_periods(date_str)
+        return day
+
+    def replace_day(self, date_str, trades, source=None):
+        """Recalcula un día completo (y su semana y mes); no hace nada si el origen no cambió"""
+        old_day = self.daily.get(date_str)
+        if source is not None and old_day and old_day.get('source') == source:
+            return old_day
+        new_day = empty_bucket()
+        for trade in trades:
+            fold_trade(new_day, trade)
+        new_day['source'] = source
+        self.daily[date_str] = new_day
+        self._refresh_periods(date_str)
+        return new_day
+
+    def remove_day(self, date_str):
+        if self.daily.pop(date_str, None) is not None:
+            self._refresh_periods(date_str)
+
+    def mark_source(self, date_str, source):
+        """Registra el origen del archivo diario que refleja el bucket actual del día"""
+        day = self.daily.get(date_str)
+        if day is not None and day.get('source') != source:
+            day['source'] = source
+            self.changed.add(date_str)
+
+    def sync(self, base_dir=None):
+        """Recalcula los días cuyo contenido (suelto o archivado) cambió o falta; devuelve cuántos"""
+        return sync_days(self, base_dir)
+
+    def save(self, checkpoint=False):
+        """Agrega al journal los días cambiados; con checkpoint (o journal largo) reescribe la foto"""
+        if not self.changed and not checkpoint:
+            return None
+        if checkpoint or self.journal_lines + len(self.changed) > CHECKPOINT_LINES:
+            # Claves ordenadas: la foto no cambia si no cambian los datos
+            path = save_state(AGGREGATES_STATE_FILE, {
+                'version': AGGREGATES_VERSION,
+                'daily': dict(sorted(self.daily.items())),
+                'weekly': dict(sorted(self.weekly.items())),
+                'monthly': dict(sorted(self.monthly.items()))
+            })
+            if os.path.exists(state_path(AGGREGATES_JOURNAL_FILE)):
+                os.remove(state_path(AGGREGATES_JOURNAL_FILE))
+            self.journal_lines = 0
+        else:
+            path = state_path(AGGREGATES_JOURNAL_FILE)
+            with open(path, 'a', encoding='utf-8') as f:
+                for date_str in sorted(self.changed):
+                    record = {'date': date_str, 'bucket': self.daily.get(date_str)}
+                    f.write(json.dumps(record, separators=(',', ':'), ensure_ascii=False) + '\n')
+                    self.journal_lines += 1
+        self.changed.clear()
+        return path
+
+
+def load_aggregates(sync=True, base_dir=None):
+    """Carga los agregados (foto + journal) y, por defecto, los alinea con los archivos diarios"""
+    aggregates = RunningAggregates()
+    if sync:
+        aggregates.sync(base_dir)
+        if aggregates.changed or aggregates.journal_lines:
+            aggregates.save(checkpoint=True)
+    return aggregates
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Caché de build por contenido para los artefactos derivados
+Cada artefacto (resumen semanal, mensual, dashboard, calendario, README)
+registra el hash de sus entradas; si las entradas no cambiaron desde la
+última generación, el generador se salta.
+
+Grafo de dependencias:
+    daily -> weekly -> monthly -> dashboard-data / monthly data / calendar / README
+
+El manifest solo guarda hashes de contenido (se commitea junto con exports/):
+los hashes de archivo por (mtime, tamaño) se cachean en memoria del proceso,
+porque los mtime cambian en cada checkout.
+"""
+
+import os
+import glob
+import json
+import hashlib
+import calendar
+from datetime import datetime, timedelta
+from state_store import state_path, load_state
+from daily_archive import bundle_paths
+from tracing import span
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin bloqueo entre procesos
+    fcntl = None
+
+MANIFEST_FILE = "build_manifest.json"
+
+# Hashes de archivo de este proceso: {ruta: (mtime_ns, tamaño, sha256)}
+_digests = {}
+
+
+def _hash_file(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(65536), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def daily_paths(start_date, end_date, base_dir=None):
+    """Rutas de los archivos diarios de un rango (existan o no) más los bundles archivados de sus meses"""
+    base_dir = base_dir or os.getenv('EXPORT_OUTPUT_DIR', 'exports')
+    paths = []
+    months = set()
+    current = start_date
+    while current <= end_date:
+        paths.append(os.path.join(base_dir, "daily", f"{current.strftime('%Y-%m-%d')}.json"))
+        months.add(current.strftime('%Y-%m'))
+        current += timedelta(days=1)
+    return paths + bundle_paths(sorted(months), base_dir)
+
+
+def month_daily_paths(year, month, base_dir=None):
+    last_day = calendar.monthrange(year, month)[1]
+    return daily_paths(datetime(year, month, 1), datetime(year, month, last_day), base_dir)
+
+
+def month_weekly_paths(year, month, base_dir=None):
+    """Resúmenes semanales que se solapan con el mes (mismo nombre que weekly_summary)"""
+    base_dir = base_dir or os.getenv('EXPORT_OUTPUT_DIR', 'exports')
+    names = set()
+    for path in month_daily_paths(year, month, base_dir):
+        if not path.endswith('.json'):
+            continue
+        date = datetime.strptime(os.path.basename(path)[:10], '%Y-%m-%d')
+        week_start = date - timedelta(days=date.weekday())
+        names.add(f"{week_start.year}-W{week_start.isocalendar()[1]:02d}.json")
+    return [os.path.join(base_dir, "weekly", name) for name in sorted(names)]
+
+
+def year_paths(year, base_dir=None, kinds=('daily', 'weekly', 'monthly')):
+    """Todos los archivos existentes del año para los tipos indicados"""
+    base_dir = base_dir or os.getenv('EXPORT_OUTPUT_DIR', 'exports')
+    paths = []
+    for kind in kinds:
+        paths.extend(sorted(glob.glob(os.path.join(base_dir, kind, f"{year}-*.json"))))
+    if 'daily' in kinds:
+        paths.extend(bundle_paths([f"{year}-{month:02d}" for month in range(1, 13)], base_dir))
+    return paths
+
+
+class BuildCache:
+    """Manifest persistente artefacto -> hash de entradas"""
+
+    def __init__(self):
+        manifest = load_state(MANIFEST_FILE, {})
+        self.artifacts = manifest.get('artifacts', {})
+        self.hits = 0
+        self.misses = 0
+
+    def file_digest(self, path):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return 'missing'
+        cached = _digests.get(path)
+        if cached and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+            return cached[2]
+        digest = _hash_file(path)
+        _digests[path] = (stat.st_mtime_ns, stat.st_size, digest)
+        return digest
+
+    def inputs_digest(self, inputs, extra=''):
+        """Hash combinado de las entradas (rutas ordenadas + contenido) y una clave extra"""
+        digest = hashlib.sha256(extra.encode('utf-8'))
+        for path in sorted(set(inputs)):
+            digest.update(path.encode('utf-8'))
+            digest.update(self.file_digest(path).encode('ascii'))
+        return digest.hexdigest()
+
+    def is_fresh(self, artifact, inputs, outputs, extra=''):
+        """True si el artefacto existe y sus entradas no cambiaron"""
+        entry = self.artifacts.get(artifact)
+        with span('cache.check', artifact=artifact) as attrs:
+            fresh = (
+                entry is not None and
+                all(os.path.exists(path) for path in outputs) and
+                entry.get('inputs') == self.inputs_digest(inputs, extra)
+            )
+            attrs['hit'] = fresh
+        if fresh:
+            self.hits += 1
+        else:
+            self.misses += 1
+        return fresh
+
+    def record(self, artifact, inputs, outputs, extra=''):
+        """Registra la generación del artefacto (lectura-modificación-escritura con bloqueo)
+
+        Sin hora de generación: si las entradas no cambiaron el manifest no se reescribe.
+        """
+        entry = {
+            'inputs': self.inputs_digest(inputs, extra),
+            'outputs': list(outputs)
+        }
+        if self.artifacts.get(artifact) == entry:
+            return
+        self.artifacts[artifact] = entry
+        self._save({artifact: entry})
+
+    def _save(self, updates):
+        path = state_path(MANIFEST_FILE)
+        with open(f"{path}.lock", 'w') as lock:
+            if fcntl:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            # Otros procesos pueden haber registrado artefactos mientras tanto
+            manifest = load_state(MANIFEST_FILE, {})
+            manifest.setdefault('artifacts', {}).update(updates)
+            # Manifests anteriores guardaban los mtime de cada archivo
+            manifest.pop('files', None)
+            self.artifacts = manifest['artifacts']
+            tmp_path = f"{path}.tmp.{os.getpid()}"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(manifest, f, indent=2, ensure_ascii=False)
+            os.replace(tmp_path, path)
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Journal de progreso para backfills reanudables
+Registra días y fases completadas a medida que avanza el trabajo,
+para que un reprocesamiento interrumpido pueda continuar con --resume
+"""
+
+import hashlib
+from datetime import datetime
+from state_store import load_state, save_state
+
+
+def account_key(username):
+    """Identificador estable de la cuenta sin exponer el usuario real"""
+    return hashlib.sha1(username.encode('utf-8')).hexdigest()[:10]
+
+
+class RunJournal:
+    """Journal persistente de una ejecución (días exportados y fases completadas)"""
+
+    def __init__(self, run_key: str, resume: bool = False, params: dict = None):
+        self.run_key = run_key
+        self.filename = f"journal_{run_key}.json"
+        existing = load_state(self.filename) if resume else None
+
+        if existing and not existing.get('completed'):
+            self.data = existing
+            self.resumed = True
+        else:
+            self.data = {
+                'runKey': run_key,
+                'createdAt': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                'params': params or {},
+                'days': {},
+                'steps': {},
+                'phases': {},
+                'completed': False
+            }
+            self.resumed = False
+            self.save()
+
+    @property
+    def params(self):
+        return self.data.get('params', {})
+
+    def save(self):
+        """Escribe el journal a disco"""
+        self.data['updatedAt'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        save_state(self.filename, self.data)
+
+    # Días exportados
+    def is_day_done(self, date_str):
+        return self.data['days'].get(date_str, {}).get('status') == 'done'
+
+    def mark_day(self, date_str, status, **info):
+        """Marca un día como 'done' o 'failed' y persiste inmediatamente"""
+        entry = {'status': status, 'at': datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
+        entry.update(info)
+        self.data['days'][date_str] = entry
+        self.save()
+
+    def failed_days(self):
+        return sorted(d for d, e in self.data['days'].items() if e.get('status') == 'failed')
+
+    # Pasos dentro de una fase (semanas, meses)
+    def is_step_done(self, phase, key):
+        return key in self.data['steps'].get(phase, [])
+
+    def mark_step(self, phase, key):
+        steps = self.data['steps'].setdefault(phase, [])
+        if key not in steps:
+            steps.append(key)
+        self.save()
+
+    # Fases completas
+    def is_phase_done(self, phase):
+        return self.data['phases'].get(phase) == 'done'
+
+    def mark_phase(self, phase):
+        self.data['phases'][phase] = 'done'
+        self.save()
+
+    def finish(self):
+        """Marca la ejecución como completada (un --resume posterior empieza de cero)"""
+        self.data['completed'] = not self.failed_days()
+        self.save()
+        return self.data['completed']
@@ -1,12 +1,16 @@
 #!/usr/bin/env python3
 """
 Script para limpiar trades con símbolos numéricos de los archivos JSON existentes
+Recorre los días sueltos y los archivados (daily_store); un día archivado que
+se limpia se escribe como archivo suelto, que tiene prioridad sobre el bundle
+y se integra a él en la próxima compactación.
 """
 
 import os
 import json
-import glob
 from datetime import datetime
+from stable_output import write_json
+from daily_store import daily_sources, iter_daily, daily_path
 
 def is_valid_trade(trade):
     """Valida si un trade es real o es una fila de subtotal/header"""
@@ -33,13 +37,14 @@ def is_valid_trade(trade):
     
     return True
 
-def clean_json_file(filepath):
-    """Limpia un archivo JSON eliminando trades inválidos"""
+def clean_json_file(filepath, data=None):
+    """Limpia un archivo JSON eliminando trades inválidos (data: contenido ya leído, p. ej. de un bundle)"""
     print(f"🔧 Procesando: {filepath}")
     
     try:
-        with open(filepath, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        if data is None:
+            with open(filepath, 'r', encoding='utf-8') as f:
+                data = json.load(f)
         
         # Obtener trades originales
         original_trades = data.get('trades', [])
@@ -63,7 +68,7 @@ def clean_json_file(filepath):
                 'netPnL': round(sum(t.get('net', t.get('pnl', 0) - t.get('commission', 0)) for t in valid_trades), 2),
                 'winningTrades': len([t for t in valid_trades if t.get('pnl', 0) > 0]),
                 'losingTrades': len([t for t in valid_trades if t.get('pnl', 0) < 0]),
-                'symbols': list(set(t.get('symbol', '') for t in valid_trades if t.get('symbol')))
+                'symbols': sorted(set(t.get('symbol', '') for t in valid_trades if t.get('symbol')))
             }
             
             # Agregar metadata de limpieza
@@ -74,8 +79,7 @@ def clean_json_file(filepath):
             data['metadata']['removedTrades'] = removed_count
             
             # Guardar archivo actualizado
-            with open(filepath, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=2, ensure_ascii=False)
+            write_json(filepath, data)
             
             print(f"  ✅ Archivo actualizado")
         else:
@@ -85,17 +89,17 @@ def clean_json_file(filepath):
         print(f"  ❌ Error: {str(e)}")
 
 def clean_all_exports(base_dir='exports'):
-    """Limpia todos los archivos JSON de exports"""
+    """Limpia todos los días exportados (sueltos y archivados)"""
     print("🧹 Iniciando limpieza de trades con símbolos numéricos...")
     
-    # Buscar todos los archivos JSON en daily
-    daily_files = glob.glob(os.path.join(base_dir, 'daily', '*.json'))
+    # Todos los días: archivos sueltos de daily y días de los bundles archivados
+    dates = sorted(daily_sources(base_dir))
     
-    print(f"📁 Encontrados {len(daily_files)} archivos para procesar")
+    print(f"📁 Encontrados {len(dates)} días para procesar")
     
     total_cleaned = 0
-    for filepath in sorted(daily_files):
-        clean_json_file(filepath)
+    for date_str, data in iter_daily(dates, base_dir):
+        clean_json_file(daily_path(date_str, base_dir), data)
         total_cleaned += 1
     
     print(f"\n✅ Limpieza completada: {total_cleaned} archivos procesados")
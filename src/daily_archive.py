@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""
+Archivo comprimido por mes de los archivos diarios viejos
+Los meses cerrados de exports/daily/*.json (incluidos los días vacíos) se
+compactan en un único bundle por mes, con un índice chico para leer cualquier
+día sin descomprimir el resto:
+
+    exports/archive/2025-03.jsonl.gz      (o .jsonl.zst si está instalado `zstandard`)
+    exports/archive/2025-03.index.json    {fecha: [offset, largo, sha1, origen]}
+
+Cada día es una línea JSONL comprimida como frame independiente (miembro
+gzip / frame zstd) y los frames van concatenados: el bundle completo sigue
+siendo un .jsonl.gz válido (zcat) y un día se lee con un seek + un frame.
+
+La compactación es opcional: la hace `propreports archive`, o el pipeline
+con --archive / PROPREPORTS_ARCHIVE=true. Los días recientes quedan como
+archivos sueltos. Un archivo suelto tiene
+prioridad sobre el bundle (p. ej. un día viejo re-exportado) y se integra al
+bundle en la próxima compactación. La lectura pasa por daily_store, así que
+los generadores no distinguen días sueltos de archivados. El índice conserva
+el hash del archivo suelto original (origen), así que archivar un día no
+cuenta como un cambio para los índices persistentes (cubo, log de trades).
+
+Variables de entorno:
+    PROPREPORTS_ARCHIVE_AFTER_DAYS  días desde el fin de mes para compactarlo (por defecto 7)
+    PROPREPORTS_ARCHIVE_CODEC       gzip o zstd (por defecto zstd si está instalado)
+"""
+
+import os
+import re
+import glob
+import gzip
+import json
+import hashlib
+import calendar
+from datetime import datetime, timedelta
+from tracing import span, traced
+
+try:
+    import zstandard
+except ImportError:  # Opcional: sin zstandard los bundles son gzip
+    zstandard = None
+
+ARCHIVE_INDEX_VERSION = 1
+ARCHIVE_AFTER_DAYS = int(os.getenv('PROPREPORTS_ARCHIVE_AFTER_DAYS', '7'))
+CODEC_EXTENSIONS = {'gzip': 'gz', 'zstd': 'zst'}
+
+DAILY_FILE_RE = re.compile(r'^\d{4}-\d{2}-\d{2}\.json$')
+
+# Índices ya leídos: {ruta: ((mtime_ns, tamaño), índice)}
+_indexes = {}
+
+
+def content_source(content):
+    """Origen de un día: sha1 del contenido del archivo diario (no depende de mtime)"""
+    return hashlib.sha1(content).hexdigest()
+
+
+def default_codec():
+    codec = os.getenv('PROPREPORTS_ARCHIVE_CODEC', '') or ('zstd' if zstandard is not None else 'gzip')
+    if codec == 'zstd' and zstandard is None:
+        print("⚠️  zstandard no está instalado, se usa gzip")
+        return 'gzip'
+    return codec
+
+
+def compress(codec, data):
+    if codec == 'zstd':
+        return zstandard.ZstdCompressor(level=19).compress(data)
+    return gzip.compress(data, 9, mtime=0)
+
+
+def decompress(codec, data):
+    if codec == 'zstd':
+        if zstandard is None:
+            raise RuntimeError("Bundle zstd sin el paquete zstandard instalado")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return gzip.decompress(data)
+
+
+def archive_dir(base_dir=None):
+    base_dir = base_dir or os.getenv('EXPORT_OUTPUT_DIR', 'exports')
+    return os.path.join(base_dir, "archive")
+
+
+def index_path(month, base_dir=None):
+    return os.path.join(archive_dir(base_dir), f"{month}.index.json")
+
+
+def load_index(month, base_dir=None):
+    """Índice del bundle del mes (YYYY-MM); None si el mes no está archivado"""
+    path = index_path(month, base_dir)
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    key = (stat.st_mtime_ns, stat.st_size)
+    cached = _indexes.get(path)
+    if cached and cached[0] == key:
+        return cached[1]
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if index.get('version') != ARCHIVE_INDEX_VERSION:
+        return None
+    _indexes[path] = (key, index)
+    return index
+
+
+def archived_months(base_dir=None):
+    return sorted(os.path.basename(path)[:7] for path in glob.glob(os.path.join(archive_dir(base_dir), '*.index.json')))
+
+
+def bundle_paths(months, base_dir=None):
+    """Rutas de los bundles existentes de los meses indicados (entradas para la caché de build)"""
+    paths = []
+    for month in months:
+        index = load_index(month, base_dir)
+        if index:
+            paths.append(os.path.join(archive_dir(base_dir), index['bundle']))
+    return paths
+
+
+def entry_source(entry):
+    """Origen de un día del índice: el hash del archivo suelto (índices viejos: el de la línea)"""
+    return entry[3] if len(entry) > 3 else ['archive', entry[2]]
+
+
+def archived_days(base_dir=None):
+    """{fecha: origen} de todos los días archivados; el origen cambia si cambia el contenido del día"""
+    days = {}
+    for month in archived_months(base_dir):
+        index = load_index(month, base_dir)
+        if index:
+            for date_str, entry in index['days'].items():
+                days[date_str] = entry_source(entry)
+    return days
+
+
+def read_archived_day(date_str, base_dir=None):
+    """Datos de un día archivado (un seek + un frame); None si no está"""
+    index = load_index(date_str[:7], base_dir)
+    entry = index and index['days'].get(date_str)
+    if not entry:
+        return None
+    offset, length = entry[0], entry[1]
+    try:
+        with open(os.path.join(archive_dir(base_dir), index['bundle']), 'rb') as f:
+            f.seek(offset)
+            return json.loads(decompress(index['codec'], f.read(length)))
+    except (OSError, ValueError, RuntimeError):
+        return None
+
+
+def read_bundle(month, base_dir=None):
+    """{fecha: datos} de todo el bundle del mes (vacío si no está archivado)"""
+    index = load_index(month, base_dir)
+    if not index:
+        return {}
+    days = {}
+    with open(os.path.join(archive_dir(base_dir), index['bundle']), 'rb') as f:
+        for date_str, entry in sorted(index['days'].items()):
+            offset, length = entry[0], entry[1]
+            f.seek(offset)
+            days[date_str] = json.loads(decompress(index['codec'], f.read(length)))
+    return days
+
+
+def write_bundle(month, days, base_dir=None, codec=None, sources=None):
+    """
+    Escribe el bundle y su índice (tmp + rename; el índice al final) y devuelve el índice
+
+    sources: {fecha: origen} de los días (hash del archivo suelto); sin origen
+    se usa el hash de la línea.
+    """
+    sources = sources or {}
+    codec = codec or default_codec()
+    directory = archive_dir(base_dir)
+    os.makedirs(directory, exist_ok=True)
+    bundle = f"{month}.jsonl.{CODEC_EXTENSIONS[codec]}"
+    bundle_path = os.path.join(directory, bundle)
+    entries = {}
+    offset = 0
+    tmp_path = f"{bundle_path}.tmp.{os.getpid()}"
+    with span('io.write', path=bundle_path):
+        with open(tmp_path, 'wb') as f:
+            for date_str in sorted(days):
+                line = (json.dumps(days[date_str], separators=(',', ':'), ensure_ascii=False, sort_keys=True) + '\n').encode('utf-8')
+                frame = compress(codec, line)
+                f.write(frame)
+                digest = hashlib.sha1(line).hexdigest()
+                entries[date_str] = [offset, len(frame), digest, sources.get(date_str) or ['archive', digest]]
+                offset += len(frame)
+        os.replace(tmp_path, bundle_path)
+
+    index = {'version': ARCHIVE_INDEX_VERSION, 'month': month, 'codec': codec, 'bundle': bundle, 'days': entries}
+    path = index_path(month, base_dir)
+    tmp_path = f"{path}.tmp.{os.getpid()}"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(index, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)
+
+    # Un bundle anterior con otro codec queda huérfano
+    for other in CODEC_EXTENSIONS.values():
+        stale = os.path.join(directory, f"{month}.jsonl.{other}")
+        if stale != bundle_path and os.path.exists(stale):
+            os.remove(stale)
+    return index
+
+
+def compact_month(month, base_dir=None, codec=None):
+    """Integra los archivos sueltos del mes a su bundle y los borra; devuelve cuántos días integró"""
+    base_dir = base_dir or os.getenv('EXPORT_OUTPUT_DIR', 'exports')
+    loose = sorted(glob.glob(os.path.join(base_dir, 'daily', f"{month}-*.json")))
+    loose = [path for path in loose if DAILY_FILE_RE.match(os.path.basename(path))]
+    if not loose:
+        return 0
+    with span('archive.month', month=month, files=len(loose)):
+        days = read_bundle(month, base_dir)
+        index = load_index(month, base_dir)
+        sources = {date_str: entry_source(entry) for date_str, entry in index['days'].items()} if index else {}
+        for path in loose:
+            with open(path, 'rb') as f:
+                content = f.read()
+            date_str = os.path.basename(path)[:10]
+            days[date_str] = json.loads(content)
+            sources[date_str] = content_source(content)
+        index = write_bundle(month, days, base_dir, codec, sources)
+        # Solo se borran los sueltos que quedaron en el bundle
+        for path in loose:
+            if os.path.basename(path)[:10] in index['days']:
+                os.remove(path)
+    return len(loose)
+
+
+def closed_months(base_dir=None, today=None, after_days=None):
+    """Meses con archivos sueltos cuyo último día quedó hace más de after_days días"""
+    base_dir = base_dir or os.getenv('EXPORT_OUTPUT_DIR', 'exports')
+    after_days = ARCHIVE_AFTER_DAYS if after_days is None else after_days
+    cutoff = (today or datetime.now()) - timedelta(days=after_days)
+    months = set()
+    for path in glob.glob(os.path.join(base_dir, 'daily', '*.json')):
+        name = os.path.basename(path)
+        if DAILY_FILE_RE.match(name):
+            months.add(name[:7])
+    closed = []
+    for month in sorted(months):
+        year, month_num = int(month[:4]), int(month[5:7])
+        month_end = datetime(year, month_num, calendar.monthrange(year, month_num)[1])
+        if month_end < cutoff:
+            closed.append(month)
+    return closed
+
+
+@traced('archive.compact')
+def compact_archive(base_dir=None, today=None, after_days=None, codec=None):
+    """Compacta todos los meses cerrados con archivos sueltos; devuelve los meses compactados"""
+    months = closed_months(base_dir, today, after_days)
+    if not months:
+        print("⏭️  Sin meses cerrados para archivar")
+        return []
+    codec = codec or default_codec()
+    total = 0
+    for month in months:
+        total += compact_month(month, base_dir, codec)
+    print(f"🗜️  Archivados {total} días en {len(months)} bundles ({codec}): {', '.join(months)}")
+    return months
@@ -5,9 +5,14 @@ Exporta solo los trades del día actual
 """
 
 import os
-import json
 from datetime import datetime, timedelta
 from propreports_exporter import PropReportsExporter
+from trade_index import TradeIndex
+from trade_cube import record_day
+from trade_log import record_day as log_day
+from tracing import traced, finish_run
+from metrics import enable_metrics, write_textfile
+from stable_output import write_json
 
 def obfuscate_account(account_name):
     """Ofusca el nombre de cuenta para mayor seguridad"""
@@ -40,6 +45,7 @@ def ensure_directory_structure():
     
     return base_dir
 
+@traced('export.daily')
 def export_daily_trades():
     """Exporta trades del día actual"""
     # Configuración
@@ -92,7 +98,7 @@ def export_daily_trades():
             'netPnL': round(sum(t.get('net', 0) if t.get('net', 0) != 0 else (t.get('pnl', 0) - t.get('commission', 0)) for t in todays_trades), 2),
             'winningTrades': len([t for t in todays_trades if t.get('pnl', 0) > 0]),
             'losingTrades': len([t for t in todays_trades if t.get('pnl', 0) < 0]),
-            'symbols': list(set(t.get('symbol', '') for t in todays_trades if t.get('symbol')))
+            'symbols': sorted(set(t.get('symbol', '') for t in todays_trades if t.get('symbol')))
         }
     }
     
@@ -103,9 +109,20 @@ def export_daily_trades():
     # Nombre del archivo: YYYY-MM-DD.json
     filename = os.path.join(daily_dir, f"{today}.json")
     
+    # Evitar reescribir el día si los trades no cambiaron desde la última descarga
+    index = TradeIndex()
+    index.seed_from_file(today, filename)
+    diff = index.diff_day(today, todays_trades)
+    if not diff['changed'] and os.path.exists(filename):
+        print(f"⏸️  Sin cambios para {today}: {len(todays_trades)} trades ya exportados")
+        return filename
+    index.upsert_day(today, todays_trades)
+    
     # Guardar JSON
-    with open(filename, 'w', encoding='utf-8') as f:
-        json.dump(daily_data, f, indent=2, ensure_ascii=False)
+    write_json(filename, daily_data)
+    index.save()
+    record_day(today, todays_trades, filename)
+    log_day(today, todays_trades, filename)
     
     print(f"✅ Exportación diaria completada: {filename}")
     print(f"📊 Resumen: {daily_data['summary']['totalTrades']} trades, "
@@ -114,4 +131,7 @@ def export_daily_trades():
     return filename
 
 if __name__ == "__main__":
-    export_daily_trades()
\ No newline at end of file
+    enable_metrics()
+    export_daily_trades()
+    finish_run('daily_exporter')
+    write_textfile(run='daily_exporter')
\ No newline at end of file
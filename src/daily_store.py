@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Lectura de archivos diarios de exports/daily
+Punto único para cargar días sueltos o recorrer un rango día por día, de modo
+que los generadores puedan agregar en streaming sin tener todo el año en memoria.
+Los días de meses archivados (daily_archive.py) se leen del bundle del mes; un
+archivo suelto del mismo día tiene prioridad.
+
+Los índices persistentes por día (cubo, índice por símbolo, log de trades)
+identifican cada día por el hash de su contenido (origen) y se alinean con
+sync_days(): un checkout nuevo (mtimes nuevos) no los reconstruye.
+"""
+
+import os
+import re
+import glob
+import json
+from datetime import datetime, timedelta
+from daily_archive import archived_days, content_source, load_index, read_archived_day
+
+DAILY_FILE_RE = re.compile(r'^\d{4}-\d{2}-\d{2}\.json$')
+
+# Hashes ya calculados en este proceso: {ruta: ((mtime_ns, tamaño), origen)}
+_sources = {}
+
+
+def daily_path(date_str, base_dir=None):
+    base_dir = base_dir or os.getenv('EXPORT_OUTPUT_DIR', 'exports')
+    return os.path.join(base_dir, "daily", f"{date_str}.json")
+
+
+def load_daily(date_str, base_dir=None):
+    """Carga el archivo diario de una fecha (suelto o archivado); None si no existe o está corrupto"""
+    path = daily_path(date_str, base_dir)
+    if not os.path.exists(path):
+        return read_archived_day(date_str, base_dir)
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception:
+        return None
+
+
+def file_source(path):
+    """Origen de un archivo diario: sha1 de su contenido (None si no existe)"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    key = (stat.st_mtime_ns, stat.st_size)
+    cached = _sources.get(path)
+    if cached and cached[0] == key:
+        return cached[1]
+    try:
+        with open(path, 'rb') as f:
+            source = content_source(f.read())
+    except OSError:
+        return None
+    _sources[path] = (key, source)
+    return source
+
+
+def daily_sources(base_dir=None):
+    """
+    {fecha: origen} de todos los días exportados, sueltos y archivados
+
+    El origen es el sha1 del contenido del archivo diario (el mismo que guarda
+    el índice del bundle al archivarlo): cambia solo cuando cambia el día, no
+    con el mtime (lo usan los índices persistentes para saber qué días releer).
+    """
+    base_dir = base_dir or os.getenv('EXPORT_OUTPUT_DIR', 'exports')
+    sources = archived_days(base_dir)
+    for path in glob.glob(os.path.join(base_dir, 'daily', '*.json')):
+        name = os.path.basename(path)
+        if not DAILY_FILE_RE.match(name):
+            continue
+        source = file_source(path)
+        if source is not None:
+            sources[name[:10]] = source
+    return sources
+
+
+def sync_days(index, base_dir=None):
+    """
+    Alinea un índice persistente por día con los días exportados; devuelve cuántos días releyó
+
+    El índice tiene `days` ({fecha: {'source': origen, ...}}), replace_day(fecha,
+    trades, source=) y remove_day(fecha) (TradeCube, SymbolIndex, TradeLog).
+    Solo se releen los días cuyo contenido cambió o que faltan.
+    """
+    base_dir = base_dir or os.getenv('EXPORT_OUTPUT_DIR', 'exports')
+    sources = daily_sources(base_dir)
+    rebuilt = 0
+    for date_str, source in sorted(sources.items()):
+        entry = index.days.get(date_str)
+        if entry and entry.get('source') == source:
+            continue
+        data = load_daily(date_str, base_dir)
+        if data is None:
+            continue
+        index.replace_day(date_str, data.get('trades', []), source=source)
+        rebuilt += 1
+    for date_str in [d for d in index.days if d not in sources]:
+        index.remove_day(date_str)
+    return rebuilt
+
+
+def daily_exists(date_str, base_dir=None):
+    """True si el día está exportado (como archivo suelto o en el bundle de su mes)"""
+    if os.path.exists(daily_path(date_str, base_dir)):
+        return True
+    index = load_index(date_str[:7], base_dir)
+    return bool(index and date_str in index['days'])
+
+
+def date_range(start_date, end_date):
+    """Fechas YYYY-MM-DD entre start_date y end_date (inclusive)"""
+    if isinstance(start_date, str):
+        start_date = datetime.strptime(start_date, '%Y-%m-%d')
+    if isinstance(end_date, str):
+        end_date = datetime.strptime(end_date, '%Y-%m-%d')
+    current = start_date
+    while current <= end_date:
+        yield current.strftime('%Y-%m-%d')
+        current += timedelta(days=1)
+
+
+def iter_daily(dates, base_dir=None):
+    """Genera (fecha, datos) de los días existentes, cargando uno a la vez"""
+    for date_str in dates:
+        data = load_daily(date_str, base_dir)
+        if data is not None:
+            yield date_str, data
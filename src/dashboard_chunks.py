@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Escritura de los datos del dashboard en bloques columnares precomprimidos
+Los datos se guardan como arrays paralelos (una lista por campo) en lugar de
+una lista de objetos, serializados sin espacios, y cada archivo .json tiene
+hermanos .json.gz y .json.br (si está instalado `brotli`) para servidores que
+entregan archivos precomprimidos (gzip_static / brotli_static). Los archivos
+sin cambios no se reescriben (ver stable_output.py).
+"""
+
+import os
+import gzip
+import json
+from stable_output import DETERMINISTIC, split_volatile, record_stamps, write_bytes
+
+try:
+    import brotli
+except ImportError:  # Opcional: sin brotli solo se escribe .gz
+    brotli = None
+
+# Campos de los trades destacados (top winners/losers) en los bloques
+TOP_TRADE_FIELDS = ('date', 'opened', 'closed', 'symbol', 'type', 'size', 'entry', 'exit', 'pnl', 'net')
+
+
+def columnar(rows, fields):
+    """Lista de dicts -> {campo: [valores]} (arrays paralelos, mismo orden que rows)"""
+    return {field: [row.get(field) for row in rows] for field in fields}
+
+
+def rows_of(columns):
+    """Inversa de columnar(): {campo: [valores]} -> lista de dicts"""
+    fields = list(columns or {})
+    if not fields:
+        return []
+    return [dict(zip(fields, values)) for values in zip(*(columns[field] for field in fields))]
+
+
+def encode(data):
+    """JSON compacto en UTF-8"""
+    return json.dumps(data, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+def write_chunk(path, data):
+    """
+    Escribe path (.json) con sus variantes comprimidas; devuelve las rutas escritas
+
+    gzip se escribe con mtime=0 para que el mismo contenido produzca los mismos
+    bytes. Si el JSON no cambió y las variantes existen no se recomprime ni se
+    reescribe nada; en modo determinista los campos volátiles (lastUpdate...)
+    van a los metadatos de la ejecución.
+    """
+    stamps = {}
+    if DETERMINISTIC:
+        data, stamps = split_volatile(data)
+    body = encode(data)
+    suffixes = ('.gz', '.br') if brotli is not None else ('.gz',)
+    complete = all(os.path.exists(f"{path}{suffix}") for suffix in suffixes)
+    written = [path] if write_bytes(path, body) else []
+    if written:
+        record_stamps(path, stamps)
+    if not written and complete:
+        return written
+
+    variants = [(f"{path}.gz", gzip.compress(body, 9, mtime=0))]
+    if brotli is not None:
+        variants.append((f"{path}.br", brotli.compress(body, quality=11)))
+    elif os.path.exists(f"{path}.br"):
+        # Un .br de una ejecución anterior quedaría desactualizado
+        os.remove(f"{path}.br")
+
+    written += [variant_path for variant_path, content in variants if write_bytes(variant_path, content)]
+    return written
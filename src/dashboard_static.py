@@ -0,0 +1,338 @@
+#!/usr/bin/env python3
+"""
+Dashboard autocontenido: una sola petición y contenido antes de ejecutar JS
+La página normal carga Tailwind, Chart.js y cal-heatmap desde CDNs y pide
+index.json antes de mostrar nada. En este modo todo se resuelve al generar:
+
+    - las métricas principales se escriben ya formateadas en el HTML
+    - los gráficos y el calendario se dibujan como SVG inline
+    - el CSS es solo el de las clases utilitarias que la página usa, minificado
+    - el índice del dashboard se embebe como JSON para scripts que lo quieran leer
+
+No hay ninguna referencia externa, así que la página funciona offline.
+"""
+
+import os
+import re
+import json
+import html
+from datetime import datetime
+from generate_calendar import generate_svg_calendar
+from generate_dashboard_data import DASHBOARD_DATA_DIR
+from dashboard_chunks import rows_of
+from tracing import traced
+from stable_output import DETERMINISTIC, record_stamps, now_stamp, write_text
+
+PROFIT_COLOR = '#10b981'
+LOSS_COLOR = '#ef4444'
+LINE_COLOR = '#3b82f6'
+MONTH_NAMES = ('Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec')
+
+# Subconjunto de Tailwind 2.2 para las clases de la plantilla; purge_css()
+# emite solo las que aparecen en el HTML final
+UTILITY_CSS = {
+    'bg-gray-100': 'background-color:#f3f4f6',
+    'bg-white': 'background-color:#fff',
+    'container': 'width:100%;max-width:1280px',
+    'mx-auto': 'margin-left:auto;margin-right:auto',
+    'px-4': 'padding-left:1rem;padding-right:1rem',
+    'py-8': 'padding-top:2rem;padding-bottom:2rem',
+    'p-6': 'padding:1.5rem',
+    'mb-2': 'margin-bottom:.5rem',
+    'mb-4': 'margin-bottom:1rem',
+    'mb-8': 'margin-bottom:2rem',
+    'mt-2': 'margin-top:.5rem',
+    'mt-8': 'margin-top:2rem',
+    'grid': 'display:grid',
+    'grid-cols-1': 'grid-template-columns:repeat(1,minmax(0,1fr))',
+    'gap-4': 'gap:1rem',
+    'rounded-lg': 'border-radius:.5rem',
+    'shadow': 'box-shadow:0 1px 3px 0 rgba(0,0,0,.1),0 1px 2px 0 rgba(0,0,0,.06)',
+    'text-center': 'text-align:center',
+    'text-sm': 'font-size:.875rem;line-height:1.25rem',
+    'text-xl': 'font-size:1.25rem;line-height:1.75rem',
+    'text-2xl': 'font-size:1.5rem;line-height:2rem',
+    'text-4xl': 'font-size:2.25rem;line-height:2.5rem',
+    'font-medium': 'font-weight:500',
+    'font-bold': 'font-weight:700',
+    'text-gray-500': 'color:#6b7280',
+    'text-gray-600': 'color:#4b5563',
+    'text-gray-800': 'color:#1f2937',
+    'text-blue-600': 'color:#2563eb',
+    'hover:underline': 'text-decoration:underline',
+    'overflow-x-auto': 'overflow-x:auto',
+    'profit': f'color:{PROFIT_COLOR}',
+    'loss': f'color:{LOSS_COLOR}',
+}
+RESPONSIVE_CSS = {
+    'md:grid-cols-2': 'grid-template-columns:repeat(2,minmax(0,1fr))',
+    'md:grid-cols-4': 'grid-template-columns:repeat(4,minmax(0,1fr))',
+}
+BASE_CSS = (
+    '*,::before,::after{box-sizing:border-box}'
+    'body{margin:0;font-family:system-ui,-apple-system,"Segoe UI",Roboto,sans-serif;line-height:1.5}'
+    'h1,h2,h3,p{margin:0}a{color:inherit;text-decoration:none}'
+    'svg.chart{width:100%;height:auto;display:block}'
+    '.chart text{font-size:10px;fill:#6b7280}'
+    f'.chart .up{{fill:{PROFIT_COLOR}}}.chart .down{{fill:{LOSS_COLOR}}}'
+    '.chart .axis{stroke:#d1d5db;stroke-width:1}'
+    f'.chart .line{{fill:none;stroke:{LINE_COLOR};stroke-width:2}}'
+    '.chart .area{fill:rgba(59,130,246,.1)}'
+    'table{width:100%;border-collapse:collapse;font-size:.875rem}'
+    'th,td{padding:.25rem .5rem;border-bottom:1px solid #e5e7eb;text-align:right}'
+    'th:first-child,td:first-child{text-align:left}'
+)
+
+CLASS_ATTR_RE = re.compile(r'class="([^"]*)"')
+
+
+def _css_selector(name):
+    return '.' + name.replace(':', '\\:')
+
+
+def purge_css(markup):
+    """CSS minificado solo con las utilidades usadas en el HTML"""
+    used = set()
+    for match in CLASS_ATTR_RE.finditer(markup):
+        used.update(match.group(1).split())
+    rules = [BASE_CSS]
+    for name, declarations in UTILITY_CSS.items():
+        if name in used:
+            selector = _css_selector(name)
+            if name.startswith('hover:'):
+                selector += ':hover'
+            rules.append(f'{selector}{{{declarations}}}')
+    responsive = [f'{_css_selector(name)}{{{decl}}}' for name, decl in RESPONSIVE_CSS.items() if name in used]
+    if responsive:
+        rules.append('@media (min-width:768px){' + ''.join(responsive) + '}')
+    return ''.join(rules)
+
+
+def minify_html(markup):
+    """Quita el espacio entre etiquetas (la plantilla no tiene <pre> ni texto sensible a espacios)"""
+    return re.sub(r'>\s+<', '><', markup).strip()
+
+
+def inline_json(data):
+    """JSON compacto seguro dentro de <script> (sin '</' que cierre la etiqueta)"""
+    return json.dumps(data, separators=(',', ':'), ensure_ascii=False).replace('</', '<\\/')
+
+
+def money(value):
+    return f"${value:,.2f}" if value >= 0 else f"-${-value:,.2f}"
+
+
+def _n(value):
+    """Coordenada SVG con un decimal (sin '.0')"""
+    text = f"{value:.1f}"
+    return text[:-2] if text.endswith('.0') else text
+
+
+def _empty_chart():
+    return '<p class="text-gray-500">No data</p>'
+
+
+def bar_chart(labels, values, titles, width=640, height=260, show_labels=None):
+    """Barras verdes/rojas sobre el cero con el rango en el eje y tooltip <title>"""
+    if not values:
+        return _empty_chart()
+    left, right, top, bottom = 56, 8, 8, 20
+    plot_w, plot_h = width - left - right, height - top - bottom
+    low, high = min(0, min(values)), max(0, max(values))
+    extent = (high - low) or 1
+    y = lambda value: top + (high - value) / extent * plot_h
+    step = plot_w / len(values)
+    bar_w = max(step * 0.8, 1)
+    if show_labels is None:
+        show_labels = len(values) <= 24
+
+    parts = [f'<svg class="chart" viewBox="0 0 {width} {height}" xmlns="http://www.w3.org/2000/svg" role="img">']
+    zero = y(0)
+    for i, value in enumerate(values):
+        x = left + i * step + (step - bar_w) / 2
+        y_top = min(y(value), zero)
+        bar_h = max(abs(y(value) - zero), 0.5)
+        css = 'up' if value >= 0 else 'down'
+        parts.append(f'<rect class="{css}" x="{_n(x)}" y="{_n(y_top)}" width="{_n(bar_w)}" height="{_n(bar_h)}">'
+                     f'<title>{html.escape(titles[i])}</title></rect>')
+        if show_labels:
+            parts.append(f'<text x="{_n(x + bar_w / 2)}" y="{height - 6}" text-anchor="middle">{html.escape(str(labels[i]))}</text>')
+    parts.append(f'<line class="axis" x1="{left}" x2="{width - right}" y1="{_n(zero)}" y2="{_n(zero)}"/>')
+    parts.extend(_y_labels(left, low, high, y))
+    parts.append('</svg>')
+    return ''.join(parts)
+
+
+def line_chart(labels, values, width=640, height=260):
+    """Línea con área hasta el cero; extremos del eje x con la primera y última etiqueta"""
+    if not values:
+        return _empty_chart()
+    left, right, top, bottom = 56, 8, 8, 20
+    plot_w, plot_h = width - left - right, height - top - bottom
+    low, high = min(0, min(values)), max(0, max(values))
+    extent = (high - low) or 1
+    y = lambda value: top + (high - value) / extent * plot_h
+    step = plot_w / max(len(values) - 1, 1)
+    points = ' '.join(f'{_n(left + i * step)},{_n(y(value))}' for i, value in enumerate(values))
+    zero = _n(y(0))
+    last_x = _n(left + (len(values) - 1) * step)
+
+    parts = [f'<svg class="chart" viewBox="0 0 {width} {height}" xmlns="http://www.w3.org/2000/svg" role="img">',
+             f'<polygon class="area" points="{left},{zero} {points} {last_x},{zero}"/>',
+             f'<polyline class="line" points="{points}"><title>{html.escape(money(values[-1]))}</title></polyline>',
+             f'<line class="axis" x1="{left}" x2="{width - right}" y1="{zero}" y2="{zero}"/>',
+             f'<text x="{left}" y="{height - 6}">{html.escape(labels[0])}</text>',
+             f'<text x="{width - right}" y="{height - 6}" text-anchor="end">{html.escape(labels[-1])}</text>']
+    parts.extend(_y_labels(left, low, high, y))
+    parts.append('</svg>')
+    return ''.join(parts)
+
+
+def _y_labels(left, low, high, y):
+    values = [high, 0, low] if low < 0 < high else [high, low]
+    return [f'<text x="{left - 4}" y="{_n(y(value) + 3)}" text-anchor="end">{html.escape(f"{value:,.0f}")}</text>'
+            for value in values]
+
+
+def load_first_view(data_dir=DASHBOARD_DATA_DIR):
+    """Índice del dashboard y los días de todos sus bloques mensuales (ya generados)"""
+    with open(os.path.join(data_dir, 'index.json'), 'r', encoding='utf-8') as f:
+        index = json.load(f)
+    days = []
+    for entry in rows_of(index.get('months')):
+        try:
+            with open(os.path.join(data_dir, entry['chunk']), 'r', encoding='utf-8') as f:
+                days.extend(rows_of({k: v for k, v in json.load(f).items() if k != 'month'}))
+        except (OSError, ValueError):
+            continue
+    return index, days
+
+
+def render_metrics(stats):
+    total_pnl = stats.get('total_pnl', 0)
+    cards = [
+        ('Total P&L', money(total_pnl), pnl_class(total_pnl)),
+        ('Total Trades', f"{stats.get('total_trades', 0):,}", 'text-gray-800'),
+        ('Win Rate', f"{stats.get('win_rate', 0):.1f}%", 'text-gray-800'),
+        ('Daily Average', money(stats.get('daily_avg', 0)), 'text-gray-800'),
+    ]
+    return metric_cards(cards)
+
+
+def pnl_class(value):
+    return 'profit' if value > 0 else 'loss' if value < 0 else 'text-gray-800'
+
+
+def metric_cards(cards):
+    """Tarjetas [(título, valor ya formateado, clase de color)]"""
+    return ''.join(
+        f'<div class="bg-white rounded-lg shadow p-6"><h3 class="text-sm font-medium text-gray-500">{html.escape(title)}</h3>'
+        f'<p class="text-2xl font-bold mt-2 {css}">{html.escape(value)}</p></div>'
+        for title, value, css in cards
+    )
+
+
+def card(title, body):
+    return (f'<div class="bg-white rounded-lg shadow p-6"><h2 class="text-xl font-bold text-gray-800 mb-4">'
+            f'{html.escape(title)}</h2>{body}</div>')
+
+
+@traced('render.dashboard_static')
+def render_self_contained(index, days, generated_at=None):
+    """HTML completo del dashboard (una sola petición, sin recursos externos)"""
+    year = index.get('year') or datetime.now().year
+    stats = index.get('yearStats', {})
+    breakdowns = index.get('breakdowns', {})
+    months = rows_of(index.get('months'))
+    trading_days = [day for day in days if day.get('trades', 0) > 0]
+
+    daily_titles = [f"{day['date']}: {money(day['pnl'])}, {day['trades']} trades" for day in trading_days]
+    dates = [day['date'] for day in trading_days]
+    # Curva de equity reducida (LTTB) del índice; si falta, se acumula desde los días
+    equity = index.get('equity', {}).get('daily')
+    if equity:
+        equity_dates, cumulative = equity['date'], equity['equity']
+    else:
+        equity_dates, cumulative, running = dates, [], 0
+        for day in trading_days:
+            running += day['pnl']
+            cumulative.append(round(running, 2))
+
+    month_labels = [MONTH_NAMES[int(m['month'][5:7]) - 1] for m in months]
+    month_titles = [f"{m['month']}: {money(m['pnl'])}, {m['trades']} trades" for m in months]
+
+    def breakdown(name):
+        rows = rows_of(breakdowns.get(name))
+        return bar_chart([row['key'] for row in rows], [row['pnl'] for row in rows],
+                         [f"{row['key']}: {money(row['pnl'])}, {row['trades']} trades, "
+                          f"{row['winRate'] * 100:.0f}% win" for row in rows])
+
+    # Año contra año (solo con más de un año de historial)
+    years = rows_of(index.get('yearOverYear'))
+    history = ''
+    if len(years) > 1:
+        all_time = index.get('allTime', {})
+        chart = bar_chart([str(row['year']) for row in years], [row['pnl'] for row in years],
+                          [f"{row['year']}: {money(row['pnl'])}, {row['trades']:,} trades" for row in years])
+        note = (f'<p class="text-gray-600 mt-2">All-time: {money(all_time.get("total_pnl", 0))} over '
+                f'{all_time.get("total_trades", 0):,} trades and {all_time.get("trading_days", 0)} trading days '
+                f'({all_time.get("first_day", "")} to {all_time.get("last_day", "")})</p>')
+        history = f'<div class="mt-8">{card("Year over Year", chart + note)}</div>'
+
+    calendar_data = {day['date']: {'trades': day['trades'], 'pnl': day['pnl']} for day in days}
+    if generated_at or not DETERMINISTIC:
+        footer_note = f"Generated on {generated_at or datetime.now().strftime('%Y-%m-%d %H:%M')} UTC"
+    else:
+        # Determinista: la página solo cambia cuando cambian los datos
+        footer_note = f"Data through {dates[-1] if dates else 'N/A'}"
+
+    body = f"""
+<div class="container mx-auto px-4 py-8">
+    <header class="text-center mb-8">
+        <h1 class="text-4xl font-bold text-gray-800 mb-2">Trading Dashboard</h1>
+        <p class="text-gray-600">PropReports Auto-Exporter Analytics</p>
+    </header>
+    <div class="grid grid-cols-1 md:grid-cols-4 gap-4 mb-8">{render_metrics(stats)}</div>
+    <div class="mb-8">{card(f'Trading Calendar {year}', '<div class="overflow-x-auto">' + generate_svg_calendar(calendar_data, year) + '</div>')}</div>
+    <div class="grid grid-cols-1 md:grid-cols-2 gap-4 mb-8">
+        {card('Daily P&L', bar_chart(dates, [day['pnl'] for day in trading_days], daily_titles))}
+        {card('Cumulative P&L', line_chart(equity_dates, cumulative))}
+    </div>
+    {card('Monthly Performance', bar_chart(month_labels, [m['pnl'] for m in months], month_titles))}
+    <div class="grid grid-cols-1 md:grid-cols-2 gap-4 mt-8">
+        {card('P&L by Hour', breakdown('byHour'))}
+        {card('P&L by Weekday', breakdown('byWeekday'))}
+    </div>
+    {history}
+</div>
+<footer class="text-center mt-8 text-gray-600">
+    <p>{footer_note}</p>
+    <p class="mt-2"><a href="https://github.com/jefrnc/propreports-auto-exporter" class="text-blue-600 hover:underline">PropReports Auto-Exporter</a></p>
+</footer>
+"""
+    return render_page('Trading Dashboard - PropReports Auto-Exporter', body,
+                       {'dashboard-index': index})
+
+
+def render_page(title, body, embedded=None):
+    """
+    Documento HTML completo: cuerpo minificado, CSS purgado inline y, opcionalmente,
+    datos embebidos como <script type="application/json" id="..."> (uno por clave)
+    """
+    # El JSON embebido se agrega después de minificar para no tocar sus strings
+    scripts = ''.join(f'<script type="application/json" id="{key}">{inline_json(data)}</script>'
+                      for key, data in (embedded or {}).items())
+    body = f'<body class="bg-gray-100">{minify_html(body)}{scripts}</body>'
+    return ('<!DOCTYPE html><html lang="en"><head><meta charset="UTF-8">'
+            '<meta name="viewport" content="width=device-width, initial-scale=1.0">'
+            f'<title>{html.escape(title)}</title>'
+            f'<style>{purge_css(body)}</style></head>{body}</html>')
+
+
+def build_self_contained_dashboard(output_path='docs/index.html', data_dir=DASHBOARD_DATA_DIR):
+    """Genera docs/index.html autocontenido a partir de los datos ya escritos del dashboard"""
+    index, days = load_first_view(data_dir)
+    page = render_self_contained(index, days)
+    if write_text(output_path, page) and DETERMINISTIC:
+        record_stamps(output_path, {'generatedAt': now_stamp('%Y-%m-%d %H:%M')})
+    return output_path
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Reducción de puntos de curvas de equity para gráficos (LTTB)
+Graficar cada día o cada trade del historial hace crecer el JSON y el trabajo
+del navegador sin aportar detalle visible. Al generar los datos, cada curva se
+reduce con Largest-Triangle-Three-Buckets a un máximo de puntos por vista,
+conservando siempre:
+
+    - el máximo y el mínimo de la curva
+    - el pico y el valle de los drawdowns más profundos
+
+para que la forma, los extremos y las caídas que importan no se suavicen.
+
+Variables de entorno:
+    PROPREPORTS_CHART_MAX_POINTS  puntos máximos por serie/vista (por defecto 500)
+"""
+
+import os
+from array import array
+
+MIN_POINTS = 10
+MAX_POINTS = max(MIN_POINTS, int(os.getenv('PROPREPORTS_CHART_MAX_POINTS', '500')))
+
+
+def lttb(values, threshold):
+    """
+    Índices elegidos por LTTB sobre la serie (x = posición)
+
+    Conserva el primero y el último; de cada bucket intermedio toma el punto
+    que forma el triángulo de mayor área con el elegido anterior y el
+    promedio del bucket siguiente.
+    """
+    n = len(values)
+    if threshold >= n or threshold < 3:
+        return list(range(n))
+
+    every = (n - 2) / (threshold - 2)
+    selected = [0]
+    a = 0
+    for i in range(threshold - 2):
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        next_end = min(int((i + 2) * every) + 1, n)
+        if end >= next_end:
+            avg_x, avg_y = n - 1, values[n - 1]
+        else:
+            avg_x = (end + next_end - 1) / 2
+            avg_y = sum(values[end:next_end]) / (next_end - end)
+
+        ax, ay = a, values[a]
+        best, best_area = start, -1.0
+        for j in range(start, min(end, n - 1)):
+            area = abs((ax - avg_x) * (values[j] - ay) - (ax - j) * (avg_y - ay))
+            if area > best_area:
+                best, best_area = j, area
+        selected.append(best)
+        a = best
+    selected.append(n - 1)
+    return selected
+
+
+def drawdowns(values):
+    """Episodios de drawdown (profundidad, índice del pico, índice del valle), más profundo primero"""
+    episodes = []
+    peak = trough = 0
+    for i in range(1, len(values)):
+        if values[i] >= values[peak]:
+            if values[trough] < values[peak]:
+                episodes.append((values[peak] - values[trough], peak, trough))
+            peak = trough = i
+        elif values[i] < values[trough]:
+            trough = i
+    if values and values[trough] < values[peak]:
+        episodes.append((values[peak] - values[trough], peak, trough))
+    episodes.sort(key=lambda episode: -episode[0])
+    return episodes
+
+
+def anchor_indices(values, max_points):
+    """Puntos que LTTB no puede descartar: extremos y picos/valles de los peores drawdowns"""
+    if not values:
+        return set()
+    keep = {0, len(values) - 1}
+    keep.add(max(range(len(values)), key=values.__getitem__))
+    keep.add(min(range(len(values)), key=values.__getitem__))
+    # Hasta ~10% del presupuesto para drawdowns (pico + valle cada uno)
+    for _, peak, trough in drawdowns(values)[:max(1, max_points // 20)]:
+        keep.update((peak, trough))
+    return keep
+
+
+def downsample(values, max_points=None):
+    """Índices ordenados (≤ max_points) que representan la serie"""
+    max_points = max(MIN_POINTS, max_points or MAX_POINTS)
+    n = len(values)
+    if n <= max_points:
+        return list(range(n))
+    keep = anchor_indices(values, max_points)
+    selected = set(lttb(values, max(3, max_points - len(keep)))) | keep
+    return sorted(selected)
+
+
+class EquitySeries:
+    """
+    Curva de equity acumulada punto a punto (por día o por trade)
+
+    Los valores van en un array de doubles: un año de trades son unos pocos
+    cientos de KB aunque la serie tenga cientos de miles de puntos.
+    """
+
+    def __init__(self, x_field='x'):
+        self.x_field = x_field
+        self.x = []
+        self.equity = array('d')
+        self.total = 0.0
+
+    def __len__(self):
+        return len(self.equity)
+
+    def add(self, x, pnl):
+        self.total += pnl
+        self.x.append(x)
+        self.equity.append(self.total)
+
+    def view(self, max_points=None):
+        """Serie reducida en columnas {x_field, equity} más el total de puntos original"""
+        indices = downsample(self.equity, max_points)
+        return {
+            self.x_field: [self.x[i] for i in indices],
+            'equity': [round(self.equity[i], 2) for i in indices],
+            'points': len(self.equity)
+        }
+
+
+def equity_views(daily, trades, max_points=None):
+    """Vistas multi-resolución (por día y por trade), cada una con como mucho max_points"""
+    max_points = max(MIN_POINTS, max_points or MAX_POINTS)
+    return {
+        'maxPoints': max_points,
+        'daily': daily.view(max_points),
+        'trades': trades.view(max_points)
+    }
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Estrategia de descarga por bloques de fechas con división adaptativa
+Pide varios días a report.php en una sola petición; si la petición hace
+timeout o la tabla llega truncada, divide el rango a la mitad y combina
+los resultados. El tamaño de bloque se aprende por cuenta y se persiste.
+"""
+
+import os
+import time
+import threading
+from datetime import datetime, timedelta
+from state_store import load_state, save_state
+from checkpoint import account_key
+
+CHUNK_STATE_FILE = "chunk_sizes.json"
+
+# Errores de get_trades_page que indican una petición demasiado grande
+SPLITTABLE_ERRORS = ('timeout', 'overloaded')
+
+
+def is_truncated(html_content, rows_found, max_rows):
+    """Detecta una respuesta cortada: tabla sin cerrar o en el límite de filas"""
+    if 'class="report"' in html_content and '</table>' not in html_content:
+        return True
+    return max_rows > 0 and rows_found >= max_rows
+
+
+def split_into_chunks(dates, chunk_days):
+    """Agrupa fechas consecutivas en bloques de como mucho chunk_days días"""
+    chunks = []
+    current = []
+    for date_str in dates:
+        if current:
+            previous = datetime.strptime(current[-1], '%Y-%m-%d')
+            contiguous = datetime.strptime(date_str, '%Y-%m-%d') - previous == timedelta(days=1)
+            if not contiguous or len(current) >= chunk_days:
+                chunks.append(current)
+                current = []
+        current.append(date_str)
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+class ChunkedFetcher:
+    """Descarga bloques de días y aprende el tamaño de bloque de cada cuenta"""
+
+    def __init__(self, exporter):
+        self.exporter = exporter
+        self.account = account_key(exporter.username)
+        self.min_days = 1
+        self.max_days = int(os.getenv('PROPREPORTS_MAX_CHUNK_DAYS', '31'))
+        self.fast_seconds = float(os.getenv('PROPREPORTS_FAST_SECONDS', '10'))
+        self.max_rows = int(os.getenv('PROPREPORTS_MAX_ROWS', '0'))
+        self.lock = threading.Lock()
+
+        state = load_state(CHUNK_STATE_FILE, {})
+        initial = int(os.getenv('PROPREPORTS_CHUNK_DAYS', '7'))
+        self.chunk_days = state.get(self.account, {}).get('chunkDays', initial)
+        self.chunk_days = min(max(self.chunk_days, self.min_days), self.max_days)
+
+    def _shrink(self, span_days):
+        with self.lock:
+            self.chunk_days = max(self.min_days, min(self.chunk_days, span_days // 2))
+
+    def _grow(self, span_days):
+        # Solo crece si el bloque usado era del tamaño actual (evita crecer con bloques cortos)
+        with self.lock:
+            if span_days >= self.chunk_days:
+                self.chunk_days = min(self.max_days, self.chunk_days * 2)
+
+    def fetch_chunk(self, dates):
+        """
+        Descarga un bloque de fechas consecutivas
+
+        Returns:
+            (trades_por_fecha, fechas_fallidas)
+        """
+        started = time.monotonic()
+        html_content = self.exporter.get_trades_page(dates[0], dates[-1])
+        elapsed = time.monotonic() - started
+
+        oversized = False
+        trades = []
+        if html_content:
+            trades = self.exporter.parse_trades_html(html_content)
+            oversized = is_truncated(html_content, len(trades), self.max_rows)
+        elif self.exporter.last_error in SPLITTABLE_ERRORS:
+            oversized = True
+
+        if html_content and oversized and len(dates) == 1:
+            # Un solo día no se puede dividir más: usar lo que llegó
+            print(f"  ⚠️  Respuesta posiblemente truncada para {dates[0]}")
+            oversized = False
+
+        if html_content and not oversized:
+            if elapsed < self.fast_seconds:
+                self._grow(len(dates))
+            trades_by_date = {date_str: [] for date_str in dates}
+            for trade in trades:
+                if trade.get('date') in trades_by_date:
+                    trades_by_date[trade['date']].append(trade)
+            return trades_by_date, set()
+
+        if oversized and len(dates) > 1:
+            # Dividir el rango por la mitad y combinar resultados
+            print(f"  ✂️  Dividiendo {dates[0]}..{dates[-1]} ({len(dates)} días)")
+            self._shrink(len(dates))
+            middle = len(dates) // 2
+            left, left_failed = self.fetch_chunk(dates[:middle])
+            right, right_failed = self.fetch_chunk(dates[middle:])
+            left.update(right)
+            return left, left_failed | right_failed
+
+        return {}, set(dates)
+
+    def save(self):
+        """
+        Persiste el tamaño de bloque aprendido para la cuenta
+
+        Solo escribe si el tamaño cambió y sin hora: el estado se commitea con
+        exports/, así una ejecución sin cambios no deja diff. Devuelve True si escribió.
+        """
+        state = load_state(CHUNK_STATE_FILE, {})
+        entry = {'chunkDays': self.chunk_days}
+        if state.get(self.account) == entry:
+            return False
+        state[self.account] = entry
+        save_state(CHUNK_STATE_FILE, state)
+        return True
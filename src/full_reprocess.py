@@ -9,6 +9,11 @@ from datetime import datetime, timedelta
 from advanced_exporter import reprocess_recent_days, export_date_range
 from weekly_summary import generate_weekly_summary
 from monthly_summary import generate_monthly_summary
+from trade_cube import load_cube
+from aggregates import load_aggregates
+from checkpoint import RunJournal, account_key
+from tracing import finish_run
+from metrics import enable_metrics, write_textfile
 
 def get_weeks_in_range(start_date, end_date):
     """Obtiene todas las semanas en un rango de fechas"""
@@ -38,35 +43,71 @@ def get_months_in_range(start_date, end_date):
     
     return sorted(months)
 
-def full_reprocess(days_back=60):
+def full_reprocess(days_back=60, resume=False):
     """
     Reprocesa días, genera resúmenes semanales y mensuales automáticamente
+    
+    El progreso se registra en un journal; con resume=True se continúa la
+    última ejecución incompleta saltando días, semanas y meses ya terminados.
     """
+    username = os.getenv('PROPREPORTS_USER', 'ZIMDASE9C64')
     end_date = datetime.now()
     start_date = end_date - timedelta(days=days_back)
     
+    journal = RunJournal(
+        f"reprocess_{account_key(username)}_{days_back}",
+        resume=resume,
+        params={'start': start_date.strftime('%Y-%m-%d'), 'end': end_date.strftime('%Y-%m-%d')}
+    )
+    
+    if journal.resumed:
+        # Mantener el mismo período de la ejecución original
+        start_date = datetime.strptime(journal.params['start'], '%Y-%m-%d')
+        end_date = datetime.strptime(journal.params['end'], '%Y-%m-%d')
+        print(f"♻️  Reanudando reprocesamiento iniciado el {journal.data['createdAt']}")
+    
     print(f"🚀 Reprocesamiento completo de {days_back} días")
     print(f"📅 Período: {start_date.strftime('%Y-%m-%d')} hasta {end_date.strftime('%Y-%m-%d')}")
     print("=" * 50)
     
     # 1. Exportar todos los días
     print("\n📊 FASE 1: Exportando datos diarios...")
-    exported_files = export_date_range(start_date, end_date, force_update=True)
+    if journal.is_phase_done('export'):
+        print("⏭️  Fase ya completada según el journal")
+        exported_files = []
+    else:
+        exported_files = export_date_range(start_date, end_date, force_update=True, journal=journal)
+        # Un login fallido deja todos los días pendientes como fallidos: la fase no se da por hecha
+        if not journal.failed_days():
+            journal.mark_phase('export')
     print(f"✅ Exportados {len(exported_files)} archivos diarios")
     
+    # Los resúmenes solo se dan por terminados si no quedan días con error;
+    # si no, al reanudar se regeneran con los días reintentados
+    checkpoint_steps = not journal.failed_days()
+    
+    # Un solo cubo y unos agregados sincronizados para todas las semanas y meses
+    cube = load_cube()
+    aggregates = load_aggregates()
+    
     # 2. Generar resúmenes semanales
     print("\n📊 FASE 2: Generando resúmenes semanales...")
     weeks = get_weeks_in_range(start_date, end_date)
     weekly_count = 0
     
     for week_start in weeks:
+        week_key = week_start.strftime('%Y-%m-%d')
+        if journal.is_step_done('weekly', week_key):
+            continue
         try:
             # Solo generar si la semana ya terminó o es la actual
             week_end = week_start + timedelta(days=6)
             if week_end <= end_date or week_start <= end_date:
                 print(f"  📅 Procesando semana del {week_start.strftime('%Y-%m-%d')}...")
-                generate_weekly_summary(week_start)
+                generate_weekly_summary(week_start, cube=cube, aggregates=aggregates)
                 weekly_count += 1
+                if checkpoint_steps:
+                    journal.mark_step('weekly', week_key)
         except Exception as e:
             print(f"  ⚠️  Error procesando semana {week_start}: {e}")
     
@@ -78,6 +119,9 @@ def full_reprocess(days_back=60):
     monthly_count = 0
     
     for year, month in months:
+        month_key = f"{year}-{month:02d}"
+        if journal.is_step_done('monthly', month_key):
+            continue
         try:
             # Solo generar si el mes ya terminó o es el actual
             current_month = datetime.now().month
@@ -85,8 +129,10 @@ def full_reprocess(days_back=60):
             
             if (year < current_year) or (year == current_year and month <= current_month):
                 print(f"  📅 Procesando {year}-{month:02d}...")
-                generate_monthly_summary(year, month)
+                generate_monthly_summary(year, month, cube=cube, aggregates=aggregates)
                 monthly_count += 1
+                if checkpoint_steps:
+                    journal.mark_step('monthly', month_key)
         except Exception as e:
             print(f"  ⚠️  Error procesando mes {year}-{month:02d}: {e}")
     
@@ -98,11 +144,21 @@ def full_reprocess(days_back=60):
     print(f"  - {len(exported_files)} días exportados")
     print(f"  - {weekly_count} resúmenes semanales")
     print(f"  - {monthly_count} resúmenes mensuales")
+    
+    if not journal.finish():
+        print(f"⚠️  Días con error: {', '.join(journal.failed_days())}")
+        print("   Ejecutar de nuevo con --resume para reintentarlos")
 
 if __name__ == "__main__":
-    if len(sys.argv) > 1:
-        days = int(sys.argv[1])
-        full_reprocess(days)
+    resume = '--resume' in sys.argv
+    args = [arg for arg in sys.argv[1:] if arg != '--resume']
+    
+    if args:
+        days = int(args[0])
+        enable_metrics()
+        full_reprocess(days, resume=resume)
+        finish_run('full_reprocess')
+        write_textfile(run='full_reprocess')
     else:
-        print("Uso: python full_reprocess.py <días>")
+        print("Uso: python full_reprocess.py <días> [--resume]")
         print("Ejemplo: python full_reprocess.py 60")
\ No newline at end of file
@@ -4,9 +4,14 @@ Generador de calendario de trading estilo GitHub contributions
 """
 
 import os
+import io
 import json
 from datetime import datetime, timedelta
 from collections import defaultdict
+from build_cache import BuildCache, year_paths
+from year_rollups import load_rollups, default_year
+from tracing import span, traced
+from stable_output import write_bytes, write_text
 
 def load_json_file(filepath):
     """Carga un archivo JSON de forma segura"""
@@ -16,131 +21,155 @@ def load_json_file(filepath):
     except:
         return None
 
-def get_year_data(year):
-    """Obtiene todos los datos de trading de un año"""
-    daily_data = {}
-    
-    # Cargar todos los archivos diarios del año
-    start_date = datetime(year, 1, 1)
-    end_date = datetime(year, 12, 31)
-    
-    current = start_date
-    while current <= end_date:
-        date_str = current.strftime('%Y-%m-%d')
-        filepath = f"exports/daily/{date_str}.json"
-        
-        if os.path.exists(filepath):
-            data = load_json_file(filepath)
-            if data:
-                daily_data[date_str] = {
-                    'trades': data['summary']['totalTrades'],
-                    'pnl': data['summary']['netPnL'],
-                    'winRate': data['summary']['winningTrades'] / data['summary']['totalTrades'] if data['summary']['totalTrades'] > 0 else 0
-                }
-        
-        current += timedelta(days=1)
-    
-    return daily_data
+def get_year_data(year, rollups=None):
+    """Obtiene los totales diarios de trading de un año (desde los agregados por año)"""
+    rollups = rollups or load_rollups()
+    return rollups.day_totals(year)
 
-def generate_svg_calendar(year_data, year):
-    """Genera un calendario SVG estilo GitHub contributions"""
+# Buckets de color por P&L: clase CSS y color de cada rango (ver pnl_bucket)
+PNL_BUCKETS = (
+    ('b0', '#ebedf0'),  # Gris - sin trades
+    ('b1', '#196127'),  # Verde muy oscuro - gran ganancia
+    ('b2', '#239a3b'),  # Verde oscuro
+    ('b3', '#7bc96f'),  # Verde claro
+    ('b4', '#c6e48b'),  # Verde muy claro - breakeven
+    ('b5', '#ffeb3b'),  # Amarillo - pérdida pequeña
+    ('b6', '#ff9800'),  # Naranja - pérdida moderada
+    ('b7', '#f44336'),  # Rojo - pérdida grande
+)
+
+def pnl_bucket(pnl, trades):
+    """Índice en PNL_BUCKETS según P&L y cantidad de trades"""
+    if trades == 0:
+        return 0
+    elif pnl > 100:
+        return 1
+    elif pnl > 50:
+        return 2
+    elif pnl > 0:
+        return 3
+    elif pnl == 0:
+        return 4
+    elif pnl > -50:
+        return 5
+    elif pnl > -100:
+        return 6
+    else:
+        return 7
+
+def get_color_for_pnl(pnl, trades):
+    """Determina el color basado en P&L y cantidad de trades"""
+    return PNL_BUCKETS[pnl_bucket(pnl, trades)][1]
+
+def write_svg_calendar(out, year_data, year):
+    """
+    Escribe un calendario SVG estilo GitHub contributions en un stream de texto
+    
+    Cada día es un <use> de la misma celda definida en <defs> y su color sale
+    de una clase CSS por bucket de P&L; solo los días con trades llevan
+    tooltip (<title>).
+    """
     # Configuración
     cell_size = 11
     cell_gap = 2
     month_label_height = 20
     day_label_width = 30
+    step = cell_size + cell_gap
     
     # Calcular dimensiones
     weeks = 53
-    width = day_label_width + (weeks * (cell_size + cell_gap))
-    height = month_label_height + (7 * (cell_size + cell_gap))
-    
-    # Iniciar SVG
-    svg = f'<svg width="{width}" height="{height}" xmlns="http://www.w3.org/2000/svg">\n'
-    svg += '<style>\n'
-    svg += '.day { stroke: #e1e4e8; stroke-width: 1px; }\n'
-    svg += '.day:hover { stroke: #000; stroke-width: 2px; }\n'
-    svg += '.month-label { font-size: 10px; fill: #586069; }\n'
-    svg += '.day-label { font-size: 9px; fill: #586069; }\n'
-    svg += '</style>\n'
+    width = day_label_width + (weeks * step)
+    height = month_label_height + (7 * step)
+    # Id por año: varios calendarios pueden ir inline en la misma página
+    cell_id = f"cal-{year}"
+    
+    write = out.write
+    write(f'<svg width="{width}" height="{height}" class="cal" xmlns="http://www.w3.org/2000/svg" '
+          f'xmlns:xlink="http://www.w3.org/1999/xlink">\n')
+    write('<style>\n')
+    write('.cal use { stroke: #e1e4e8; stroke-width: 1px; }\n')
+    write('.cal use:hover { stroke: #000; stroke-width: 2px; }\n')
+    write('.cal .month-label { font-size: 10px; fill: #586069; }\n')
+    write('.cal .day-label { font-size: 9px; fill: #586069; }\n')
+    for css_class, color in PNL_BUCKETS:
+        write(f'.cal .{css_class} {{ fill: {color}; }}\n')
+    write('</style>\n')
+    write(f'<defs><rect id="{cell_id}" width="{cell_size}" height="{cell_size}"/></defs>\n')
     
     # Labels de días
     days = ['', 'Mon', '', 'Wed', '', 'Fri', '']
     for i, day in enumerate(days):
         if day:
-            y = month_label_height + (i * (cell_size + cell_gap)) + 9
-            svg += f'<text x="2" y="{y}" class="day-label">{day}</text>\n'
+            y = month_label_height + (i * step) + 9
+            write(f'<text x="2" y="{y}" class="day-label">{day}</text>\n')
     
-    # Labels de meses
+    # Generar celdas del calendario
     months = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
     month_positions = {}
-    
-    # Generar celdas del calendario
     start_date = datetime(year, 1, 1)
     start_weekday = start_date.weekday()
+    no_trades = {'trades': 0, 'pnl': 0}
     
-    for day_offset in range(366):  # Máximo días en un año
-        current_date = start_date + timedelta(days=day_offset)
-        if current_date.year != year:
-            break
-        
+    current_date = start_date
+    day_offset = 0
+    while current_date.year == year:
         date_str = current_date.strftime('%Y-%m-%d')
         week_num = (day_offset + start_weekday) // 7
-        day_of_week = current_date.weekday()
-        
+    
         # Guardar posición del primer día de cada mes
         if current_date.day == 1:
             month_positions[current_date.month] = week_num
-        
-        x = day_label_width + (week_num * (cell_size + cell_gap))
-        y = month_label_height + (day_of_week * (cell_size + cell_gap))
-        
-        # Determinar color basado en P&L
-        data = year_data.get(date_str, {'trades': 0, 'pnl': 0})
-        color = get_color_for_pnl(data['pnl'], data['trades'])
-        
-        # Tooltip con información
-        tooltip = f"{date_str}: {data['trades']} trades, P&L: ${data['pnl']:.2f}"
-        
-        svg += f'<rect x="{x}" y="{y}" width="{cell_size}" height="{cell_size}" '
-        svg += f'fill="{color}" class="day" data-date="{date_str}" '
-        svg += f'data-trades="{data["trades"]}" data-pnl="{data["pnl"]:.2f}">\n'
-        svg += f'<title>{tooltip}</title>\n'
-        svg += '</rect>\n'
+    
+        x = day_label_width + (week_num * step)
+        y = month_label_height + (current_date.weekday() * step)
+    
+        data = year_data.get(date_str, no_trades)
+        css_class = PNL_BUCKETS[pnl_bucket(data['pnl'], data['trades'])][0]
+        if data['trades']:
+            write(f'<use xlink:href="#{cell_id}" x="{x}" y="{y}" class="{css_class}">'
+                  f'<title>{date_str}: {data["trades"]} trades, P&amp;L: ${data["pnl"]:.2f}</title></use>\n')
+        else:
+            write(f'<use xlink:href="#{cell_id}" x="{x}" y="{y}" class="{css_class}"/>\n')
+    
+        current_date += timedelta(days=1)
+        day_offset += 1
     
     # Agregar labels de meses
     for month, week in month_positions.items():
-        x = day_label_width + (week * (cell_size + cell_gap))
-        svg += f'<text x="{x}" y="12" class="month-label">{months[month-1]}</text>\n'
+        x = day_label_width + (week * step)
+        write(f'<text x="{x}" y="12" class="month-label">{months[month-1]}</text>\n')
     
-    svg += '</svg>'
-    return svg
+    write('</svg>')
 
-def get_color_for_pnl(pnl, trades):
-    """Determina el color basado en P&L y cantidad de trades"""
-    if trades == 0:
-        return '#ebedf0'  # Gris - sin trades
-    elif pnl > 100:
-        return '#196127'  # Verde muy oscuro - gran ganancia
-    elif pnl > 50:
-        return '#239a3b'  # Verde oscuro
-    elif pnl > 0:
-        return '#7bc96f'  # Verde claro
-    elif pnl == 0:
-        return '#c6e48b'  # Verde muy claro - breakeven
-    elif pnl > -50:
-        return '#ffeb3b'  # Amarillo - pérdida pequeña
-    elif pnl > -100:
-        return '#ff9800'  # Naranja - pérdida moderada
-    else:
-        return '#f44336'  # Rojo - pérdida grande
+@traced('render.calendar_svg')
+def generate_svg_calendar(year_data, year):
+    """Genera un calendario SVG estilo GitHub contributions"""
+    out = io.StringIO()
+    write_svg_calendar(out, year_data, year)
+    return out.getvalue()
 
-def generate_markdown_calendar(year):
-    """Genera calendario en formato Markdown con estadísticas"""
-    year_data = get_year_data(year)
-    
-    # Generar SVG
-    svg = generate_svg_calendar(year_data, year)
+@traced('render.calendars')
+def render_calendars(rollups, years):
+    """
+    SVG del calendario de varios años en una pasada, desde los agregados por año
+    
+    Cada año se escribe a un buffer y el archivo solo se reescribe si el
+    contenido cambió (stable_output). Devuelve las rutas de todos los años.
+    """
+    os.makedirs('.github/assets', exist_ok=True)
+    paths = []
+    for year in years:
+        svg_path = f'.github/assets/calendar-{year}.svg'
+        paths.append(svg_path)
+        buffer = io.StringIO()
+        with span('render.calendar_svg', year=year):
+            write_svg_calendar(buffer, rollups.day_totals(year), year)
+        write_bytes(svg_path, buffer.getvalue().encode('utf-8'))
+    return paths
+
+def generate_markdown_calendar(year, rollups=None):
+    """Genera calendario en formato Markdown con estadísticas (el SVG lo escribe render_calendars)"""
+    year_data = get_year_data(year, rollups)
     
     # Calcular estadísticas
     stats = calculate_year_stats(year_data)
@@ -167,11 +196,6 @@ def generate_markdown_calendar(year):
     markdown += f"| **Worst Day** | ${stats['worst_day_pnl']:.2f} ({stats['worst_day']}) |\n"
     markdown += f"| **Daily Average** | ${stats['daily_avg']:.2f} |\n"
     
-    # Guardar SVG
-    os.makedirs('.github/assets', exist_ok=True)
-    with open(f'.github/assets/calendar-{year}.svg', 'w') as f:
-        f.write(svg)
-    
     return markdown, stats
 
 def calculate_year_stats(year_data):
@@ -250,6 +274,31 @@ def generate_monthly_breakdown(year):
     
     return markdown
 
+def generate_history_section(rollups, year):
+    """Tabla año contra año, totales históricos y calendarios de otros años (desde los agregados por año)"""
+    rows = rollups.year_over_year()
+    if len(rows) < 2:
+        return ""
+    
+    markdown = "\n### 🗓️ Year over Year\n\n"
+    markdown += "| Year | Trading Days | Trades | P&L | Win Rate | vs Previous |\n"
+    markdown += "|------|--------------|--------|-----|----------|-------------|\n"
+    for row in rows:
+        change = f"${row['change']:+,.2f}" if row['change'] is not None else "-"
+        markdown += (f"| {row['year']} | {row['tradingDays']} | {row['trades']:,} | **${row['pnl']:+,.2f}** | "
+                     f"{row['winRate']:.1f}% | {change} |\n")
+    all_time = rollups.all_time_stats()
+    markdown += (f"| **All-time** | {all_time['trading_days']} | {all_time['total_trades']:,} | "
+                 f"**${all_time['total_pnl']:+,.2f}** | {all_time['trade_win_rate']:.1f}% | |\n")
+    
+    others = [other for other in rollups.years() if other != year]
+    if others:
+        markdown += "\n<details>\n<summary>Previous calendars</summary>\n\n"
+        for other in reversed(others):
+            markdown += f"**{other}**\n\n![Trading Calendar {other}](.github/assets/calendar-{other}.svg)\n\n"
+        markdown += "</details>\n"
+    return markdown
+
 def update_readme_with_calendar(calendar_content):
     """Actualiza el README con el calendario"""
     readme_path = "README.md"
@@ -271,26 +320,58 @@ def update_readme_with_calendar(calendar_content):
             content[end_idx:]
         )
         
-        with open(readme_path, 'w', encoding='utf-8') as f:
-            f.write(new_content)
-        
-        print("✅ README actualizado con calendario")
+        if write_text(readme_path, new_content):
+            print("✅ README actualizado con calendario")
+        else:
+            print("⏭️  README sin cambios en calendario")
         return True
     else:
         print("⚠️  No se encontraron marcadores CALENDAR en el README")
         return False
 
-if __name__ == "__main__":
-    year = datetime.now().year
+@traced('generate.calendar')
+def build_calendar(year=None, force=False, update_readme=True):
+    """
+    Genera el SVG del calendario y actualiza el bloque CALENDAR del README
+    
+    Sin año se usa el actual, o el último con datos (en enero el año anterior
+    no desaparece). Debajo del año va la tabla año contra año con los totales
+    históricos y los calendarios de los otros años, que salen de los agregados
+    por año (year_rollups); todos los SVG se renderizan en una pasada desde
+    esos agregados y solo se reescriben los que cambiaron.
+    
+    Se salta si los archivos diarios y mensuales del año y los agregados de
+    los demás años no cambiaron. Devuelve el contenido Markdown generado, o
+    None si se saltó. Con update_readme=False el README queda para quien llama
+    (pipeline).
+    """
+    rollups = load_rollups()
+    year = year or default_year(rollups.years())
+    cache = BuildCache()
+    artifact = f"calendar:{year}"
+    inputs = year_paths(year, 'exports', kinds=('daily', 'monthly'))
+    other_years = [other for other in rollups.years() if other != year]
+    outputs = [f'.github/assets/calendar-{year}.svg'] + [f'.github/assets/calendar-{other}.svg' for other in other_years]
+    extra = rollups.signature()
+    if not force and cache.is_fresh(artifact, inputs, outputs, extra=extra):
+        print("⏭️  Calendario sin cambios")
+        return None
     
-    # Generar calendario y estadísticas
-    calendar_md, stats = generate_markdown_calendar(year)
+    # SVG de todos los años (solo se reescriben los que cambiaron), calendario y estadísticas
+    render_calendars(rollups, [year] + other_years)
+    calendar_md, stats = generate_markdown_calendar(year, rollups)
     
-    # Agregar breakdown mensual
+    # Agregar breakdown mensual e historial de otros años
     monthly_breakdown = generate_monthly_breakdown(year)
-    full_content = calendar_md + monthly_breakdown
-    
-    print(full_content)
+    full_content = calendar_md + monthly_breakdown + generate_history_section(rollups, year)
     
     # Actualizar README
-    update_readme_with_calendar(full_content)
\ No newline at end of file
+    if update_readme:
+        update_readme_with_calendar(full_content)
+    cache.record(artifact, inputs, outputs, extra=extra)
+    return full_content
+
+if __name__ == "__main__":
+    full_content = build_calendar()
+    if full_content:
+        print(full_content)
\ No newline at end of file
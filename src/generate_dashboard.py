@@ -3,20 +3,39 @@
 Generador de dashboard HTML para GitHub Pages
 """
 
-import os
+import sys
 import json
 from datetime import datetime, timedelta
-from generate_calendar import get_year_data, calculate_year_stats
+from year_rollups import load_rollups, default_year
+from stable_output import DETERMINISTIC, record_stamps, now_stamp, write_text
 
-def generate_html_dashboard():
-    """Genera un dashboard HTML completo con gráficos interactivos"""
+def generate_html_dashboard(self_contained=False):
+    """
+    Genera un dashboard HTML completo con gráficos interactivos
+    
+    Con self_contained=True la página no usa CDNs ni fetch: métricas, gráficos
+    (SVG) y CSS van inline (ver dashboard_static.py) y funciona offline.
+    """
     # Primero generar los datos
     from generate_dashboard_data import generate_dashboard_data
     generate_dashboard_data()
     
-    year = datetime.now().year
-    year_data = get_year_data(year)
-    stats = calculate_year_stats(year_data)
+    if self_contained:
+        from dashboard_static import build_self_contained_dashboard
+        path = build_self_contained_dashboard('docs/index.html')
+        print(f"✅ Dashboard HTML autocontenido generado en {path}")
+        return
+    
+    # Mismo año por defecto que index.json (el actual, o el último con datos)
+    rollups = load_rollups(sync=False)
+    year = default_year(rollups.years())
+    stats = rollups.year_stats(year)
+    
+    # En modo determinista la página no cambia si no cambian los datos
+    if DETERMINISTIC:
+        footer_note = f"Data through {stats['last_day'] or 'N/A'}"
+    else:
+        footer_note = f"Generated on {datetime.now().strftime('%Y-%m-%d %H:%M')} UTC"
     
     html = """<!DOCTYPE html>
 <html lang="en">
@@ -63,7 +82,7 @@ def generate_html_dashboard():
         
         <!-- Calendar Heatmap -->
         <div class="bg-white rounded-lg shadow p-6 mb-8">
-            <h2 class="text-xl font-bold text-gray-800 mb-4">Trading Calendar {current_year}</h2>
+            <h2 class="text-xl font-bold text-gray-800 mb-4">Trading Calendar """ + str(year) + """</h2>
             <div id="calendar" class="cal-heatmap-container"></div>
         </div>
         
@@ -78,34 +97,85 @@ def generate_html_dashboard():
                 <canvas id="cumulativePnlChart"></canvas>
             </div>
         </div>
+        <div class="text-center -mt-4 mb-8">
+            <button id="loadAllDays" class="hidden text-blue-600 hover:underline">Load full year</button>
+        </div>
         
         <!-- Monthly Breakdown -->
         <div class="bg-white rounded-lg shadow p-6">
             <h2 class="text-xl font-bold text-gray-800 mb-4">Monthly Performance</h2>
             <canvas id="monthlyChart"></canvas>
         </div>
+        
+        <!-- Breakdowns (trade cube) -->
+        <div class="grid grid-cols-1 md:grid-cols-2 gap-4 mt-8">
+            <div class="bg-white rounded-lg shadow p-6">
+                <h2 class="text-xl font-bold text-gray-800 mb-4">P&L by Hour</h2>
+                <canvas id="hourChart"></canvas>
+            </div>
+            <div class="bg-white rounded-lg shadow p-6">
+                <h2 class="text-xl font-bold text-gray-800 mb-4">P&L by Weekday</h2>
+                <canvas id="weekdayChart"></canvas>
+            </div>
+        </div>
+        
+        <!-- Year over Year (agregados por año) -->
+        <div id="yearsSection" class="hidden bg-white rounded-lg shadow p-6 mt-8">
+            <h2 class="text-xl font-bold text-gray-800 mb-4">Year over Year</h2>
+            <canvas id="yearsChart"></canvas>
+            <p id="allTime" class="text-gray-600 mt-4"></p>
+        </div>
     </div>
     
     <script>
-        // Load data from JSON file
-        fetch('dashboard-data.json')
+        // Índice pequeño primero; los días se cargan por mes bajo demanda
+        const DATA_BASE = 'data/dashboard/';
+        const INITIAL_MONTHS = 3;
+        const chunkCache = {};
+        let monthIndex = [];
+        let dailyCharts = [];
+        
+        // Bloques columnares (arrays paralelos) -> lista de objetos
+        function rowsOf(columns) {
+            const fields = Object.keys(columns || {});
+            if (!fields.length) return [];
+            return columns[fields[0]].map((_, i) => {
+                const row = {};
+                fields.forEach(field => { row[field] = columns[field][i]; });
+                return row;
+            });
+        }
+        
+        function loadMonth(entry) {
+            if (!chunkCache[entry.month]) {
+                chunkCache[entry.month] = fetch(DATA_BASE + entry.chunk)
+                    .then(response => response.json())
+                    .then(chunk => rowsOf({ date: chunk.date, trades: chunk.trades, pnl: chunk.pnl, winRate: chunk.winRate }));
+            }
+            return chunkCache[entry.month];
+        }
+        
+        function loadMonths(entries) {
+            return Promise.all(entries.map(loadMonth)).then(chunks => [].concat(...chunks));
+        }
+        
+        fetch(DATA_BASE + 'index.json')
             .then(response => response.json())
-            .then(data => {
-                initializeDashboard(data);
+            .then(index => {
+                initializeDashboard(index);
             })
             .catch(error => {
                 console.error('Error loading dashboard data:', error);
-                // Fallback to embedded data
-                const fallbackData = {
-                    yearData: """ + json.dumps(year_data) + """,
+                // Fallback: estadísticas embebidas al generar la página
+                initializeDashboard({
                     yearStats: """ + json.dumps(stats) + """
-                };
-                initializeDashboard(fallbackData);
+                });
             });
         
-        function initializeDashboard(data) {
-            const yearData = data.yearData || {};
-            const stats = data.yearStats || {};
+        function initializeDashboard(index) {
+            const stats = index.yearStats || {};
+            const breakdowns = index.breakdowns || {};
+            monthIndex = rowsOf(index.months);
             
             // Update metrics
             document.getElementById('totalPnl').textContent = '$' + (stats.total_pnl || 0).toFixed(2);
@@ -113,160 +183,223 @@ def generate_html_dashboard():
             document.getElementById('winRate').textContent = (stats.win_rate || 0).toFixed(1) + '%';
             document.getElementById('dailyAvg').textContent = '$' + (stats.daily_avg || 0).toFixed(2);
             
-            // Calendar Heatmap
-        const cal = new CalHeatmap();
-        const calData = {};
-        
-        Object.entries(yearData).forEach(([date, data]) => {
-            const timestamp = new Date(date).getTime() / 1000;
-            calData[timestamp] = data.pnl;
-        });
+            renderMonthlyChart(monthIndex);
+            renderEquityChart((index.equity || {}).daily || {});
+            breakdownChart('hourChart', rowsOf(breakdowns.byHour));
+            breakdownChart('weekdayChart', rowsOf(breakdowns.byWeekday));
+            renderYears(rowsOf(index.yearOverYear), index.allTime);
+            
+            // Gráficos diarios: solo los últimos meses hasta que se pida el año completo
+            const recent = monthIndex.slice(-INITIAL_MONTHS);
+            loadMonths(recent).then(renderDailyCharts);
+            const loadAll = document.getElementById('loadAllDays');
+            if (monthIndex.length > INITIAL_MONTHS) {
+                loadAll.classList.remove('hidden');
+                loadAll.addEventListener('click', () => {
+                    loadAll.disabled = true;
+                    loadMonths(monthIndex).then(days => {
+                        renderDailyCharts(days);
+                        loadAll.classList.add('hidden');
+                    });
+                });
+            }
+            
+            // El calendario necesita todo el año: se carga al hacerse visible
+            const calendarEl = document.getElementById('calendar');
+            const showCalendar = () => loadMonths(monthIndex).then(renderCalendar);
+            if ('IntersectionObserver' in window) {
+                const observer = new IntersectionObserver(entries => {
+                    if (entries.some(entry => entry.isIntersecting)) {
+                        observer.disconnect();
+                        showCalendar();
+                    }
+                });
+                observer.observe(calendarEl);
+            } else {
+                showCalendar();
+            }
+        }
         
-        cal.init({
-            domain: 'month',
-            subDomain: 'day',
-            data: calData,
-            start: new Date(""" + str(year) + """, 0, 1),
-            cellSize: 15,
-            range: 12,
-            legend: [-100, -50, 0, 50, 100],
-            legendColors: {
-                min: "#ef4444",
-                max: "#10b981",
-                empty: "#e5e7eb"
-            },
-            itemName: ["trade", "trades"],
-            subDomainTextFormat: "%d",
-            displayLegend: true,
-            tooltip: true,
-            onClick: function(date, value) {
-                const dateStr = new Date(date).toISOString().split('T')[0];
-                const data = yearData[dateStr];
-                if (data) {
-                    alert(`${dateStr}\\nTrades: ${data.trades}\\nP&L: $${data.pnl.toFixed(2)}`);
+        function breakdownChart(canvasId, rows) {
+            new Chart(document.getElementById(canvasId), {
+                type: 'bar',
+                data: {
+                    labels: rows.map(row => row.key),
+                    datasets: [{
+                        label: 'P&L',
+                        data: rows.map(row => row.pnl),
+                        backgroundColor: rows.map(row => row.pnl >= 0 ? '#10b981' : '#ef4444')
+                    }]
+                },
+                options: {
+                    responsive: true,
+                    plugins: { legend: { display: false } },
+                    scales: { y: { title: { display: true, text: 'P&L ($)' } } }
                 }
-            }
-        });
+            });
+        }
         
-        // Daily P&L Chart
-        const dailyDates = Object.keys(yearData).filter(date => yearData[date].trades > 0);
-        const dailyPnl = dailyDates.map(date => yearData[date].pnl);
+        function renderYears(years, allTime) {
+            if (years.length < 2) return;
+            document.getElementById('yearsSection').classList.remove('hidden');
+            breakdownChart('yearsChart', years.map(row => ({ key: String(row.year), pnl: row.pnl })));
+            document.getElementById('allTime').textContent =
+                `All-time: $${allTime.total_pnl.toFixed(2)} over ${allTime.total_trades.toLocaleString()} trades ` +
+                `and ${allTime.trading_days} trading days (${allTime.first_day} to ${allTime.last_day})`;
+        }
         
-        new Chart(document.getElementById('dailyPnlChart'), {
-            type: 'bar',
-            data: {
-                labels: dailyDates,
-                datasets: [{
-                    label: 'Daily P&L',
-                    data: dailyPnl,
-                    backgroundColor: dailyPnl.map(pnl => pnl >= 0 ? '#10b981' : '#ef4444')
-                }]
-            },
-            options: {
-                responsive: true,
-                plugins: {
-                    legend: { display: false }
+        function renderCalendar(days) {
+            const yearData = {};
+            days.forEach(day => { yearData[day.date] = day; });
+            const cal = new CalHeatmap();
+            const calData = {};
+            
+            days.forEach(day => {
+                const timestamp = new Date(day.date).getTime() / 1000;
+                calData[timestamp] = day.pnl;
+            });
+            
+            cal.init({
+                domain: 'month',
+                subDomain: 'day',
+                data: calData,
+                start: new Date(""" + str(year) + """, 0, 1),
+                cellSize: 15,
+                range: 12,
+                legend: [-100, -50, 0, 50, 100],
+                legendColors: {
+                    min: "#ef4444",
+                    max: "#10b981",
+                    empty: "#e5e7eb"
                 },
-                scales: {
-                    x: { display: false },
-                    y: {
-                        title: { display: true, text: 'P&L ($)' }
+                itemName: ["trade", "trades"],
+                subDomainTextFormat: "%d",
+                displayLegend: true,
+                tooltip: true,
+                onClick: function(date, value) {
+                    const dateStr = new Date(date).toISOString().split('T')[0];
+                    const data = yearData[dateStr];
+                    if (data) {
+                        alert(`${dateStr}\\nTrades: ${data.trades}\\nP&L: $${data.pnl.toFixed(2)}`);
                     }
                 }
-            }
-        });
-        
-        // Cumulative P&L Chart
-        let cumulative = 0;
-        const cumulativePnl = dailyDates.map(date => {
-            cumulative += yearData[date].pnl;
-            return cumulative;
-        });
+            });
+        }
         
-        new Chart(document.getElementById('cumulativePnlChart'), {
-            type: 'line',
-            data: {
-                labels: dailyDates,
-                datasets: [{
-                    label: 'Cumulative P&L',
-                    data: cumulativePnl,
-                    borderColor: '#3b82f6',
-                    backgroundColor: 'rgba(59, 130, 246, 0.1)',
-                    fill: true
-                }]
-            },
-            options: {
-                responsive: true,
-                plugins: {
-                    legend: { display: false }
+        // Curva de equity del año ya reducida (LTTB) en index.json: no necesita los bloques
+        function renderEquityChart(equity) {
+            const points = equity.date ? rowsOf({ date: equity.date, equity: equity.equity }) : [];
+            new Chart(document.getElementById('cumulativePnlChart'), {
+                type: 'line',
+                data: {
+                    labels: points.map(point => point.date),
+                    datasets: [{
+                        label: 'Cumulative P&L',
+                        data: points.map(point => point.equity),
+                        borderColor: '#3b82f6',
+                        backgroundColor: 'rgba(59, 130, 246, 0.1)',
+                        pointRadius: 0,
+                        fill: true
+                    }]
                 },
-                scales: {
-                    x: { display: false },
-                    y: {
-                        title: { display: true, text: 'Cumulative P&L ($)' }
+                options: {
+                    responsive: true,
+                    plugins: {
+                        legend: { display: false }
+                    },
+                    scales: {
+                        x: { display: false },
+                        y: {
+                            title: { display: true, text: 'Cumulative P&L ($)' }
+                        }
                     }
                 }
-            }
-        });
-        
-        // Monthly Chart
-        const monthlyData = {};
-        Object.entries(yearData).forEach(([date, data]) => {
-            const month = date.substring(0, 7);
-            if (!monthlyData[month]) {
-                monthlyData[month] = { trades: 0, pnl: 0 };
-            }
-            monthlyData[month].trades += data.trades;
-            monthlyData[month].pnl += data.pnl;
-        });
-        
-        const months = Object.keys(monthlyData).sort();
-        const monthlyPnl = months.map(m => monthlyData[m].pnl);
-        const monthlyTrades = months.map(m => monthlyData[m].trades);
+            });
+        }
         
-        new Chart(document.getElementById('monthlyChart'), {
-            type: 'bar',
-            data: {
-                labels: months.map(m => {
-                    const [year, month] = m.split('-');
-                    return new Date(year, month - 1).toLocaleDateString('en', { month: 'short' });
-                }),
-                datasets: [{
-                    label: 'P&L',
-                    data: monthlyPnl,
-                    backgroundColor: monthlyPnl.map(pnl => pnl >= 0 ? '#10b981' : '#ef4444'),
-                    yAxisID: 'y'
-                }, {
-                    label: 'Trades',
-                    data: monthlyTrades,
-                    type: 'line',
-                    borderColor: '#6366f1',
-                    yAxisID: 'y1'
-                }]
-            },
-            options: {
-                responsive: true,
-                scales: {
-                    y: {
-                        type: 'linear',
-                        display: true,
-                        position: 'left',
-                        title: { display: true, text: 'P&L ($)' }
+        function renderDailyCharts(days) {
+            dailyCharts.forEach(chart => chart.destroy());
+            const tradingDays = days.filter(day => day.trades > 0);
+            const dailyDates = tradingDays.map(day => day.date);
+            const dailyPnl = tradingDays.map(day => day.pnl);
+            
+            // Daily P&L Chart
+            const dailyChart = new Chart(document.getElementById('dailyPnlChart'), {
+                type: 'bar',
+                data: {
+                    labels: dailyDates,
+                    datasets: [{
+                        label: 'Daily P&L',
+                        data: dailyPnl,
+                        backgroundColor: dailyPnl.map(pnl => pnl >= 0 ? '#10b981' : '#ef4444')
+                    }]
+                },
+                options: {
+                    responsive: true,
+                    plugins: {
+                        legend: { display: false }
                     },
-                    y1: {
-                        type: 'linear',
-                        display: true,
-                        position: 'right',
-                        title: { display: true, text: 'Trades' },
-                        grid: { drawOnChartArea: false }
+                    scales: {
+                        x: { display: false },
+                        y: {
+                            title: { display: true, text: 'P&L ($)' }
+                        }
                     }
                 }
-            }
-        });
+            });
+            
+            dailyCharts = [dailyChart];
+        }
+        
+        // Monthly Chart (totales del índice, sin cargar bloques)
+        function renderMonthlyChart(months) {
+            const monthlyPnl = months.map(m => m.pnl);
+            const monthlyTrades = months.map(m => m.trades);
+            
+            new Chart(document.getElementById('monthlyChart'), {
+                type: 'bar',
+                data: {
+                    labels: months.map(m => {
+                        const [year, month] = m.month.split('-');
+                        return new Date(year, month - 1).toLocaleDateString('en', { month: 'short' });
+                    }),
+                    datasets: [{
+                        label: 'P&L',
+                        data: monthlyPnl,
+                        backgroundColor: monthlyPnl.map(pnl => pnl >= 0 ? '#10b981' : '#ef4444'),
+                        yAxisID: 'y'
+                    }, {
+                        label: 'Trades',
+                        data: monthlyTrades,
+                        type: 'line',
+                        borderColor: '#6366f1',
+                        yAxisID: 'y1'
+                    }]
+                },
+                options: {
+                    responsive: true,
+                    scales: {
+                        y: {
+                            type: 'linear',
+                            display: true,
+                            position: 'left',
+                            title: { display: true, text: 'P&L ($)' }
+                        },
+                        y1: {
+                            type: 'linear',
+                            display: true,
+                            position: 'right',
+                            title: { display: true, text: 'Trades' },
+                            grid: { drawOnChartArea: false }
+                        }
+                    }
+                }
+            });
+        }
     </script>
     
     <footer class="text-center mt-8 text-gray-600">
-        <p>Generated on """ + datetime.now().strftime('%Y-%m-%d %H:%M') + """ UTC</p>
+        <p>""" + footer_note + """</p>
         <p class="mt-2">
             <a href="https://github.com/jefrnc/propreports-auto-exporter" class="text-blue-600 hover:underline">
                 PropReports Auto-Exporter
@@ -277,11 +410,12 @@ def generate_html_dashboard():
 </html>"""
     
     # Guardar dashboard
-    os.makedirs('docs', exist_ok=True)
-    with open('docs/index.html', 'w') as f:
-        f.write(html)
-    
-    print("✅ Dashboard HTML generado en docs/index.html")
+    if write_text('docs/index.html', html):
+        if DETERMINISTIC:
+            record_stamps('docs/index.html', {'generatedAt': now_stamp('%Y-%m-%d %H:%M')})
+        print("✅ Dashboard HTML generado en docs/index.html")
+    else:
+        print("⏭️  Dashboard HTML sin cambios")
 
 if __name__ == "__main__":
-    generate_html_dashboard()
\ No newline at end of file
+    generate_html_dashboard(self_contained='--self-contained' in sys.argv)
\ No newline at end of file
@@ -6,11 +6,25 @@ Genera datos JSON para el dashboard de GitHub Pages
 import os
 import json
 from datetime import datetime
-import glob
+from build_cache import BuildCache, year_paths, month_daily_paths
+from daily_store import iter_daily, daily_sources
+from aggregates import TopN
+from trade_cube import load_cube, hour_label, WEEKDAYS, DURATION_BUCKETS
+from trade_log import load_trade_log
+from year_rollups import load_rollups, default_year
+from dashboard_chunks import columnar, write_chunk, TOP_TRADE_FIELDS
+from downsample import EquitySeries, equity_views
+from tracing import traced
 
 # Get export directory from environment or use default
 EXPORT_DIR = os.getenv('EXPORT_OUTPUT_DIR', 'exports')
 
+# Índice y bloques que carga la página del dashboard
+DASHBOARD_DATA_DIR = 'docs/data/dashboard'
+DAY_FIELDS = ('date', 'trades', 'pnl', 'winRate')
+BREAKDOWN_FIELDS = ('key', 'trades', 'pnl', 'winRate')
+YEAR_FIELDS = ('year', 'tradingDays', 'trades', 'pnl', 'winRate', 'profitDaysPct', 'dailyAvg', 'change')
+
 def load_json_file(filepath):
     """Carga un archivo JSON de forma segura"""
     try:
@@ -19,23 +33,15 @@ def load_json_file(filepath):
     except:
         return None
 
+@traced('io.read')
 def get_year_data(year):
-    """Obtiene todos los datos del año"""
+    """Obtiene todos los datos del año (días sueltos y archivados)"""
     year_data = {}
     
-    # Buscar todos los archivos diarios del año
-    pattern = f"{EXPORT_DIR}/daily/{year}-*.json"
-    for filepath in sorted(glob.glob(pattern)):
-        # Extraer fecha del nombre del archivo
-        filename = os.path.basename(filepath)
-        date = filename.replace('.json', '')
-        
-        # Skip position and cash files
-        if '_positions' in filename or '_cash' in filename:
-            continue
-            
-        data = load_json_file(filepath)
-        if data and 'summary' in data:
+    # Todos los días exportados del año (los archivos _positions/_cash no son días)
+    dates = sorted(d for d in daily_sources(EXPORT_DIR) if d.startswith(f"{year}-"))
+    for date, data in iter_daily(dates, EXPORT_DIR):
+        if 'summary' in data:
             year_data[date] = {
                 'trades': data['summary'].get('totalTrades', 0),
                 'pnl': data['summary'].get('netPnL', 0),
@@ -93,22 +99,82 @@ def calculate_year_stats(year_data):
         'daily_avg': round(total_pnl / trading_days, 2) if trading_days > 0 else 0
     }
 
-def calculate_enhanced_metrics(year_data):
-    """Calcula métricas adicionales para el dashboard"""
-    all_trades = []
+@traced('metrics.enhanced')
+def calculate_enhanced_metrics(year_data, equity=None, trade_log=None):
+    """
+    Calcula métricas adicionales para el dashboard
+    
+    Recorre los días de uno en uno desde el log de trades (fold en streaming,
+    un solo mmap en lugar de un archivo por día): la memoria depende del top 10
+    y del día más grande, no de la cantidad de trades del año.
+    Si se pasa `equity` (EquitySeries), se le agrega el neto de cada trade en orden.
+    """
     total_gross_profit = 0
     total_gross_loss = 0
     total_fees = 0
+    trade_count = 0
+    
+    biggest_win = 0
+    biggest_loss = 0
+    current_streak = 0
+    max_win_streak = 0
+    max_loss_streak = 0
+    last_trade_type = None
+    
+    trade_net = lambda x: x.get('net', x.get('pnl', 0))
+    winners = TopN(10, key=trade_net)
+    losers = TopN(10, key=lambda x: -trade_net(x))
     
-    # Recopilar todos los trades del año
-    for date, day_data in year_data.items():
-        daily_file = f"{EXPORT_DIR}/daily/{date}.json"
-        if os.path.exists(daily_file):
-            daily_data = load_json_file(daily_file)
-            if daily_data and 'trades' in daily_data:
-                all_trades.extend(daily_data['trades'])
+    # Días en orden cronológico y trades de cada día por hora de apertura
+    trade_log = trade_log or load_trade_log(base_dir=EXPORT_DIR)
+    for date, trades in trade_log.iter_days(sorted(year_data)):
+        for trade in sorted(trades, key=lambda x: (x['date'], x['opened'])):
+            trade_count += 1
+            pnl = trade.get('pnl', 0)
+            net = trade.get('net', pnl)
+            commission = trade.get('commission', 0)
+            
+            # Acumular comisiones
+            total_fees += commission
+            
+            if equity is not None:
+                equity.add(trade.get('openedTs'), net)
+            
+            # Profit factor calculation
+            if pnl > 0:
+                total_gross_profit += pnl
+            else:
+                total_gross_loss += abs(pnl)
+            
+            # Biggest win/loss
+            if net > biggest_win:
+                biggest_win = net
+            if net < biggest_loss:
+                biggest_loss = net
+            
+            # Streak calculation
+            if net > 0:
+                if last_trade_type == 'win':
+                    current_streak += 1
+                else:
+                    current_streak = 1
+                    last_trade_type = 'win'
+                max_win_streak = max(max_win_streak, current_streak)
+            elif net < 0:
+                if last_trade_type == 'loss':
+                    current_streak += 1
+                else:
+                    current_streak = 1
+                    last_trade_type = 'loss'
+                max_loss_streak = max(max_loss_streak, current_streak)
+            
+            # Top trades
+            if trade_net(trade) > 0:
+                winners.push(trade)
+            elif trade_net(trade) < 0:
+                losers.push(trade)
     
-    if not all_trades:
+    if not trade_count:
         return {
             'profit_factor': 0,
             'biggest_win': 0,
@@ -120,62 +186,9 @@ def calculate_enhanced_metrics(year_data):
             'current_streak_type': 'none'
         }
     
-    # Ordenar trades por fecha y hora
-    all_trades.sort(key=lambda x: (x['date'], x['opened']))
-    
-    # Calcular métricas
-    biggest_win = 0
-    biggest_loss = 0
-    current_streak = 0
-    max_win_streak = 0
-    max_loss_streak = 0
-    last_trade_type = None
-    
-    for trade in all_trades:
-        pnl = trade.get('pnl', 0)
-        net = trade.get('net', pnl)
-        commission = trade.get('commission', 0)
-        
-        # Acumular comisiones
-        total_fees += commission
-        
-        # Profit factor calculation
-        if pnl > 0:
-            total_gross_profit += pnl
-        else:
-            total_gross_loss += abs(pnl)
-        
-        # Biggest win/loss
-        if net > biggest_win:
-            biggest_win = net
-        if net < biggest_loss:
-            biggest_loss = net
-        
-        # Streak calculation
-        if net > 0:
-            if last_trade_type == 'win':
-                current_streak += 1
-            else:
-                current_streak = 1
-                last_trade_type = 'win'
-            max_win_streak = max(max_win_streak, current_streak)
-        elif net < 0:
-            if last_trade_type == 'loss':
-                current_streak += 1
-            else:
-                current_streak = 1
-                last_trade_type = 'loss'
-            max_loss_streak = max(max_loss_streak, current_streak)
-    
     # Calculate profit factor
     profit_factor = (total_gross_profit / total_gross_loss) if total_gross_loss > 0 else float('inf') if total_gross_profit > 0 else 0
     
-    # Get top trades
-    sorted_trades = sorted(all_trades, key=lambda x: x.get('net', x.get('pnl', 0)), reverse=True)
-    top_winners = [t for t in sorted_trades if t.get('net', t.get('pnl', 0)) > 0][:10]
-    top_losers = sorted([t for t in sorted_trades if t.get('net', t.get('pnl', 0)) < 0], 
-                       key=lambda x: x.get('net', x.get('pnl', 0)))[:10]
-    
     return {
         'profit_factor': round(profit_factor, 2) if profit_factor != float('inf') else 999.99,
         'biggest_win': round(biggest_win, 2),
@@ -185,25 +198,100 @@ def calculate_enhanced_metrics(year_data):
         'max_loss_streak': max_loss_streak,
         'current_streak': current_streak if last_trade_type else 0,
         'current_streak_type': last_trade_type or 'none',
-        'top_winners': top_winners,
-        'top_losers': top_losers
+        'top_winners': winners.items(),
+        'top_losers': losers.items()
     }
 
 
-def generate_dashboard_data():
-    """Genera un archivo JSON con todos los datos necesarios para el dashboard"""
-    year = datetime.now().year
+def calculate_breakdowns(cube, start, end):
+    """Desgloses del rango (símbolo, hora, día de la semana, lado, duración) desde el cubo"""
+    def rows(dim, label=str, order=None):
+        result = [
+            {'key': label(row[dim]), 'trades': row['trades'], 'pnl': row['netPnL'], 'winRate': row['winRate']}
+            for row in cube.rollup(start, end, by=(dim,))
+            if row[dim] not in (-1, '')
+        ]
+        if order:
+            result.sort(key=lambda row: order.index(row['key']))
+        return result
+    
+    by_symbol = rows('symbol')
+    by_symbol.sort(key=lambda row: row['pnl'], reverse=True)
+    return {
+        'bySymbol': by_symbol,
+        'byHour': rows('hour', hour_label),
+        'byWeekday': rows('weekday', lambda day: WEEKDAYS[day]),
+        'bySide': rows('side'),
+        'byDuration': rows('duration', order=DURATION_BUCKETS)
+    }
+
+
+def group_by_month(year_data):
+    """{fecha: día} -> {YYYY-MM: [(fecha, día), ...]} en orden cronológico"""
+    months = {}
+    for date_str in sorted(year_data):
+        months.setdefault(date_str[:7], []).append((date_str, year_data[date_str]))
+    return months
+
+
+def write_day_chunks(year_data, cache, force=False):
+    """
+    Un bloque columnar por mes con los días del año; solo se reescriben los
+    meses cuyos archivos diarios cambiaron. Devuelve la entrada del índice de cada mes.
+    """
+    entries = []
+    for month_key, days in group_by_month(year_data).items():
+        chunk_path = os.path.join(DASHBOARD_DATA_DIR, 'days', f"{month_key}.json")
+        artifact = f"dashboard-days:{month_key}"
+        year, month = int(month_key[:4]), int(month_key[5:7])
+        inputs = month_daily_paths(year, month, EXPORT_DIR)
+        if force or not cache.is_fresh(artifact, inputs, [chunk_path]):
+            rows = [dict(day, date=date_str) for date_str, day in days]
+            write_chunk(chunk_path, {'month': month_key, **columnar(rows, DAY_FIELDS)})
+            cache.record(artifact, inputs, [chunk_path])
+        entries.append({
+            'month': month_key,
+            'tradingDays': sum(1 for _, day in days if day['trades'] > 0),
+            'trades': sum(day['trades'] for _, day in days),
+            'pnl': round(sum(day['pnl'] for _, day in days), 2),
+            'chunk': f"days/{month_key}.json"
+        })
+    return entries
+
+
+def build_year_index(year, cube, cache, force=False, trade_log=None):
+    """
+    Índice de un año (index-YYYY.json) con sus bloques por mes y trades destacados
+    
+    Se salta si ningún archivo diario/semanal/mensual del año cambió; en ese
+    caso devuelve el índice ya escrito.
+    """
+    index_file = os.path.join(DASHBOARD_DATA_DIR, f"index-{year}.json")
+    artifact = f"dashboard-data:{year}"
+    inputs = year_paths(year, EXPORT_DIR)
+    if not force and cache.is_fresh(artifact, inputs, [index_file]):
+        existing = load_json_file(index_file)
+        if existing is not None:
+            return existing, False
     
     # Obtener datos del año
     year_data = get_year_data(year)
     stats = calculate_year_stats(year_data)
     
-    # Calcular métricas mejoradas
-    enhanced_metrics = calculate_enhanced_metrics(year_data)
+    # Calcular métricas mejoradas (y la curva de equity por trade)
+    trade_equity = EquitySeries('ts')
+    enhanced_metrics = calculate_enhanced_metrics(year_data, trade_equity, trade_log)
+    daily_equity = EquitySeries('date')
+    for date_str in sorted(year_data):
+        daily_equity.add(date_str, year_data[date_str]['pnl'])
     
     # Combinar todas las estadísticas
     stats.update(enhanced_metrics)
+    top_winners = stats.pop('top_winners', [])
+    top_losers = stats.pop('top_losers', [])
     
+    # Desgloses del año desde el cubo de agregados
+    breakdowns = calculate_breakdowns(cube, f"{year}-01-01", f"{year}-12-31")
     
     # Cargar resúmenes mensuales
     monthly_data = []
@@ -235,22 +323,82 @@ def generate_dashboard_data():
                     'winRate': data['summary']['winRate']
                 })
     
-    # Crear objeto de datos completo
-    dashboard_data = {
+    # Bloques por mes y trades destacados
+    months = write_day_chunks(year_data, cache, force)
+    top_trades = f"top-trades-{year}.json"
+    write_chunk(os.path.join(DASHBOARD_DATA_DIR, top_trades), {
+        'winners': columnar(top_winners, TOP_TRADE_FIELDS),
+        'losers': columnar(top_losers, TOP_TRADE_FIELDS)
+    })
+    
+    # Índice: tamaño acotado por meses/semanas, no por días ni trades
+    year_index = {
         'lastUpdate': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
         'year': year,
-        'yearData': year_data,
         'yearStats': stats,
-        'monthlyData': monthly_data,
-        'weeklyData': weekly_data
+        'breakdowns': {name: columnar(rows, BREAKDOWN_FIELDS) for name, rows in breakdowns.items()},
+        'monthlyData': columnar(monthly_data, ('month', 'monthName', 'trades', 'pnl', 'winRate')),
+        'weeklyData': columnar(weekly_data, ('week', 'period', 'trades', 'pnl', 'winRate')),
+        'months': columnar(months, ('month', 'tradingDays', 'trades', 'pnl', 'chunk')),
+        'equity': equity_views(daily_equity, trade_equity),
+        'topTrades': top_trades
     }
+    write_chunk(index_file, year_index)
+    cache.record(artifact, inputs, [index_file])
+    return year_index, True
+
+
+@traced('generate.dashboard_data')
+def generate_dashboard_data(force=False, years=None):
+    """
+    Genera los datos del dashboard en docs/data/dashboard
+    
+    Cada año con datos tiene su índice (index-YYYY.json) con lo necesario para
+    el primer render (estadísticas, desgloses, resúmenes mensuales/semanales,
+    la curva de equity reducida con LTTB y la lista de bloques); los días van
+    en un bloque columnar por mes (days/YYYY-MM.json) y los trades destacados
+    en top-trades-YYYY.json, que la página carga bajo demanda.
+    
+    index.json es el índice del año por defecto (el actual, o el último con
+    datos) más las estadísticas históricas y la tabla año contra año, que salen
+    de los agregados por año (year_rollups) sin releer el historial.
+    """
+    cube = load_cube()
+    rollups = load_rollups(cube)
+    available = rollups.years()
+    current = default_year(available)
+    years = sorted(set(years or available) | {current})
+    
+    cache = BuildCache()
+    trade_log = load_trade_log(base_dir=EXPORT_DIR)
+    rebuilt = []
+    year_indexes = {}
+    for year in years:
+        year_indexes[year], changed = build_year_index(year, cube, cache, force, trade_log)
+        if changed:
+            rebuilt.append(year)
+    
+    # index.json solo depende del índice del año por defecto y de los agregados por año
+    index_file = os.path.join(DASHBOARD_DATA_DIR, 'index.json')
+    current_file = os.path.join(DASHBOARD_DATA_DIR, f"index-{current}.json")
+    extra = f"{current}:{rollups.signature()}"
+    if not force and not rebuilt and cache.is_fresh("dashboard-data:index", [current_file], [index_file], extra=extra):
+        print("⏭️  Dashboard data sin cambios")
+        return
+    
+    dashboard_index = dict(
+        year_indexes[current],
+        years=available,
+        allTime=rollups.all_time_stats(),
+        yearOverYear=columnar(rollups.year_over_year(), YEAR_FIELDS)
+    )
     
     # Guardar en docs para GitHub Pages
-    os.makedirs('docs', exist_ok=True)
-    with open('docs/dashboard-data.json', 'w') as f:
-        json.dump(dashboard_data, f, indent=2)
+    write_chunk(index_file, dashboard_index)
+    cache.record("dashboard-data:index", [current_file], [index_file], extra=extra)
     
-    print("✅ Dashboard data generado en docs/dashboard-data.json")
+    print(f"✅ Dashboard data generado en {DASHBOARD_DATA_DIR} "
+          f"(años regenerados: {', '.join(map(str, rebuilt)) or 'ninguno'}; por defecto {current})")
 
 if __name__ == "__main__":
     generate_dashboard_data()
\ No newline at end of file
@@ -1,66 +1,93 @@
 #!/usr/bin/env python3
 """
 Genera datos JSON para cada mes individual
+Los días y los trades destacados se guardan en columnas (arrays paralelos) y
+cada archivo tiene sus variantes .gz/.br (ver dashboard_chunks). La curva de
+equity del mes (por día y por trade) va reducida con LTTB (ver downsample).
 """
 
 import os
-import json
 from datetime import datetime
+from build_cache import BuildCache, month_daily_paths
+from daily_store import iter_daily
+from aggregates import TopN
+from dashboard_chunks import columnar, write_chunk, TOP_TRADE_FIELDS
+from downsample import EquitySeries, equity_views
+from year_rollups import load_rollups
+from tracing import traced
 
-def load_json_file(filepath):
-    """Carga un archivo JSON de forma segura"""
-    try:
-        with open(filepath, 'r') as f:
-            return json.load(f)
-    except Exception as e:
-        print(f"Error cargando {filepath}: {e}")
-        return None
-
-def generate_monthly_data():
-    """Genera archivos JSON para cada mes con datos detallados"""
-    year = datetime.now().year
+@traced('generate.monthly_data')
+def generate_monthly_data(force=False, years=None, base_dir=None):
+    """
+    Genera archivos JSON para cada mes con datos detallados
     
-    # Crear directorio para datos mensuales
-    os.makedirs('docs/data/monthly', exist_ok=True)
+    Recorre todos los años con datos (según los agregados por año) más el
+    actual; los meses sin cambios se saltan por la caché de build. Los días se
+    leen de base_dir (por defecto EXPORT_OUTPUT_DIR o exports).
+    """
+    base_dir = base_dir or os.getenv('EXPORT_OUTPUT_DIR', 'exports')
+    if years is None:
+        years = sorted(set(load_rollups().years()) | {datetime.now().year})
+    cache = BuildCache()
     
-    # Procesar cada mes
-    for month in range(1, 13):
-        month_trades = []
-        month_data = {
-            'month': month,
-            'year': year,
-            'trades': [],
-            'dailyData': {},
-            'summary': {
-                'totalTrades': 0,
-                'totalPnL': 0,
-                'winRate': 0,
-                'bestDay': None,
-                'bestDayPnL': -float('inf'),
-                'worstDay': None,
-                'worstDayPnL': float('inf'),
-                'tradingDays': 0
+    for year in years:
+        # Procesar cada mes
+        for month in range(1, 13):
+            # Solo regenerar los meses cuyos archivos diarios cambiaron
+            month_file = f"docs/data/monthly/{year}-{month:02d}.json"
+            artifact = f"monthly-data:{year}-{month:02d}"
+            inputs = month_daily_paths(year, month, base_dir)
+            if not force and cache.is_fresh(artifact, inputs, [month_file]):
+                continue
+            
+            # Fold en streaming: solo contadores y los top 5, no todos los trades del mes
+            trade_net = lambda x: x.get('net', x.get('pnl', 0))
+            trade_count = 0
+            winning_count = 0
+            best = TopN(5, key=trade_net)
+            worst_losers = TopN(5, key=lambda x: -trade_net(x))
+            daily_rows = []
+            daily_equity = EquitySeries('date')
+            trade_equity = EquitySeries('ts')
+            month_data = {
+                'month': month,
+                'year': year,
+                'summary': {
+                    'totalTrades': 0,
+                    'totalPnL': 0,
+                    'winRate': 0,
+                    'bestDay': None,
+                    'bestDayPnL': -float('inf'),
+                    'worstDay': None,
+                    'worstDayPnL': float('inf'),
+                    'tradingDays': 0
+                }
             }
-        }
-        
-        # Recopilar todos los trades del mes
-        for day in range(1, 32):
-            try:
-                date_str = f"{year}-{month:02d}-{day:02d}"
-                daily_file = f"exports/daily/{date_str}.json"
-                
-                if os.path.exists(daily_file):
-                    daily_data = load_json_file(daily_file)
-                    if daily_data and daily_data.get('trades'):
+            
+            # Recorrer los días del mes de uno en uno
+            month_dates = [f"{year}-{month:02d}-{day:02d}" for day in range(1, 32)]
+            for date_str, daily_data in iter_daily(month_dates, base_dir):
+                try:
+                    if daily_data.get('trades'):
                         # Guardar datos diarios
-                        month_data['dailyData'][date_str] = {
+                        daily_rows.append({
+                            'date': date_str,
                             'trades': len(daily_data['trades']),
                             'pnl': daily_data['summary']['netPnL'],
                             'winRate': daily_data['summary'].get('winRate', 0)
-                        }
+                        })
                         
-                        # Agregar trades
-                        month_trades.extend(daily_data['trades'])
+                        daily_equity.add(date_str, daily_data['summary']['netPnL'])
+                        
+                        # Agregar trades (por hora de apertura para la curva de equity)
+                        for trade in sorted(daily_data['trades'], key=lambda x: (x.get('date', ''), x.get('opened', ''))):
+                            trade_count += 1
+                            trade_equity.add(trade.get('openedTs'), trade_net(trade))
+                            if trade_net(trade) > 0:
+                                winning_count += 1
+                            best.push(trade)
+                            if trade_net(trade) < 0:
+                                worst_losers.push(trade)
                         
                         # Actualizar resumen
                         month_data['summary']['totalTrades'] += len(daily_data['trades'])
@@ -75,27 +102,31 @@ def generate_monthly_data():
                         if daily_data['summary']['netPnL'] < month_data['summary']['worstDayPnL']:
                             month_data['summary']['worstDayPnL'] = daily_data['summary']['netPnL']
                             month_data['summary']['worstDay'] = date_str
-            except:
-                continue
-        
-        # Calcular win rate
-        if month_trades:
-            winning_trades = [t for t in month_trades if (t.get('net', t.get('pnl', 0))) > 0]
-            month_data['summary']['winRate'] = len(winning_trades) / len(month_trades) * 100
+                except:
+                    continue
+            
+            month_data['days'] = columnar(daily_rows, ('date', 'trades', 'pnl', 'winRate'))
+            month_data['equity'] = equity_views(daily_equity, trade_equity)
+            
+            # Calcular win rate
+            if trade_count:
+                month_data['summary']['winRate'] = winning_count / trade_count * 100
+                
+                # Top 5 winners y losers (con menos de 5 trades, solo los ganadores)
+                top_trades = best.items()
+                top_winners = top_trades if trade_count >= 5 else top_trades[:winning_count]
+                month_data['topWinners'] = columnar(top_winners, TOP_TRADE_FIELDS)
+                month_data['topLosers'] = columnar(worst_losers.items(), TOP_TRADE_FIELDS)
+            else:
+                # Sin días operados: ±Infinity no es JSON válido
+                month_data['summary']['bestDayPnL'] = None
+                month_data['summary']['worstDayPnL'] = None
             
-            # Ordenar trades por P&L
-            sorted_trades = sorted(month_trades, key=lambda x: x.get('net', x.get('pnl', 0)), reverse=True)
+            # Guardar archivo del mes (JSON compacto + .gz/.br)
+            write_chunk(month_file, month_data)
+            cache.record(artifact, inputs, [month_file])
             
-            # Top 5 winners y losers
-            month_data['topWinners'] = sorted_trades[:5] if len(sorted_trades) >= 5 else sorted_trades[:len([t for t in sorted_trades if t.get('net', t.get('pnl', 0)) > 0])]
-            month_data['topLosers'] = sorted([t for t in sorted_trades if t.get('net', t.get('pnl', 0)) < 0], key=lambda x: x.get('net', x.get('pnl', 0)))[:5]
-        
-        # Guardar archivo del mes
-        month_file = f"docs/data/monthly/{year}-{month:02d}.json"
-        with open(month_file, 'w') as f:
-            json.dump(month_data, f, indent=2)
-        
-        print(f"✅ Datos generados para {year}-{month:02d}")
+            print(f"✅ Datos generados para {year}-{month:02d}")
 
 if __name__ == "__main__":
     generate_monthly_data()
\ No newline at end of file
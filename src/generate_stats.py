@@ -5,9 +5,14 @@ Generador de estadísticas dinámicas para el README
 
 import os
 import json
-import glob
+import calendar
 from datetime import datetime, timedelta
 from collections import defaultdict
+from build_cache import BuildCache, year_paths
+from year_rollups import load_rollups
+from tracing import traced
+from stable_output import DETERMINISTIC, record_stamps, now_stamp, write_text
+from daily_store import iter_daily, date_range
 
 def load_json_file(filepath):
     """Carga un archivo JSON de forma segura"""
@@ -105,16 +110,11 @@ def calculate_period_stats(start_date, end_date):
     total_pnl = 0
     winning_trades = 0
     
-    current = start_date
-    while current <= end_date:
-        daily_file = f"exports/daily/{current.strftime('%Y-%m-%d')}.json"
-        if os.path.exists(daily_file):
-            data = load_json_file(daily_file)
-            if data and data.get('trades'):
-                total_trades += len(data['trades'])
-                total_pnl += data['summary']['netPnL']
-                winning_trades += data['summary']['winningTrades']
-        current += timedelta(days=1)
+    for _, data in iter_daily(date_range(start_date, end_date), 'exports'):
+        if data.get('trades'):
+            total_trades += len(data['trades'])
+            total_pnl += data['summary']['netPnL']
+            winning_trades += data['summary']['winningTrades']
     
     win_rate = f"{(winning_trades/total_trades*100):.1f}%" if total_trades > 0 else "0%"
     
@@ -124,32 +124,23 @@ def calculate_period_stats(start_date, end_date):
         'winRate': win_rate
     }
 
-def calculate_yearly_projection():
-    """Calcula proyección anual basada en el rendimiento hasta ahora"""
-    # Obtener todos los archivos mensuales del año actual
-    year = datetime.now().year
-    monthly_files = sorted(glob.glob(f"exports/monthly/{year}-*.json"))
-    
-    total_pnl = 0
-    total_trades = 0
-    months_with_data = 0
-    
-    for file in monthly_files:
-        data = load_json_file(file)
-        if data:
-            total_pnl += data['overview']['netPnL']
-            total_trades += data['overview']['totalTrades']
-            months_with_data += 1
-    
-    # Agregar mes actual
-    current_month_stats = get_current_month_stats()
-    total_pnl += current_month_stats['pnl']
-    total_trades += current_month_stats['trades']
+def calculate_yearly_projection(rollups=None):
+    """
+    Calcula proyección anual basada en el rendimiento hasta ahora
+    
+    Lo operado en el año sale de los agregados por año (year_rollups), que
+    incluyen el mes en curso; el año anterior se agrega para comparar.
+    """
+    rollups = rollups or load_rollups()
+    today = datetime.now()
+    year = today.year
+    current = rollups.year_stats(year)
+    total_pnl = current['total_pnl']
+    total_trades = current['total_trades']
     
     # Calcular días transcurridos vs días totales del año
-    today = datetime.now()
     days_passed = (today - datetime(year, 1, 1)).days + 1
-    days_in_year = 365 + (1 if year % 4 == 0 else 0)
+    days_in_year = 365 + (1 if calendar.isleap(year) else 0)
     
     # Proyección
     if days_passed > 0:
@@ -159,13 +150,18 @@ def calculate_yearly_projection():
         projected_pnl = daily_avg_pnl * days_in_year
         projected_trades = int(daily_avg_trades * days_in_year)
         
-        return {
+        projection = {
             'actual_pnl': round(total_pnl, 2),
             'projected_pnl': round(projected_pnl, 2),
             'actual_trades': total_trades,
             'projected_trades': projected_trades,
             'days_remaining': days_in_year - days_passed
         }
+        if rollups.year(year - 1):
+            last_year = rollups.year_stats(year - 1)
+            projection['last_year_pnl'] = last_year['total_pnl']
+            projection['last_year_trades'] = last_year['total_trades']
+        return projection
     
     return None
 
@@ -178,14 +174,14 @@ def format_pnl(value):
     else:
         return f"${value:,.2f}"
 
-def generate_stats_table():
+def generate_stats_table(rollups=None):
     """Genera la tabla de estadísticas en formato Markdown"""
     # Obtener todas las estadísticas
     current_week = get_current_week_stats()
     last_week = get_last_week_stats()
     current_month = get_current_month_stats()
     last_month = get_last_month_stats()
-    yearly = calculate_yearly_projection()
+    yearly = calculate_yearly_projection(rollups)
     
     # Generar tabla
     table = "### 📊 Live Trading Statistics\n\n"
@@ -203,16 +199,50 @@ def generate_stats_table():
     # Proyección anual
     if yearly:
         table += "\n#### 📈 Yearly Projection\n\n"
-        table += "| Metric | Actual YTD | Projected EOY |\n"
-        table += "|--------|------------|---------------|\n"
-        table += f"| **Trades** | {yearly['actual_trades']:,} | {yearly['projected_trades']:,} |\n"
-        table += f"| **P&L** | {format_pnl(yearly['actual_pnl'])} | {format_pnl(yearly['projected_pnl'])} |\n"
+        if 'last_year_pnl' in yearly:
+            table += "| Metric | Actual YTD | Projected EOY | Last Year |\n"
+            table += "|--------|------------|---------------|-----------|\n"
+            table += f"| **Trades** | {yearly['actual_trades']:,} | {yearly['projected_trades']:,} | {yearly['last_year_trades']:,} |\n"
+            table += f"| **P&L** | {format_pnl(yearly['actual_pnl'])} | {format_pnl(yearly['projected_pnl'])} | {format_pnl(yearly['last_year_pnl'])} |\n"
+        else:
+            table += "| Metric | Actual YTD | Projected EOY |\n"
+            table += "|--------|------------|---------------|\n"
+            table += f"| **Trades** | {yearly['actual_trades']:,} | {yearly['projected_trades']:,} |\n"
+            table += f"| **P&L** | {format_pnl(yearly['actual_pnl'])} | {format_pnl(yearly['projected_pnl'])} |\n"
         table += f"\n*Based on current performance with {yearly['days_remaining']} days remaining*\n"
     
-    table += f"\n*Last updated: {datetime.now().strftime('%Y-%m-%d %H:%M')} UTC*"
+    # En modo determinista la hora va a los metadatos de la ejecución (ver update_readme), no al README
+    if not DETERMINISTIC:
+        table += f"\n*Last updated: {datetime.now().strftime('%Y-%m-%d %H:%M')} UTC*"
     
     return table
 
+@traced('generate.readme_stats')
+def build_stats_table(force=False, update_readme_file=True):
+    """
+    Genera la tabla de estadísticas y actualiza el bloque STATS del README
+    
+    Las estadísticas dependen de los archivos del año (y del anterior en enero)
+    y de la fecha de hoy (semana/mes parciales, proyección); si nada cambió
+    devuelve None sin tocar el README.
+    """
+    today = datetime.now()
+    cache = BuildCache()
+    rollups = load_rollups()
+    inputs = year_paths(today.year, 'exports') + year_paths(today.year - 1, 'exports', kinds=('monthly',))
+    extra = f"{today.strftime('%Y-%m-%d')}:{rollups.signature()}"
+    if not force and cache.is_fresh("readme-stats", inputs, ["README.md"], extra=extra):
+        print("⏭️  Estadísticas del README sin cambios")
+        return None
+    
+    stats_table = generate_stats_table(rollups)
+    
+    # Actualizar README con estadísticas
+    if update_readme_file:
+        update_readme(stats_table)
+    cache.record("readme-stats", inputs, ["README.md"], extra=extra)
+    return stats_table
+
 def update_readme(stats_table):
     """Actualiza el README con las estadísticas"""
     readme_path = "README.md"
@@ -235,10 +265,12 @@ def update_readme(stats_table):
             content[end_idx:]
         )
         
-        with open(readme_path, 'w', encoding='utf-8') as f:
-            f.write(new_content)
-        
-        print("✅ README actualizado con estadísticas")
+        if write_text(readme_path, new_content):
+            if DETERMINISTIC:
+                record_stamps(readme_path, {'statsUpdated': now_stamp('%Y-%m-%d %H:%M')})
+            print("✅ README actualizado con estadísticas")
+        else:
+            print("⏭️  README sin cambios en estadísticas")
         return True
     else:
         print("⚠️  No se encontraron marcadores STATS en el README")
@@ -250,24 +282,16 @@ if __name__ == "__main__":
         print("❌ No se encontró el directorio exports")
         exit(1)
     
-    # Generar estadísticas
-    stats_table = generate_stats_table()
-    print("\n📊 Estadísticas generadas:")
-    print(stats_table)
-    
-    # Actualizar README con estadísticas
-    update_readme(stats_table)
+    stats_table = build_stats_table()
+    if stats_table:
+        print("\n📊 Estadísticas generadas:")
+        print(stats_table)
     
     # También generar calendario
     try:
-        from generate_calendar import generate_markdown_calendar, generate_monthly_breakdown, update_readme_with_calendar
-        
-        year = datetime.now().year
-        calendar_md, stats = generate_markdown_calendar(year)
-        monthly_breakdown = generate_monthly_breakdown(year)
-        full_calendar = calendar_md + monthly_breakdown
+        from generate_calendar import build_calendar
         
-        print("\n📅 Calendario generado")
-        update_readme_with_calendar(full_calendar)
+        if build_calendar():
+            print("\n📅 Calendario generado")
     except Exception as e:
         print(f"⚠️  Error generando calendario: {e}")
\ No newline at end of file
@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""
+Genera una página de detalle (JSON + HTML) por símbolo con todo su historial
+Usa el índice por símbolo (symbol_index.py) para leer solo los trades de cada
+símbolo y regenera únicamente los símbolos tocados por días nuevos o
+modificados; el trabajo se reparte en un pool de procesos.
+
+Salida:
+    docs/data/symbols/<SÍMBOLO>.json   resumen, días, equity reducida, desgloses y trades (columnar)
+    docs/data/symbols/index.json       lista de símbolos con sus totales
+    docs/symbols/<SÍMBOLO>.html        página autocontenida (SVG inline, sin CDNs)
+    docs/symbols/index.html            tabla de símbolos con enlaces
+"""
+
+import os
+import re
+import html
+from concurrent.futures import ProcessPoolExecutor
+from daily_store import load_daily
+from symbol_index import load_symbol_index
+from trade_cube import TradeCube, build_cells, finalize, MEASURES
+from aggregates import trade_net
+from downsample import EquitySeries, equity_views
+from dashboard_chunks import columnar, write_chunk, TOP_TRADE_FIELDS
+from generate_dashboard_data import calculate_breakdowns, BREAKDOWN_FIELDS
+from dashboard_static import render_page, metric_cards, card, bar_chart, line_chart, money, pnl_class
+from stable_output import write_text
+from tracing import span, traced, get_tracer
+
+EXPORT_DIR = os.getenv('EXPORT_OUTPUT_DIR', 'exports')
+SYMBOL_DATA_DIR = 'docs/data/symbols'
+SYMBOL_PAGES_DIR = 'docs/symbols'
+RECENT_TRADES = 50
+
+
+def symbol_slug(symbol):
+    """Nombre de archivo seguro para el símbolo (p. ej. 'BRK/B' -> 'BRK_B')"""
+    return re.sub(r'[^A-Za-z0-9._-]', '_', symbol)
+
+
+def symbol_paths(symbol):
+    slug = symbol_slug(symbol)
+    return os.path.join(SYMBOL_DATA_DIR, f"{slug}.json"), os.path.join(SYMBOL_PAGES_DIR, f"{slug}.html")
+
+
+def build_symbol_data(symbol, postings, base_dir=None):
+    """Lee los trades del símbolo (solo los offsets indexados de cada día) y arma sus datos"""
+    cube = TradeCube()
+    trades = []
+    daily_rows = []
+    daily_equity = EquitySeries('date')
+    trade_equity = EquitySeries('ts')
+    for date_str, offsets in postings.items():
+        data = load_daily(date_str, base_dir)
+        if data is None:
+            continue
+        day_trades = data.get('trades', [])
+        day_trades = sorted((day_trades[offset] for offset in offsets if offset < len(day_trades)),
+                            key=lambda x: x.get('opened', ''))
+        if not day_trades:
+            continue
+        cube.days[date_str] = {'source': None, 'cells': build_cells(day_trades)}
+        day_net = 0
+        for trade in day_trades:
+            day_net += trade_net(trade)
+            trade_equity.add(trade.get('openedTs'), trade_net(trade))
+        daily_equity.add(date_str, day_net)
+        daily_rows.append({
+            'date': date_str,
+            'trades': len(day_trades),
+            'pnl': round(day_net, 2),
+            'winRate': round(sum(1 for t in day_trades if trade_net(t) > 0) / len(day_trades), 4)
+        })
+        trades.extend(dict(trade, date=trade.get('date', date_str)) for trade in day_trades)
+
+    totals = cube.query().get((), [0] * len(MEASURES))
+    breakdowns = calculate_breakdowns(cube, None, None)
+    breakdowns.pop('bySymbol', None)
+    return {
+        'symbol': symbol,
+        'summary': dict(
+            finalize(totals),
+            tradingDays=len(daily_rows),
+            firstDate=daily_rows[0]['date'] if daily_rows else None,
+            lastDate=daily_rows[-1]['date'] if daily_rows else None
+        ),
+        'days': columnar(daily_rows, ('date', 'trades', 'pnl', 'winRate')),
+        'equity': equity_views(daily_equity, trade_equity),
+        'breakdowns': {name: columnar(rows, BREAKDOWN_FIELDS) for name, rows in breakdowns.items()},
+        'trades': columnar(trades, TOP_TRADE_FIELDS)
+    }, daily_rows, trades
+
+
+def render_symbol_page(data, daily_rows, trades):
+    summary = data['summary']
+    equity = data['equity']['daily']
+    by_hour = data['breakdowns'].get('byHour', {})
+    cards = [
+        ('Net P&L', money(summary['netPnL']), pnl_class(summary['netPnL'])),
+        ('Trades', f"{summary['trades']:,}", 'text-gray-800'),
+        ('Win Rate', f"{summary['winRate'] * 100:.1f}%", 'text-gray-800'),
+        ('Profit Factor', f"{summary['profitFactor']:.2f}", 'text-gray-800'),
+    ]
+    rows = ''.join(
+        f"<tr><td>{html.escape(str(t.get('date', '')))} {html.escape(str(t.get('opened', '')))}</td>"
+        f"<td>{html.escape(str(t.get('type', '')))}</td><td>{t.get('size', '')}</td>"
+        f"<td>{t.get('entry', '')}</td><td>{t.get('exit', '')}</td>"
+        f"<td class=\"{pnl_class(trade_net(t))}\">{money(trade_net(t))}</td></tr>"
+        for t in reversed(trades[-RECENT_TRADES:])
+    )
+    table = (f'<div class="overflow-x-auto"><table><tr><th>Opened</th><th>Side</th><th>Size</th>'
+             f'<th>Entry</th><th>Exit</th><th>Net</th></tr>{rows}</table></div>')
+    symbol = html.escape(data['symbol'])
+    body = f"""
+<div class="container mx-auto px-4 py-8">
+    <header class="text-center mb-8">
+        <h1 class="text-4xl font-bold text-gray-800 mb-2">{symbol}</h1>
+        <p class="text-gray-600">{summary['firstDate']} → {summary['lastDate']} · {summary['tradingDays']} trading days ·
+        <a href="index.html" class="text-blue-600 hover:underline">All symbols</a></p>
+    </header>
+    <div class="grid grid-cols-1 md:grid-cols-4 gap-4 mb-8">{metric_cards(cards)}</div>
+    <div class="grid grid-cols-1 md:grid-cols-2 gap-4 mb-8">
+        {card('Cumulative P&L', line_chart(equity['date'], equity['equity']))}
+        {card('Daily P&L', bar_chart([r['date'] for r in daily_rows], [r['pnl'] for r in daily_rows],
+                                     [f"{r['date']}: {money(r['pnl'])}, {r['trades']} trades" for r in daily_rows]))}
+    </div>
+    <div class="mb-8">{card('P&L by Hour', bar_chart(by_hour.get('key', []), by_hour.get('pnl', []),
+                                                     [f"{k}: {money(p)}" for k, p in zip(by_hour.get('key', []), by_hour.get('pnl', []))]))}</div>
+    {card(f'Last {min(RECENT_TRADES, len(trades))} trades', table)}
+</div>
+"""
+    return render_page(f"{data['symbol']} - Trading Dashboard", body)
+
+
+def write_symbol(symbol, postings, base_dir=None):
+    """Escribe JSON y HTML de un símbolo"""
+    with span('symbols.page', symbol=symbol):
+        data, daily_rows, trades = build_symbol_data(symbol, postings, base_dir)
+        data_path, page_path = symbol_paths(symbol)
+        write_chunk(data_path, data)
+        write_text(page_path, render_symbol_page(data, daily_rows, trades))
+
+
+def _build_symbol(task):
+    """Worker del pool: devuelve (símbolo, error, spans del worker para la traza del padre)"""
+    symbol, postings, base_dir = task
+    error = None
+    try:
+        write_symbol(symbol, postings, base_dir)
+    except Exception as e:
+        error = str(e)
+    return symbol, error, get_tracer().drain_events()
+
+
+def write_symbol_listing(index):
+    """Lista de todos los símbolos (JSON + HTML) desde los totales del índice"""
+    rows = []
+    for symbol in index.symbols:
+        totals = index.totals(symbol)
+        rows.append({
+            'symbol': symbol,
+            'trades': totals['trades'],
+            'netPnL': totals['netPnL'],
+            'winRate': totals['winRate'],
+            'tradingDays': totals['tradingDays'],
+            'page': f"{symbol_slug(symbol)}.html"
+        })
+    rows.sort(key=lambda row: row['netPnL'], reverse=True)
+    write_chunk(os.path.join(SYMBOL_DATA_DIR, 'index.json'),
+                columnar(rows, ('symbol', 'trades', 'netPnL', 'winRate', 'tradingDays', 'page')))
+
+    table_rows = ''.join(
+        f"<tr><td><a href=\"{html.escape(row['page'])}\" class=\"text-blue-600 hover:underline\">{html.escape(row['symbol'])}</a></td>"
+        f"<td>{row['trades']:,}</td><td>{row['tradingDays']}</td><td>{row['winRate'] * 100:.1f}%</td>"
+        f"<td class=\"{pnl_class(row['netPnL'])}\">{money(row['netPnL'])}</td></tr>"
+        for row in rows
+    )
+    body = f"""
+<div class="container mx-auto px-4 py-8">
+    <header class="text-center mb-8">
+        <h1 class="text-4xl font-bold text-gray-800 mb-2">Symbols</h1>
+        <p class="text-gray-600">{len(rows)} symbols · <a href="../index.html" class="text-blue-600 hover:underline">Dashboard</a></p>
+    </header>
+    {card('All symbols', '<div class="overflow-x-auto"><table><tr><th>Symbol</th><th>Trades</th><th>Days</th><th>Win Rate</th><th>Net P&L</th></tr>' + table_rows + '</table></div>')}
+</div>
+"""
+    write_text(os.path.join(SYMBOL_PAGES_DIR, 'index.html'), render_page('Symbols - Trading Dashboard', body))
+
+
+@traced('generate.symbol_pages')
+def generate_symbol_pages(force=False, workers=None, base_dir=None):
+    """
+    Regenera las páginas de los símbolos pendientes (o de todos con force)
+
+    Devuelve la lista de símbolos regenerados. Los que fallan quedan pendientes
+    para la próxima ejecución.
+    """
+    base_dir = base_dir or EXPORT_DIR
+    index = load_symbol_index(base_dir=base_dir)
+    symbols = set(index.symbols)
+
+    if force:
+        targets = symbols
+    else:
+        # Pendientes más los que no tienen página (p. ej. docs/ recién clonado)
+        targets = {s for s in index.pending if s in symbols}
+        targets |= {s for s in symbols if not all(os.path.exists(p) for p in symbol_paths(s))}
+
+    # Símbolos que ya no tienen trades en el historial
+    removed = [s for s in index.pending if s not in symbols]
+    for symbol in removed:
+        for path in symbol_paths(symbol):
+            for variant in (path, f"{path}.gz", f"{path}.br"):
+                if os.path.exists(variant):
+                    os.remove(variant)
+
+    listing_path = os.path.join(SYMBOL_PAGES_DIR, 'index.html')
+    if not targets and not removed and os.path.exists(listing_path):
+        print("⏭️  Páginas por símbolo sin cambios")
+        return []
+
+    postings = index.postings(targets)
+    tasks = [(symbol, postings.get(symbol, {}), base_dir) for symbol in sorted(targets)]
+    workers = workers or int(os.getenv('PIPELINE_WORKERS', '0')) or os.cpu_count() or 1
+    workers = min(workers, len(tasks)) or 1
+
+    done = []
+    if workers == 1:
+        # En serie, sin pool (y sin vaciar la traza de este proceso)
+        for symbol, postings_of, task_base in tasks:
+            try:
+                write_symbol(symbol, postings_of, task_base)
+                done.append(symbol)
+            except Exception as e:
+                print(f"⚠️  Error generando {symbol}: {e}")
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            chunksize = max(1, len(tasks) // (workers * 4))
+            for symbol, error, events in pool.map(_build_symbol, tasks, chunksize=chunksize):
+                get_tracer().merge(events)
+                if error:
+                    print(f"⚠️  Error generando {symbol}: {error}")
+                else:
+                    done.append(symbol)
+
+    write_symbol_listing(index)
+    index.mark_done(done + removed)
+    index.save()
+    print(f"✅ Páginas por símbolo: {len(done)} regeneradas ({workers} workers), {len(symbols)} en total")
+    return done
+
+
+if __name__ == "__main__":
+    import sys
+    generate_symbol_pages(force='--force' in sys.argv)
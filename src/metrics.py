@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+"""
+Métricas del pipeline en formato Prometheus/OpenMetrics
+Un registro de contadores, gauges e histogramas alimentado por los spans de
+tracing.py (login, report.php, parseo, escrituras, caché de build) que se
+escribe como textfile para el textfile collector de node_exporter al final de
+cada ejecución, y que en modo daemon también se sirve en /metrics.
+
+Variables de entorno:
+    PROPREPORTS_METRICS_FILE  ruta del textfile (p. ej. /var/lib/node_exporter/propreports.prom)
+    PROPREPORTS_METRICS_PORT  puerto de /metrics en modo watch
+"""
+
+import os
+import time
+import threading
+from tracing import add_listener, get_tracer
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+SIZE_BUCKETS = (1e3, 1e4, 1e5, 1e6, 1e7, 1e8)
+PARSE_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+
+OPENMETRICS_CONTENT_TYPE = 'application/openmetrics-text; version=1.0.0; charset=utf-8'
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labelnames, values, extra=None):
+    pairs = list(zip(labelnames, values)) + (extra or [])
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float):
+        value = round(value, 6)
+        if value.is_integer() and abs(value) < 1e15:
+            return str(int(value))
+    return repr(value)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+
+    def header(self, family):
+        return [f"# HELP {family} {self.help}", f"# TYPE {family} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def render(self, openmetrics):
+        # OpenMetrics nombra la familia sin _total; el formato de Prometheus, con el nombre completo
+        family = self.name if openmetrics else f"{self.name}_total"
+        lines = self.header(family)
+        with self._lock:
+            for key, value in sorted(self.values.items()):
+                lines.append(f"{self.name}_total{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class Gauge(_Metric):
+    kind = 'gauge'
+
+    def set(self, value, **labels):
+        with self._lock:
+            self.values[self._key(labels)] = value
+
+    def render(self, openmetrics):
+        lines = self.header(self.name)
+        with self._lock:
+            for key, value in sorted(self.values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, buckets, labelnames=()):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self.values.get(key)
+            if state is None:
+                state = self.values[key] = {'counts': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state['counts'][i] += 1
+                    break
+            state['sum'] += value
+            state['count'] += 1
+
+    def render(self, openmetrics):
+        lines = self.header(self.name)
+        with self._lock:
+            for key, state in sorted(self.values.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, state['counts']):
+                    cumulative += count
+                    labels = _format_labels(self.labelnames, key, [('le', _format_value(float(bound)))])
+                    lines.append(f"{self.name}_bucket{labels} {cumulative}")
+                labels = _format_labels(self.labelnames, key)
+                lines.append(f"{self.name}_count{labels} {state['count']}")
+                lines.append(f"{self.name}_sum{labels} {_format_value(round(state['sum'], 6))}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self, openmetrics=False):
+        lines = []
+        for metric in self.metrics:
+            if metric.values:
+                lines.extend(metric.render(openmetrics))
+        if openmetrics:
+            lines.append('# EOF')
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+LOGIN_SECONDS = REGISTRY.register(Histogram(
+    'propreports_login_duration_seconds', 'Latencia de login.php', LATENCY_BUCKETS))
+LOGINS = REGISTRY.register(Counter(
+    'propreports_logins', 'Intentos de login por resultado', ('result',)))
+REPORT_SECONDS = REGISTRY.register(Histogram(
+    'propreports_report_request_duration_seconds', 'Latencia de report.php', LATENCY_BUCKETS))
+REPORT_BYTES = REGISTRY.register(Histogram(
+    'propreports_report_response_bytes', 'Tamaño de las respuestas de report.php', SIZE_BUCKETS))
+REPORT_REQUESTS = REGISTRY.register(Counter(
+    'propreports_report_requests', 'Peticiones a report.php por status HTTP', ('status',)))
+ROWS_PARSED = REGISTRY.register(Counter(
+    'propreports_rows_parsed', 'Filas <tr> recorridas por el parser'))
+TRADES_VALID = REGISTRY.register(Counter(
+    'propreports_trades_valid', 'Trades válidos extraídos por el parser'))
+PARSE_SECONDS_PER_1K = REGISTRY.register(Histogram(
+    'propreports_parse_seconds_per_1k_rows', 'Segundos de parseo por cada 1000 filas', PARSE_BUCKETS))
+FILES_WRITTEN = REGISTRY.register(Counter(
+    'propreports_files_written', 'Archivos escritos'))
+BYTES_WRITTEN = REGISTRY.register(Counter(
+    'propreports_bytes_written', 'Bytes escritos en archivos'))
+CACHE_CHECKS = REGISTRY.register(Counter(
+    'propreports_build_cache_checks', 'Consultas a la caché de build por tipo de artefacto', ('kind', 'result')))
+CACHE_HIT_RATIO = REGISTRY.register(Gauge(
+    'propreports_build_cache_hit_ratio', 'Proporción de artefactos saltados por la caché en la ejecución'))
+SPAN_SECONDS = REGISTRY.register(Counter(
+    'propreports_span_seconds', 'Segundos acumulados por span', ('span',)))
+SPAN_CALLS = REGISTRY.register(Counter(
+    'propreports_span_calls', 'Llamadas por span', ('span',)))
+RUN_SECONDS = REGISTRY.register(Gauge(
+    'propreports_run_duration_seconds', 'Duración de la última ejecución', ('run',)))
+LAST_RUN = REGISTRY.register(Gauge(
+    'propreports_last_run_timestamp_seconds', 'Fin de la última ejecución (epoch)', ('run',)))
+
+_cache_totals = {'hit': 0, 'miss': 0}
+
+
+def _on_span(event):
+    """Convierte cada span cerrado en observaciones de métricas"""
+    name = event['name']
+    attrs = event['attrs']
+    duration = event['duration']
+    SPAN_SECONDS.inc(duration, span=name)
+    SPAN_CALLS.inc(span=name)
+
+    if name == 'http.login':
+        LOGIN_SECONDS.observe(duration)
+        LOGINS.inc(result='ok' if attrs.get('status') == 302 else 'error')
+    elif name == 'http.report':
+        REPORT_SECONDS.observe(duration)
+        REPORT_REQUESTS.inc(status=attrs.get('status', 'error'))
+        if 'bytes' in attrs:
+            REPORT_BYTES.observe(attrs['bytes'])
+    elif name == 'parse.trades':
+        rows = attrs.get('rows', 0)
+        ROWS_PARSED.inc(rows)
+        TRADES_VALID.inc(attrs.get('trades', 0))
+        if rows:
+            PARSE_SECONDS_PER_1K.observe(duration / rows * 1000)
+    elif name == 'io.write':
+        FILES_WRITTEN.inc()
+        try:
+            BYTES_WRITTEN.inc(os.path.getsize(attrs['path']))
+        except (KeyError, OSError):
+            pass
+    elif name == 'cache.check':
+        result = 'hit' if attrs.get('hit') else 'miss'
+        CACHE_CHECKS.inc(kind=attrs.get('artifact', '').split(':')[0], result=result)
+        _cache_totals[result] += 1
+        CACHE_HIT_RATIO.set(round(_cache_totals['hit'] / (_cache_totals['hit'] + _cache_totals['miss']), 4))
+
+
+def enable_metrics():
+    """Conecta el registro a los spans (llamar antes de ejecutar el trabajo)"""
+    add_listener(_on_span)
+
+
+def write_textfile(path=None, run='pipeline'):
+    """Escribe el textfile de forma atómica; no hace nada si no hay ruta configurada"""
+    path = path or os.getenv('PROPREPORTS_METRICS_FILE')
+    if not path:
+        return None
+    RUN_SECONDS.set(round(get_tracer().wall_seconds(), 3), run=run)
+    LAST_RUN.set(round(time.time(), 3), run=run)
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    # node_exporter lee el directorio en cualquier momento: escribir y renombrar
+    tmp_path = f"{path}.tmp.{os.getpid()}"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(REGISTRY.render())
+    os.replace(tmp_path, path)
+    print(f"📈 Métricas: {path}")
+    return path
+
+
+def serve_metrics(port=None, host='0.0.0.0'):
+    """Sirve /metrics en un hilo de fondo (modo daemon); devuelve el servidor o None"""
+    port = port if port is not None else int(os.getenv('PROPREPORTS_METRICS_PORT', '0'))
+    if not port:
+        return None
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def do_GET(self):
+            if self.path.split('?')[0] != '/metrics':
+                self.send_response(404)
+                self.end_headers()
+                return
+            openmetrics = 'application/openmetrics-text' in self.headers.get('Accept', '')
+            body = REGISTRY.render(openmetrics).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', OPENMETRICS_CONTENT_TYPE if openmetrics else PROMETHEUS_CONTENT_TYPE)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"📈 Métricas en http://{host}:{port}/metrics")
+    return server
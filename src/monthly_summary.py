@@ -5,12 +5,18 @@ Consolida todos los datos del mes para análisis profundo
 """
 
 import os
+import io
 import json
 import calendar
 from datetime import datetime, timedelta
-from collections import defaultdict
-import glob
+from build_cache import BuildCache, month_daily_paths, month_weekly_paths
+from tracing import traced
+from trade_cube import TradeCube, hour_label, load_cube
+from aggregates import load_aggregates, empty_bucket
+from stable_output import write_json, write_text
+from daily_store import iter_daily
 
+@traced('io.read')
 def load_weekly_summaries(year, month):
     """Carga todos los resúmenes semanales del mes"""
     base_dir = os.getenv('EXPORT_OUTPUT_DIR', 'exports')
@@ -30,10 +36,10 @@ def load_weekly_summaries(year, month):
     
     return weekly_files
 
+@traced('io.read')
 def load_all_daily_files(year, month):
-    """Carga todos los archivos diarios del mes"""
+    """Carga todos los archivos diarios del mes (sueltos o archivados)"""
     base_dir = os.getenv('EXPORT_OUTPUT_DIR', 'exports')
-    daily_dir = os.path.join(base_dir, "daily")
     
     all_trades = []
     daily_summaries = []
@@ -41,34 +47,32 @@ def load_all_daily_files(year, month):
     # Obtener primer y último día del mes
     first_day = 1
     last_day = calendar.monthrange(year, month)[1]
-    
-    for day in range(first_day, last_day + 1):
-        date_str = f"{year}-{month:02d}-{day:02d}"
-        file_path = os.path.join(daily_dir, f"{date_str}.json")
-        
-        if os.path.exists(file_path):
-            with open(file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                all_trades.extend(data.get('trades', []))
-                daily_summaries.append({
-                    'date': data.get('date'),
-                    'trades': data.get('summary', {}).get('totalTrades', 0),
-                    'pnl': data.get('summary', {}).get('netPnL', 0)
-                })
+    dates = [f"{year}-{month:02d}-{day:02d}" for day in range(first_day, last_day + 1)]
+    
+    for _, data in iter_daily(dates, base_dir):
+        all_trades.extend(data.get('trades', []))
+        daily_summaries.append({
+            'date': data.get('date'),
+            'trades': data.get('summary', {}).get('totalTrades', 0),
+            'pnl': data.get('summary', {}).get('netPnL', 0)
+        })
     
     return all_trades, daily_summaries
 
-def analyze_monthly_performance(trades, daily_summaries):
-    """Análisis profundo del desempeño mensual"""
+def analyze_monthly_performance(trades, daily_summaries, cube=None, start=None, end=None):
+    """
+    Análisis profundo del desempeño mensual
+    
+    Los desgloses por símbolo y por hora se leen del cubo de agregados
+    (trade_cube) para el rango start..end; sin cubo se arma uno en memoria.
+    """
+    cube = cube or TradeCube.from_trades(trades)
     analysis = {
         'profitability_curve': [],
         'drawdown_analysis': {},
         'consistency_metrics': {},
-        'symbol_performance': defaultdict(lambda: {
-            'trades': 0, 'pnl': 0, 'wins': 0, 'losses': 0,
-            'avg_win': 0, 'avg_loss': 0, 'win_rate': 0
-        }),
-        'time_analysis': defaultdict(lambda: {'trades': 0, 'pnl': 0}),
+        'symbol_performance': {},
+        'time_analysis': {},
         'risk_metrics': {}
     }
     
@@ -99,27 +103,21 @@ def analyze_monthly_performance(trades, daily_summaries):
         'max_drawdown_percent': round((max_drawdown / peak_pnl * 100), 2) if peak_pnl > 0 else 0
     }
     
-    # Análisis por símbolo
-    symbol_trades = defaultdict(list)
-    for trade in trades:
-        symbol = trade.get('symbol', 'UNKNOWN')
-        symbol_trades[symbol].append(trade)
-    
-    for symbol, trades_list in symbol_trades.items():
-        wins = [t for t in trades_list if t.get('pnl', 0) > 0]
-        losses = [t for t in trades_list if t.get('pnl', 0) < 0]
-        
-        analysis['symbol_performance'][symbol] = {
-            'trades': len(trades_list),
-            'pnl': round(sum(t.get('pnl', 0) for t in trades_list), 2),
-            'wins': len(wins),
-            'losses': len(losses),
-            'avg_win': round(sum(t['pnl'] for t in wins) / len(wins), 2) if wins else 0,
-            'avg_loss': round(sum(t['pnl'] for t in losses) / len(losses), 2) if losses else 0,
-            'win_rate': round(len(wins) / len(trades_list), 4) if trades_list else 0,
-            'expectancy': round((len(wins) / len(trades_list) * (sum(t['pnl'] for t in wins) / len(wins)) + 
-                                len(losses) / len(trades_list) * (sum(t['pnl'] for t in losses) / len(losses))), 2) if trades_list and wins and losses else 0
+    # Análisis por símbolo y por hora de apertura
+    for row in cube.rollup(start, end, by=('symbol',)):
+        analysis['symbol_performance'][row['symbol']] = {
+            'trades': row['trades'],
+            'pnl': row['pnl'],
+            'wins': row['wins'],
+            'losses': row['losses'],
+            'avg_win': row['avgWin'],
+            'avg_loss': row['avgLoss'],
+            'win_rate': row['winRate'],
+            'expectancy': row['expectancy']
         }
+    for row in cube.rollup(start, end, by=('hour',)):
+        if row['hour'] >= 0:
+            analysis['time_analysis'][hour_label(row['hour'])] = {'trades': row['trades'], 'pnl': row['pnl']}
     
     # Métricas de consistencia
     profitable_days = len([d for d in daily_summaries if d['pnl'] > 0])
@@ -150,28 +148,16 @@ def calculate_sharpe_ratio(returns, risk_free_rate=0):
     if not returns or len(returns) < 2:
         return 0
     
-    try:
-        import numpy as np
-        returns_array = np.array(returns)
-        avg_return = np.mean(returns_array)
-        std_dev = np.std(returns_array)
-        
-        if std_dev == 0:
-            return 0
-        
-        sharpe = (avg_return - risk_free_rate) / std_dev
-        return round(sharpe * np.sqrt(252), 2)  # Anualizado
-    except ImportError:
-        # Si no está numpy, calcular manualmente
-        avg_return = sum(returns) / len(returns)
-        variance = sum((x - avg_return) ** 2 for x in returns) / len(returns)
-        std_dev = variance ** 0.5
-        
-        if std_dev == 0:
-            return 0
-        
-        sharpe = (avg_return - risk_free_rate) / std_dev
-        return round(sharpe * (252 ** 0.5), 2)  # Anualizado
+    # Cálculo en Python puro: para un mes de trades es más rápido que importar numpy
+    avg_return = sum(returns) / len(returns)
+    variance = sum((x - avg_return) ** 2 for x in returns) / len(returns)
+    std_dev = variance ** 0.5
+    
+    if std_dev == 0:
+        return 0
+    
+    sharpe = (avg_return - risk_free_rate) / std_dev
+    return round(sharpe * (252 ** 0.5), 2)  # Anualizado
 
 def calculate_max_consecutive_losses(trades):
     """Calcula la máxima racha de pérdidas consecutivas"""
@@ -187,8 +173,18 @@ def calculate_max_consecutive_losses(trades):
     
     return max_losses
 
-def generate_monthly_summary(year=None, month=None):
-    """Genera resumen mensual completo"""
+@traced('summary.monthly')
+def generate_monthly_summary(year=None, month=None, force=False, cube=None, aggregates=None):
+    """
+    Genera resumen mensual completo
+    
+    Se salta si los archivos diarios del mes y los semanales que lo solapan
+    no cambiaron desde la última generación (salvo force=True).
+    Los totales salen de los agregados mensuales (`aggregates`) y los
+    desgloses de `cube`; quien genera varios meses pasa ambos ya
+    sincronizados. Si no se pasan se cargan y sincronizan aquí (la caché de
+    build solo mira los archivos diarios).
+    """
     # Si no se especifica, usar el mes actual
     if year is None or month is None:
         now = datetime.now()
@@ -196,6 +192,19 @@ def generate_monthly_summary(year=None, month=None):
         month = now.month
     
     month_name = calendar.month_name[month]
+    
+    base_dir = os.getenv('EXPORT_OUTPUT_DIR', 'exports')
+    monthly_dir = os.path.join(base_dir, "monthly")
+    filename = os.path.join(monthly_dir, f"{year}-{month:02d}.json")
+    
+    cache = BuildCache()
+    artifact = f"monthly:{year}-{month:02d}"
+    inputs = month_daily_paths(year, month, base_dir) + month_weekly_paths(year, month, base_dir)
+    outputs = [filename, filename.replace('.json', '.txt')]
+    if not force and cache.is_fresh(artifact, inputs, outputs):
+        print(f"⏭️  Resumen mensual sin cambios: {month_name} {year}")
+        return filename
+    
     print(f"📅 Generando resumen mensual: {month_name} {year}")
     
     # Cargar resúmenes semanales
@@ -208,14 +217,22 @@ def generate_monthly_summary(year=None, month=None):
         print("⚠️  No hay datos para este mes")
         return None
     
-    # Análisis profundo
-    performance_analysis = analyze_monthly_performance(all_trades, daily_summaries)
-    
-    # Calcular totales del mes
-    total_pnl = sum(t.get('pnl', 0) for t in all_trades)
-    total_commissions = sum(t.get('commission', 0) for t in all_trades)
-    winning_trades = [t for t in all_trades if t.get('pnl', 0) > 0]
-    losing_trades = [t for t in all_trades if t.get('pnl', 0) < 0]
+    # Análisis profundo (desgloses desde el cubo de agregados)
+    last_day = calendar.monthrange(year, month)[1]
+    performance_analysis = analyze_monthly_performance(
+        all_trades, daily_summaries, cube or load_cube(),
+        f"{year}-{month:02d}-01", f"{year}-{month:02d}-{last_day:02d}")
+    
+    # Totales del mes desde los agregados incrementales
+    aggregates = aggregates or load_aggregates()
+    totals = aggregates.monthly.get(f"{year}-{month:02d}") or empty_bucket()
+    total_pnl = totals['grossPnL']
+    total_commissions = totals['commissions']
+    total_trades = totals['trades']
+    winning_trades = totals['winningTrades']
+    losing_trades = totals['losingTrades']
+    win_pnl = totals['winPnL']
+    loss_pnl = totals['lossPnL']
     
     # Obtener top 10 trades (winners y losers)
     sorted_trades = sorted(all_trades, key=lambda x: x.get('pnl', 0), reverse=True)
@@ -231,19 +248,19 @@ def generate_monthly_summary(year=None, month=None):
         'account': all_trades[0].get('account', 'UNKNOWN') if all_trades else 'UNKNOWN',
         'overview': {
             'totalTradingDays': len(daily_summaries),
-            'totalTrades': len(all_trades),
+            'totalTrades': total_trades,
             'grossPnL': round(total_pnl, 2),
             'totalCommissions': round(total_commissions, 2),
             'netPnL': round(total_pnl - total_commissions, 2),
             'avgDailyPnL': round((total_pnl - total_commissions) / len(daily_summaries), 2) if daily_summaries else 0,
-            'winningTrades': len(winning_trades),
-            'losingTrades': len(losing_trades),
-            'winRate': round(len(winning_trades) / len(all_trades), 4) if all_trades else 0,
-            'avgWin': round(sum(t['pnl'] for t in winning_trades) / len(winning_trades), 2) if winning_trades else 0,
-            'avgLoss': round(sum(t['pnl'] for t in losing_trades) / len(losing_trades), 2) if losing_trades else 0,
-            'profitFactor': round(abs(sum(t['pnl'] for t in winning_trades) / sum(t['pnl'] for t in losing_trades)), 2) if losing_trades and sum(t['pnl'] for t in losing_trades) != 0 else 0,
-            'expectancy': round((len(winning_trades) / len(all_trades) * (sum(t['pnl'] for t in winning_trades) / len(winning_trades)) + 
-                                len(losing_trades) / len(all_trades) * (sum(t['pnl'] for t in losing_trades) / len(losing_trades))), 2) if all_trades and winning_trades and losing_trades else 0
+            'winningTrades': winning_trades,
+            'losingTrades': losing_trades,
+            'winRate': round(winning_trades / total_trades, 4) if total_trades else 0,
+            'avgWin': round(win_pnl / winning_trades, 2) if winning_trades else 0,
+            'avgLoss': round(loss_pnl / losing_trades, 2) if losing_trades else 0,
+            'profitFactor': round(abs(win_pnl / loss_pnl), 2) if losing_trades and loss_pnl != 0 else 0,
+            'expectancy': round((winning_trades / total_trades * (win_pnl / winning_trades) + 
+                                losing_trades / total_trades * (loss_pnl / losing_trades)), 2) if total_trades and winning_trades and losing_trades else 0
         },
         'performanceAnalysis': performance_analysis,
         'weeklyBreakdown': [
@@ -264,14 +281,9 @@ def generate_monthly_summary(year=None, month=None):
     monthly_summary['recommendations'] = generate_recommendations(performance_analysis, monthly_summary)
     
     # Guardar resumen mensual
-    base_dir = os.getenv('EXPORT_OUTPUT_DIR', 'exports')
-    monthly_dir = os.path.join(base_dir, "monthly")
     os.makedirs(monthly_dir, exist_ok=True)
     
-    filename = os.path.join(monthly_dir, f"{year}-{month:02d}.json")
-    
-    with open(filename, 'w', encoding='utf-8') as f:
-        json.dump(monthly_summary, f, indent=2, ensure_ascii=False)
+    write_json(filename, monthly_summary)
     
     print(f"✅ Resumen mensual generado: {filename}")
     print(f"📊 Resumen del mes: {monthly_summary['overview']['totalTrades']} trades, "
@@ -282,6 +294,7 @@ def generate_monthly_summary(year=None, month=None):
     
     # Generar reporte en texto plano también
     generate_text_report(monthly_summary, filename.replace('.json', '.txt'))
+    cache.record(artifact, inputs, outputs)
     
     return filename
 
@@ -334,7 +347,7 @@ def generate_recommendations(analysis, summary):
 
 def generate_text_report(summary, filename):
     """Genera un reporte en texto plano para fácil lectura"""
-    with open(filename, 'w', encoding='utf-8') as f:
+    with io.StringIO() as f:
         f.write(f"RESUMEN MENSUAL DE TRADING\n")
         f.write(f"{summary['monthName']} {summary['year']}\n")
         f.write("=" * 50 + "\n\n")
@@ -356,9 +369,22 @@ def generate_text_report(summary, filename):
         for rec in summary['recommendations']:
             emoji = {"critical": "🔴", "warning": "🟡", "suggestion": "🔵"}.get(rec['type'], "⚪")
             f.write(f"  {emoji} [{rec['area']}] {rec['message']}\n")
+        
+        write_text(filename, f.getvalue())
     
     print(f"📝 Reporte de texto generado: {filename}")
 
+def generate_default_monthly_summary(cube=None, aggregates=None):
+    """Genera el mes anterior en los primeros días del mes, o el actual en otro caso"""
+    today = datetime.now()
+    if today.day <= 5:  # Si estamos en los primeros días del mes
+        # Generar resumen del mes anterior
+        if today.month == 1:
+            return generate_monthly_summary(today.year - 1, 12, cube=cube, aggregates=aggregates)
+        return generate_monthly_summary(today.year, today.month - 1, cube=cube, aggregates=aggregates)
+    # Generar resumen del mes actual
+    return generate_monthly_summary(cube=cube, aggregates=aggregates)
+
 if __name__ == "__main__":
     import sys
     
@@ -366,16 +392,7 @@ if __name__ == "__main__":
         # Si se pasan año y mes como argumentos
         year = int(sys.argv[1])
         month = int(sys.argv[2])
-        generate_monthly_summary(year, month)
+        generate_monthly_summary(year, month, cube=load_cube(), aggregates=load_aggregates())
     else:
         # Por defecto, generar del mes anterior
-        today = datetime.now()
-        if today.day <= 5:  # Si estamos en los primeros días del mes
-            # Generar resumen del mes anterior
-            if today.month == 1:
-                generate_monthly_summary(today.year - 1, 12)
-            else:
-                generate_monthly_summary(today.year, today.month - 1)
-        else:
-            # Generar resumen del mes actual
-            generate_monthly_summary()
\ No newline at end of file
+        generate_default_monthly_summary(load_cube(), load_aggregates())
\ No newline at end of file
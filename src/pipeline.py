@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Orquestador del pipeline completo en un solo proceso
+Ejecuta exportación, reprocesamiento y resúmenes en orden, y después los
+generadores independientes (calendario, dashboard data, datos mensuales y
+estadísticas del README) en paralelo en un pool de procesos, y por último
+las páginas por símbolo de los símbolos con días nuevos.
+Al final imprime una tabla con el tiempo de cada etapa. Una etapa que falla
+no corta el resto, pero queda registrada y el pipeline termina con código 1.
+"""
+
+import os
+import time
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+from tracing import span, get_tracer
+from stable_output import start_run, flush_run_metadata
+
+
+def _run_generator(name):
+    """Ejecuta un generador dentro de un worker del pool y mide su duración
+
+    Devuelve también los spans del worker para unirlos a la traza del padre.
+    """
+    started = time.perf_counter()
+    result = None
+    error = None
+    try:
+        if name == 'calendar':
+            from generate_calendar import build_calendar
+            result = build_calendar(update_readme=False)
+        elif name == 'dashboard-data':
+            from generate_dashboard_data import generate_dashboard_data
+            generate_dashboard_data()
+        elif name == 'monthly-data':
+            from generate_monthly_data import generate_monthly_data
+            generate_monthly_data()
+        elif name == 'readme-stats':
+            from generate_stats import build_stats_table
+            result = build_stats_table(update_readme_file=False)
+    except Exception as e:
+        error = str(e)
+    # Los workers del pool no corren atexit: los timestamps volátiles se vuelcan aquí
+    flush_run_metadata()
+    return name, time.perf_counter() - started, result, error, get_tracer().drain_events()
+
+
+class StageTimer:
+    """Registra la duración y el estado de cada etapa"""
+
+    def __init__(self):
+        self.stages = []
+
+    @property
+    def failed(self):
+        """Nombres de las etapas que terminaron con error"""
+        return [name for name, _, status in self.stages if status == 'error']
+
+    def run(self, name, func, *args, **kwargs):
+        print(f"\n▶️  {name}")
+        started = time.perf_counter()
+        try:
+            with span(f"stage.{name}"):
+                result = func(*args, **kwargs)
+            self.stages.append((name, time.perf_counter() - started, 'ok'))
+            return result
+        except Exception as e:
+            print(f"⚠️  Error en {name}: {e}")
+            self.stages.append((name, time.perf_counter() - started, 'error'))
+            return None
+
+    def add(self, name, seconds, status):
+        self.stages.append((name, seconds, status))
+
+    def mark_error(self, name, reason):
+        """Marca como fallida una etapa que terminó sin excepción pero sin resultado"""
+        print(f"⚠️  Error en {name}: {reason}")
+        self.stages = [(stage, seconds, 'error' if stage == name else status)
+                       for stage, seconds, status in self.stages]
+
+    def print_table(self, total):
+        print("\n⏱️  Tiempos por etapa")
+        print(f"  {'Etapa':<24} {'Segundos':>10}  Estado")
+        print(f"  {'-' * 24} {'-' * 10}  ------")
+        for name, seconds, status in self.stages:
+            print(f"  {name:<24} {seconds:>10.2f}  {status}")
+        print(f"  {'TOTAL':<24} {total:>10.2f}")
+
+
+def _should_run(mode, auto_condition):
+    return mode == 'true' or (mode == 'auto' and auto_condition)
+
+
+def run_pipeline(reprocess_days=2, full_reprocess_mode=False, weekly='auto', monthly='auto',
+                 export=True, readme=True, workers=None, archive=False):
+    """
+    Ejecuta el pipeline completo
+
+    Args:
+        reprocess_days: días anteriores a reprocesar (0 = ninguno)
+        full_reprocess_mode: si True usa full_reprocess (con resúmenes)
+        weekly/monthly: 'true', 'false' o 'auto' (mismas reglas que action.yml)
+        export: si False se salta la descarga (solo regenera artefactos)
+        readme: si False no se generan calendario ni estadísticas del README
+        workers: tamaño del pool de generadores (por defecto PIPELINE_WORKERS o nº de CPUs)
+        archive: si True compacta los meses cerrados (borra sus archivos diarios sueltos)
+
+    Returns:
+        0 si todas las etapas terminaron bien, 1 si alguna falló
+    """
+    timer = StageTimer()
+    started = time.perf_counter()
+    today = datetime.now()
+    # Los workers heredan el id de la ejecución y combinan sus metadatos con los de este proceso
+    start_run()
+
+    if export:
+        from daily_exporter import export_daily_trades
+        # export_daily_trades devuelve None si fallan el login o la descarga
+        if timer.run('export', export_daily_trades) is None and 'export' not in timer.failed:
+            timer.mark_error('export', 'no se pudieron descargar los trades')
+
+        if reprocess_days > 0:
+            if full_reprocess_mode:
+                from full_reprocess import full_reprocess
+                timer.run('full-reprocess', full_reprocess, reprocess_days)
+            else:
+                from advanced_exporter import reprocess_recent_days
+                timer.run('reprocess', reprocess_recent_days, reprocess_days)
+
+    # Opcional: los meses cerrados se compactan antes de sincronizar el cubo (que lee los bundles igual)
+    if archive:
+        from daily_archive import compact_archive
+        timer.run('archive', compact_archive)
+
+    # El cubo de desgloses se sincroniza una vez en serie; los resúmenes y los workers solo lo leen
+    from trade_cube import load_cube
+    cube = timer.run('cube', load_cube)
+    from aggregates import load_aggregates
+    aggregates = timer.run('aggregates', load_aggregates)
+
+    # Mismas reglas automáticas que action.yml: semanal en fin de semana, mensual al inicio de mes
+    if _should_run(weekly, today.isoweekday() in (7, 1)):
+        from weekly_summary import generate_default_weekly_summary
+        timer.run('weekly', generate_default_weekly_summary, cube, aggregates)
+
+    if _should_run(monthly, today.day <= 3):
+        from monthly_summary import generate_default_monthly_summary
+        timer.run('monthly', generate_default_monthly_summary, cube, aggregates)
+
+    from trade_log import load_trade_log
+    timer.run('trade-log', load_trade_log)
+
+    # Generadores independientes en paralelo
+    generators = ['dashboard-data', 'monthly-data']
+    if readme:
+        generators += ['calendar', 'readme-stats']
+
+    workers = workers or int(os.getenv('PIPELINE_WORKERS', '0')) or os.cpu_count() or 1
+    print(f"\n▶️  Generadores en paralelo ({min(workers, len(generators))} workers): {', '.join(generators)}")
+    results = {}
+    with ProcessPoolExecutor(max_workers=min(workers, len(generators))) as pool:
+        for name, seconds, result, error, events in pool.map(_run_generator, generators):
+            get_tracer().merge(events)
+            if error:
+                print(f"⚠️  Error en {name}: {error}")
+            timer.add(name, seconds, 'error' if error else 'ok')
+            results[name] = result
+
+    # El README lo escriben ambos generadores: se actualiza aquí, en serie
+    if readme:
+        from generate_stats import update_readme
+        from generate_calendar import update_readme_with_calendar
+        readme_started = time.perf_counter()
+        if results.get('readme-stats'):
+            update_readme(results['readme-stats'])
+        if results.get('calendar'):
+            update_readme_with_calendar(results['calendar'])
+        timer.add('readme', time.perf_counter() - readme_started, 'ok')
+
+    # Páginas por símbolo: usan su propio pool, por eso van después del de generadores
+    from generate_symbol_pages import generate_symbol_pages
+    timer.run('symbol-pages', generate_symbol_pages, workers=workers)
+
+    timer.print_table(time.perf_counter() - started)
+    if timer.failed:
+        print(f"❌ Etapas con error: {', '.join(timer.failed)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    import sys
+    from propreports_cli import main
+    
+    # Mismos argumentos que `propreports run`
+    sys.exit(main(['run'] + sys.argv[1:]))
@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""
+CLI unificado de PropReports Auto-Exporter
+Un único punto de entrada (`propreports <subcomando>`) para todos los scripts.
+Cada subcomando importa su módulo (y requests/bs4) solo al ejecutarse, así que
+los comandos que solo leen JSON locales arrancan sin cargar librerías de red.
+"""
+
+import os
+import sys
+import argparse
+
+
+def cmd_export(args):
+    from daily_exporter import export_daily_trades
+    return export_daily_trades()
+
+
+def cmd_range(args):
+    from advanced_exporter import export_range_resumable
+    return export_range_resumable(args.start, args.end, force_update=args.force, resume=args.resume)
+
+
+def cmd_reprocess(args):
+    if args.full:
+        from full_reprocess import full_reprocess
+        return full_reprocess(args.days, resume=args.resume)
+    from advanced_exporter import reprocess_recent_days
+    return reprocess_recent_days(args.days)
+
+
+def cmd_weekly(args):
+    from trade_cube import load_cube
+    from aggregates import load_aggregates
+    from weekly_summary import generate_weekly_summary, generate_default_weekly_summary
+    cube, aggregates = load_cube(), load_aggregates()
+    if args.date:
+        return generate_weekly_summary(args.date, force=args.force, cube=cube, aggregates=aggregates)
+    return generate_default_weekly_summary(cube, aggregates)
+
+
+def cmd_monthly(args):
+    from trade_cube import load_cube
+    from aggregates import load_aggregates
+    from monthly_summary import generate_monthly_summary, generate_default_monthly_summary
+    cube, aggregates = load_cube(), load_aggregates()
+    if args.year and args.month:
+        return generate_monthly_summary(args.year, args.month, force=args.force, cube=cube, aggregates=aggregates)
+    return generate_default_monthly_summary(cube, aggregates)
+
+
+def cmd_dashboard(args):
+    if args.html:
+        from generate_dashboard import generate_html_dashboard
+        return generate_html_dashboard(self_contained=args.self_contained)
+    from generate_dashboard_data import generate_dashboard_data
+    generate_dashboard_data(force=args.force)
+    if args.monthly_data:
+        from generate_monthly_data import generate_monthly_data
+        generate_monthly_data(force=args.force)
+
+
+def cmd_calendar(args):
+    from generate_calendar import build_calendar
+    content = build_calendar(args.year, force=args.force)
+    if content:
+        print(content)
+
+
+def cmd_stats(args):
+    from generate_stats import build_stats_table
+    if not os.path.exists("exports"):
+        print("❌ No se encontró el directorio exports")
+        return 1
+    table = build_stats_table(force=args.force)
+    if table:
+        print(table)
+
+
+def cmd_clean(args):
+    from clean_numeric_symbols import clean_all_exports
+    return clean_all_exports(args.base_dir)
+
+
+def cmd_archive(args):
+    from daily_archive import compact_archive
+    compact_archive(args.base_dir, after_days=args.after_days, codec=args.codec)
+
+
+def cmd_trade_log(args):
+    from trade_log import load_trade_log
+    log = load_trade_log()
+    if args.compact and log.dead:
+        log.compact()
+    print(f"📜 Log de trades: {len(log.days)} días, {log.size} bytes ({log.dead} anulados)")
+
+
+def cmd_cube(args):
+    import json
+    from trade_cube import load_cube, DIMENSIONS
+    by = tuple(dim for dim in args.by.split(',') if dim)
+    where = {}
+    for condition in args.where or []:
+        dim, _, value = condition.partition('=')
+        if dim not in DIMENSIONS:
+            print(f"❌ Dimensión desconocida: {dim}")
+            return 1
+        values = value.split(',')
+        where[dim] = [int(v) for v in values] if dim in ('hour', 'weekday') else values
+    try:
+        rows = load_cube().rollup(args.start, args.end, by, where)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 1
+    print(json.dumps(rows, indent=2, ensure_ascii=False))
+
+
+def cmd_symbols(args):
+    from generate_symbol_pages import generate_symbol_pages
+    generate_symbol_pages(force=args.force, workers=args.workers)
+
+
+def cmd_serve(args):
+    from query_api import serve
+    return serve(args.host, args.port)
+
+
+def cmd_run(args):
+    from pipeline import run_pipeline
+    return run_pipeline(
+        reprocess_days=args.reprocess_days,
+        full_reprocess_mode=args.full_reprocess,
+        weekly=args.weekly,
+        monthly=args.monthly,
+        export=not args.no_export,
+        readme=not args.no_readme,
+        workers=args.workers,
+        archive=args.archive
+    )
+
+
+def cmd_watch(args):
+    from watch import watch
+    return watch(args.interval, once=args.once)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='propreports', description='PropReports Auto-Exporter')
+    parser.add_argument('--trace', metavar='RUTA', help='Guardar la traza de spans en JSON (PROPREPORTS_TRACE)')
+    parser.add_argument('--trace-chrome', metavar='RUTA', help='Guardar la traza en formato Chrome trace-event')
+    parser.add_argument('--profile-memory', action='store_true',
+                        help='Medir el pico de memoria (tracemalloc) de cada etapa')
+    parser.add_argument('--metrics-file', metavar='RUTA',
+                        help='Escribir métricas para el textfile collector (PROPREPORTS_METRICS_FILE)')
+    sub = parser.add_subparsers(dest='command', metavar='<comando>')
+    sub.required = True
+
+    p = sub.add_parser('export', help='Exporta los trades de hoy')
+    p.set_defaults(func=cmd_export)
+
+    p = sub.add_parser('range', help='Exporta un rango de fechas')
+    p.add_argument('start', help='YYYY-MM-DD')
+    p.add_argument('end', help='YYYY-MM-DD')
+    p.add_argument('--force', action='store_true', help='Sobrescribir archivos existentes')
+    p.add_argument('--resume', action='store_true', help='Continuar la última ejecución incompleta')
+    p.set_defaults(func=cmd_range)
+
+    p = sub.add_parser('reprocess', help='Reprocesa los últimos N días')
+    p.add_argument('days', type=int, nargs='?', default=3)
+    p.add_argument('--full', action='store_true', help='Regenerar también resúmenes semanales y mensuales')
+    p.add_argument('--resume', action='store_true', help='Continuar el último reprocesamiento completo')
+    p.set_defaults(func=cmd_reprocess)
+
+    p = sub.add_parser('weekly', help='Genera el resumen semanal')
+    p.add_argument('date', nargs='?', help='Cualquier fecha de la semana (YYYY-MM-DD)')
+    p.add_argument('--force', action='store_true')
+    p.set_defaults(func=cmd_weekly)
+
+    p = sub.add_parser('monthly', help='Genera el resumen mensual')
+    p.add_argument('year', type=int, nargs='?')
+    p.add_argument('month', type=int, nargs='?')
+    p.add_argument('--force', action='store_true')
+    p.set_defaults(func=cmd_monthly)
+
+    p = sub.add_parser('dashboard', help='Genera los datos (o el HTML) del dashboard')
+    p.add_argument('--html', action='store_true', help='Generar docs/index.html')
+    p.add_argument('--self-contained', action='store_true',
+                   help='Con --html: página única sin CDNs ni fetch (SVG y CSS inline, funciona offline)')
+    p.add_argument('--monthly-data', action='store_true', help='Generar también docs/data/monthly')
+    p.add_argument('--force', action='store_true')
+    p.set_defaults(func=cmd_dashboard)
+
+    p = sub.add_parser('calendar', help='Genera el calendario SVG y actualiza el README')
+    p.add_argument('--year', type=int, help='Año (por defecto el actual, o el último con datos)')
+    p.add_argument('--force', action='store_true')
+    p.set_defaults(func=cmd_calendar)
+
+    p = sub.add_parser('stats', help='Actualiza las estadísticas del README')
+    p.add_argument('--force', action='store_true')
+    p.set_defaults(func=cmd_stats)
+
+    p = sub.add_parser('clean', help='Elimina trades inválidos de los archivos diarios')
+    p.add_argument('base_dir', nargs='?', default=os.getenv('EXPORT_OUTPUT_DIR', 'exports'))
+    p.set_defaults(func=cmd_clean)
+
+    p = sub.add_parser('archive', help='Compacta los meses cerrados de exports/daily en bundles comprimidos')
+    p.add_argument('base_dir', nargs='?', default=os.getenv('EXPORT_OUTPUT_DIR', 'exports'))
+    p.add_argument('--after-days', type=int,
+                   help='Días desde el fin de mes para compactarlo (por defecto PROPREPORTS_ARCHIVE_AFTER_DAYS o 7)')
+    p.add_argument('--codec', choices=('gzip', 'zstd'), help='Compresión (por defecto zstd si está instalado)')
+    p.set_defaults(func=cmd_archive)
+
+    p = sub.add_parser('trade-log', help='Sincroniza el log append-only de trades con exports/daily')
+    p.add_argument('--compact', action='store_true', help='Reescribir el log sin registros anulados')
+    p.set_defaults(func=cmd_trade_log)
+
+    p = sub.add_parser('cube', help='Desgloses del cubo de agregados para un rango de fechas')
+    p.add_argument('--start', help='YYYY-MM-DD')
+    p.add_argument('--end', help='YYYY-MM-DD')
+    p.add_argument('--by', default='symbol',
+                   help='Dimensiones separadas por coma: date, symbol, hour, weekday (0=lunes), side, duration')
+    p.add_argument('--where', action='append', metavar='DIM=VALOR[,VALOR]', help='Filtro (repetible)')
+    p.set_defaults(func=cmd_cube)
+
+    p = sub.add_parser('symbols', help='Páginas de detalle por símbolo (solo los símbolos con días nuevos)')
+    p.add_argument('--workers', type=int, help='Procesos del pool (por defecto PIPELINE_WORKERS o nº de CPUs)')
+    p.add_argument('--force', action='store_true', help='Regenerar todos los símbolos')
+    p.set_defaults(func=cmd_symbols)
+
+    p = sub.add_parser('serve', help='API local de consultas JSON sobre los trades exportados')
+    p.add_argument('--host', default='127.0.0.1')
+    p.add_argument('--port', type=int, help='Puerto (PROPREPORTS_SERVE_PORT, por defecto 8765)')
+    p.set_defaults(func=cmd_serve)
+
+    p = sub.add_parser('run', help='Ejecuta el pipeline completo en un solo proceso')
+    p.add_argument('--reprocess-days', type=int, default=int(os.getenv('REPROCESS_DAYS', '2')))
+    p.add_argument('--full-reprocess', action='store_true', default=os.getenv('FULL_REPROCESS', 'false') == 'true')
+    p.add_argument('--weekly', choices=['auto', 'true', 'false'], default=os.getenv('GENERATE_WEEKLY', 'auto'))
+    p.add_argument('--monthly', choices=['auto', 'true', 'false'], default=os.getenv('GENERATE_MONTHLY', 'auto'))
+    p.add_argument('--no-export', action='store_true', help='No descargar, solo regenerar artefactos')
+    p.add_argument('--no-readme', action='store_true', help='No generar calendario ni estadísticas del README')
+    p.add_argument('--workers', type=int)
+    p.add_argument('--archive', action='store_true', default=os.getenv('PROPREPORTS_ARCHIVE', 'false') == 'true',
+                   help='Compactar los meses cerrados de exports/daily (borra los archivos sueltos)')
+    p.set_defaults(func=cmd_run)
+
+    p = sub.add_parser('watch', help='Polling intradía de los trades de hoy')
+    p.add_argument('interval', type=int, nargs='?', help='Segundos entre consultas')
+    p.add_argument('--once', action='store_true', help='Ejecutar un solo ciclo')
+    p.set_defaults(func=cmd_watch)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    from tracing import finish_run, enable_memory_profiling
+    from metrics import enable_metrics, write_textfile
+    enable_metrics()
+    if args.profile_memory:
+        enable_memory_profiling()
+    result = args.func(args)
+    finish_run(args.command, args.trace, args.trace_chrome)
+    write_textfile(args.metrics_file, run=args.command)
+    return result if isinstance(result, int) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -12,6 +12,11 @@ from bs4 import BeautifulSoup
 import re
 from typing import Dict, List, Optional
 import time
+import threading
+from rate_limiter import get_shared_limiter, backoff_delay
+from trade_index import assign_trade_ids
+from trade_time import normalize_trade_times
+from tracing import span, traced, annotate
 
 class PropReportsExporter:
     def __init__(self, domain: str, username: str, password: str):
@@ -19,7 +24,26 @@ class PropReportsExporter:
         self.username = username
         self.password = password
         self.session = requests.Session()
-        self.base_url = f"https://{domain}"
+        # Se acepta un esquema explícito (p. ej. http://127.0.0.1:8080 para el simulador)
+        self.base_url = domain.rstrip('/') if '://' in domain else f"https://{domain}"
+        # Limiter compartido por todos los workers que descargan en paralelo
+        self.limiter = get_shared_limiter()
+        self.max_retries = int(os.getenv('PROPREPORTS_MAX_RETRIES', '2'))
+        self.timeout = float(os.getenv('PROPREPORTS_TIMEOUT', '60'))
+        # Estado por hilo: los workers comparten el exportador
+        self._local = threading.local()
+        # Re-login ante sesión expirada: un solo hilo re-autentica por sesión
+        self._login_lock = threading.Lock()
+        self._session_generation = 0
+        
+    @property
+    def last_error(self) -> Optional[str]:
+        """Motivo del último fallo de get_trades_page en este hilo: 'timeout', 'overloaded', 'session', 'status' o 'error'"""
+        return getattr(self._local, 'last_error', None)
+    
+    @last_error.setter
+    def last_error(self, value: Optional[str]):
+        self._local.last_error = value
         
     def login(self) -> bool:
         """Autentica con PropReports"""
@@ -44,16 +68,19 @@ class PropReportsExporter:
         
         try:
             # Realizar login
-            response = self.session.post(
-                login_url, 
-                data=login_data, 
-                headers=headers,
-                allow_redirects=False
-            )
+            with span('http.login') as attrs:
+                response = self.session.post(
+                    login_url, 
+                    data=login_data, 
+                    headers=headers,
+                    allow_redirects=False
+                )
+                attrs['status'] = response.status_code
             
             # Verificar si el login fue exitoso
             if response.status_code == 302:  # Redirección exitosa
                 print(f"✅ Login exitoso para {self.username}")
+                self._session_generation += 1
                 return True
             else:
                 print(f"❌ Error en login: Status {response.status_code}")
@@ -63,6 +90,20 @@ class PropReportsExporter:
             print(f"❌ Error de conexión: {e}")
             return False
     
+    def _session_expired(self, response) -> bool:
+        """PropReports redirige a login.php cuando la sesión expiró"""
+        if response.status_code in (301, 302, 303) and 'login.php' in response.headers.get('Location', ''):
+            return True
+        return bool(response.history) and 'login.php' in response.url
+    
+    def _relogin(self, generation: int) -> bool:
+        """Re-autentica salvo que otro hilo ya lo haya hecho desde `generation`"""
+        with self._login_lock:
+            if self._session_generation != generation:
+                return True
+            print("🔑 Sesión expirada, re-autenticando...")
+            return self.login()
+    
     def get_trades_page(self, date_from: str, date_to: str) -> Optional[str]:
         """Obtiene la página de trades para un rango de fechas"""
         # URL correcta para reportes en PropReports
@@ -79,17 +120,67 @@ class PropReportsExporter:
             'mode': '1'  # Modo estándar
         }
         
-        try:
-            response = self.session.get(trades_url, params=params)
-            if response.status_code == 200:
-                return response.text
-            else:
+        self.last_error = None
+        for attempt in range(self.max_retries + 1):
+            generation = self._session_generation
+            retrying = attempt < self.max_retries
+            with self.limiter.slot() as outcome:
+                try:
+                    with span('http.report', range=f"{date_from}..{date_to}") as attrs:
+                        response = self.session.get(trades_url, params=params, timeout=self.timeout)
+                        attrs['status'] = response.status_code
+                        attrs['bytes'] = len(response.content)
+                except requests.exceptions.Timeout:
+                    # Muestra lenta para el AIMD y espera con jitter antes del próximo intento
+                    self.last_error = 'timeout'
+                    outcome['timeout'] = True
+                    if retrying:
+                        outcome['retry_after'] = backoff_delay(attempt)
+                        print(f"⏱️  Timeout al obtener trades {date_from}..{date_to}, reintento {attempt + 1}/{self.max_retries} en {outcome['retry_after']:.1f}s")
+                    else:
+                        print(f"⏱️  Timeout al obtener trades {date_from}..{date_to}")
+                    continue
+                except Exception as e:
+                    print(f"❌ Error al obtener trades: {e}")
+                    self.last_error = 'error'
+                    if retrying:
+                        outcome['retry_after'] = backoff_delay(attempt)
+                    continue
+                
+                outcome['status'] = response.status_code
+                if self._session_expired(response):
+                    self.last_error = 'session'
+                    if self._relogin(generation):
+                        continue
+                    return None
+                
+                if response.status_code == 200:
+                    self.last_error = None
+                    return response.text
+                
+                # 429/5xx: el servidor está saturado, reintentar tras esperar
+                if response.status_code == 429 or response.status_code >= 500:
+                    self.last_error = 'overloaded'
+                    retry_after = response.headers.get('Retry-After', '')
+                    # Retry-After vale para todos los workers aunque no quede reintento
+                    if retry_after.isdigit():
+                        outcome['retry_after'] = float(retry_after)
+                    elif retrying:
+                        outcome['retry_after'] = backoff_delay(attempt)
+                    if retrying:
+                        print(f"⏳ Status {response.status_code} para {date_from}..{date_to}, reintento {attempt + 1}/{self.max_retries}")
+                    else:
+                        print(f"⏳ Status {response.status_code} para {date_from}..{date_to}")
+                    continue
+                
                 print(f"❌ Error al obtener trades: Status {response.status_code}")
+                self.last_error = 'status'
                 return None
-        except Exception as e:
-            print(f"❌ Error al obtener trades: {e}")
-            return None
+        
+        print(f"❌ Error al obtener trades: reintentos agotados para {date_from}..{date_to}")
+        return None
     
+    @traced('parse.trades')
     def parse_trades_html(self, html_content: str) -> List[Dict]:
         """Parsea el HTML de trades y extrae los datos"""
         soup = BeautifulSoup(html_content, 'html.parser')
@@ -105,7 +196,8 @@ class PropReportsExporter:
         current_date = None
         
         # Procesar todas las filas de la tabla
-        for row in trades_table.find_all('tr'):
+        rows = trades_table.find_all('tr')
+        for row in rows:
             # Detectar separadores de fecha
             if 'sectionSeparator' in row.get('class', []):
                 date_cell = row.find('td')
@@ -172,12 +264,18 @@ class PropReportsExporter:
                     )
                     
                     if is_valid_trade:
+                        # Horarios como enteros (epoch y segundos) una sola vez, al ingerir
+                        normalize_trade_times(trade)
                         trades.append(trade)
                         
                 except Exception as e:
                     # Ignorar filas que no son trades (totales, etc.)
                     pass
         
+        # ID estable para deduplicar descargas solapadas
+        assign_trade_ids(trades)
+        annotate(rows=len(rows), trades=len(trades))
+        
         print(f"  📊 Encontrados {len(trades)} trades válidos")
         return trades
     
@@ -195,6 +293,7 @@ class PropReportsExporter:
         except:
             return 0.0
     
+    @traced('serialize.export_json')
     def export_to_json(self, trades: List[Dict], output_dir: str = "exports") -> str:
         """Exporta los trades a formato JSON"""
         # Crear directorio si no existe
@@ -251,8 +350,9 @@ class PropReportsExporter:
         filename = f"{output_dir}/propreports_{self.username}_{timestamp}.json"
         
         # Guardar JSON
-        with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(export_data, f, indent=2, ensure_ascii=False)
+        with span('io.write', path=filename):
+            with open(filename, 'w', encoding='utf-8') as f:
+                json.dump(export_data, f, indent=2, ensure_ascii=False)
         
         print(f"✅ Datos exportados a: {filename}")
         return filename
@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+"""
+Simulador local de PropReports para pruebas end-to-end
+Implementa login.php (302 + cookie de sesión) y report.php (reporte de trades
+sintéticos para startDate/endDate/accountId/groupId) con perillas de latencia,
+errores, expiración de sesión, throttling y páginas truncadas, para probar
+concurrencia, reintentos y re-login sin tocar el servidor real.
+
+Uso:
+    python src/propreports_simulator.py --port 8080 --latency 0.2 --error-rate 0.05
+    PROPREPORTS_DOMAIN=http://127.0.0.1:8080 python src/full_reprocess.py 30
+"""
+
+import sys
+import json
+import time
+import random
+import secrets
+import argparse
+import threading
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from http.cookies import SimpleCookie
+from urllib.parse import urlsplit, parse_qs
+from synthetic_data import trades_for_date, render_report_html
+
+LOGIN_FORM = (
+    '<html><body><form method="post" action="login.php">'
+    '<input name="user"><input name="password" type="password"></form></body></html>'
+)
+
+
+class PropReportsSimulator:
+    """Servidor HTTP en un hilo de fondo con estado y estadísticas compartidas"""
+
+    def __init__(self, host='127.0.0.1', port=0, username=None, password=None,
+                 trades_per_day=50, seed=42, latency=0.0, latency_per_day=0.0,
+                 error_rate=0.0, throttle_rate=0.0, max_concurrent=0, retry_after=1,
+                 session_ttl=0.0, session_requests=0, max_rows=0):
+        """
+        Args:
+            username/password: credenciales aceptadas (None = cualquiera)
+            latency: segundos base por petición a report.php (±25% de jitter)
+            latency_per_day: segundos extra por cada día del rango pedido
+            error_rate: probabilidad de responder 500
+            throttle_rate: peticiones/s permitidas antes de responder 429 (0 = sin límite)
+            max_concurrent: peticiones simultáneas antes de responder 503 (0 = sin límite)
+            session_ttl: segundos de vida de una sesión (0 = no expira)
+            session_requests: peticiones a report.php por sesión (0 = sin límite)
+            max_rows: trades por página; si se superan la tabla queda sin cerrar (0 = sin límite)
+        """
+        self.username = username
+        self.password = password
+        self.trades_per_day = trades_per_day
+        self.seed = seed
+        self.latency = latency
+        self.latency_per_day = latency_per_day
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.max_concurrent = max_concurrent
+        self.retry_after = retry_after
+        self.session_ttl = session_ttl
+        self.session_requests = session_requests
+        self.max_rows = max_rows
+
+        self._lock = threading.Lock()
+        self._rng = random.Random(seed)
+        self._sessions = {}
+        self._in_flight = 0
+        self._tokens = throttle_rate
+        self._refilled_at = time.monotonic()
+        self.stats = {
+            'requests': 0, 'logins': 0, 'failedLogins': 0, 'reports': 0, 'daysServed': 0,
+            'tradesServed': 0, 'throttled': 0, 'overloaded': 0, 'errors': 0,
+            'expiredSessions': 0, 'truncated': 0, 'maxInFlight': 0
+        }
+
+        handler = type('SimulatorHandler', (_Handler,), {'simulator': self})
+        self.server = ThreadingHTTPServer((host, port), handler)
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self.base_url
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def count(self, key, amount=1):
+        with self._lock:
+            self.stats[key] += amount
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.stats)
+
+    # --- sesiones ---
+
+    def check_credentials(self, user, password):
+        return (self.username is None or user == self.username) and \
+               (self.password is None or password == self.password)
+
+    def new_session(self):
+        token = secrets.token_hex(16)
+        with self._lock:
+            self._sessions[token] = {'createdAt': time.monotonic(), 'requests': 0}
+            self.stats['logins'] += 1
+        return token
+
+    def use_session(self, token):
+        """True si la sesión es válida (y cuenta la petición); la elimina si expiró"""
+        with self._lock:
+            session = self._sessions.get(token)
+            if session is None:
+                return False
+            expired = (
+                (self.session_ttl and time.monotonic() - session['createdAt'] > self.session_ttl) or
+                (self.session_requests and session['requests'] >= self.session_requests)
+            )
+            if expired:
+                del self._sessions[token]
+                self.stats['expiredSessions'] += 1
+                return False
+            session['requests'] += 1
+            return True
+
+    # --- carga ---
+
+    def try_throttle(self):
+        """Token bucket del lado servidor: False si hay que responder 429"""
+        if not self.throttle_rate:
+            return True
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.throttle_rate, self._tokens + (now - self._refilled_at) * self.throttle_rate)
+            self._refilled_at = now
+            if self._tokens < 1:
+                self.stats['throttled'] += 1
+                return False
+            self._tokens -= 1
+            return True
+
+    def enter(self):
+        with self._lock:
+            if self.max_concurrent and self._in_flight >= self.max_concurrent:
+                self.stats['overloaded'] += 1
+                return False
+            self._in_flight += 1
+            self.stats['maxInFlight'] = max(self.stats['maxInFlight'], self._in_flight)
+            return True
+
+    def leave(self):
+        with self._lock:
+            self._in_flight -= 1
+
+    def roll_error(self):
+        with self._lock:
+            failed = self.error_rate and self._rng.random() < self.error_rate
+            if failed:
+                self.stats['errors'] += 1
+            return failed
+
+    def delay(self, days):
+        base = self.latency + self.latency_per_day * days
+        if base > 0:
+            with self._lock:
+                jitter = self._rng.uniform(0.75, 1.25)
+            time.sleep(base * jitter)
+
+    # --- reporte ---
+
+    def render_report(self, start, end, account_id):
+        trades_by_day = {}
+        current = start
+        while current <= end:
+            date_str = current.strftime('%Y-%m-%d')
+            trades_by_day[date_str] = trades_for_date(
+                date_str, self.trades_per_day, seed=self.seed, account=account_id
+            )
+            current += timedelta(days=1)
+
+        total = sum(len(trades) for trades in trades_by_day.values())
+        html = render_report_html(trades_by_day)
+        if self.max_rows and total > self.max_rows:
+            # Página cortada: la tabla queda sin cerrar, como las respuestas truncadas reales
+            html = _truncate_rows(html, self.max_rows)
+            total = self.max_rows
+            self.count('truncated')
+        self.count('reports')
+        self.count('daysServed', len(trades_by_day))
+        self.count('tradesServed', total)
+        return html
+
+
+def _truncate_rows(html, max_rows):
+    """Corta el HTML después de max_rows filas de trades (sin </table>)"""
+    lines = html.split('\n')
+    kept = []
+    rows = 0
+    for line in lines:
+        if line.startswith('<tr><td>'):
+            if rows >= max_rows:
+                break
+            rows += 1
+        elif line.startswith('</table>'):
+            break
+        kept.append(line)
+    return '\n'.join(kept) + '\n'
+
+
+class _Handler(BaseHTTPRequestHandler):
+    simulator = None
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body='', content_type='text/html; charset=utf-8', headers=None):
+        data = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _session_token(self):
+        cookie = SimpleCookie(self.headers.get('Cookie', ''))
+        return cookie['PHPSESSID'].value if 'PHPSESSID' in cookie else None
+
+    def do_POST(self):
+        sim = self.simulator
+        sim.count('requests')
+        path = urlsplit(self.path).path
+        length = int(self.headers.get('Content-Length', 0) or 0)
+        form = parse_qs(self.rfile.read(length).decode('utf-8'))
+
+        if path != '/login.php':
+            return self._send(404, 'Not found')
+        if not sim.check_credentials(form.get('user', [''])[0], form.get('password', [''])[0]):
+            # PropReports responde 200 con el formulario cuando el login falla
+            sim.count('failedLogins')
+            return self._send(200, LOGIN_FORM)
+        token = sim.new_session()
+        self._send(302, headers={'Location': '/index.php', 'Set-Cookie': f'PHPSESSID={token}; Path=/'})
+
+    def do_GET(self):
+        sim = self.simulator
+        sim.count('requests')
+        url = urlsplit(self.path)
+
+        if url.path == '/login.php':
+            return self._send(200, LOGIN_FORM)
+        if url.path == '/stats':
+            return self._send(200, json.dumps(sim.snapshot()), 'application/json')
+        if url.path != '/report.php':
+            return self._send(404, 'Not found')
+
+        if not sim.use_session(self._session_token()):
+            return self._send(302, headers={'Location': '/login.php'})
+        if not sim.try_throttle():
+            return self._send(429, 'Too Many Requests', headers={'Retry-After': str(sim.retry_after)})
+        if not sim.enter():
+            return self._send(503, 'Service Unavailable')
+        try:
+            params = {key: values[0] for key, values in parse_qs(url.query).items()}
+            try:
+                start = datetime.strptime(params['startDate'], '%Y-%m-%d')
+                end = datetime.strptime(params['endDate'], '%Y-%m-%d')
+            except (KeyError, ValueError):
+                return self._send(400, 'startDate/endDate requeridos (YYYY-MM-DD)')
+            if params.get('reportName', 'trades') != 'trades' or end < start:
+                return self._send(400, 'Parámetros inválidos')
+
+            days = (end - start).days + 1
+            sim.delay(days)
+            if sim.roll_error():
+                return self._send(500, 'Internal Server Error')
+            account_id = f"{params.get('groupId', '')}:{params.get('accountId', '')}"
+            self._send(200, sim.render_report(start, end, account_id))
+        finally:
+            sim.leave()
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description='Simulador local de PropReports (login.php + report.php)')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--user', help='Usuario aceptado (por defecto cualquiera)')
+    parser.add_argument('--password', help='Contraseña aceptada (por defecto cualquiera)')
+    parser.add_argument('--trades-per-day', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--latency', type=float, default=0.0, help='Segundos base por reporte')
+    parser.add_argument('--latency-per-day', type=float, default=0.0, help='Segundos extra por día del rango')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Probabilidad de 500')
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help='Peticiones/s antes de 429')
+    parser.add_argument('--max-concurrent', type=int, default=0, help='Peticiones simultáneas antes de 503')
+    parser.add_argument('--retry-after', type=int, default=1, help='Retry-After de las respuestas 429')
+    parser.add_argument('--session-ttl', type=float, default=0.0, help='Segundos de vida de la sesión')
+    parser.add_argument('--session-requests', type=int, default=0, help='Reportes por sesión')
+    parser.add_argument('--max-rows', type=int, default=0, help='Trades por página antes de truncar')
+    return parser
+
+
+def simulator_from_args(args, port=None):
+    return PropReportsSimulator(
+        host=args.host, port=args.port if port is None else port,
+        username=args.user, password=args.password,
+        trades_per_day=args.trades_per_day, seed=args.seed,
+        latency=args.latency, latency_per_day=args.latency_per_day,
+        error_rate=args.error_rate, throttle_rate=args.throttle_rate,
+        max_concurrent=args.max_concurrent, retry_after=args.retry_after,
+        session_ttl=args.session_ttl, session_requests=args.session_requests,
+        max_rows=args.max_rows
+    )
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    simulator = simulator_from_args(args)
+    print(f"🧪 Simulador PropReports en {simulator.base_url} (Ctrl+C para salir)")
+    print(f"   PROPREPORTS_DOMAIN={simulator.base_url}")
+    try:
+        simulator.server.serve_forever()
+    except KeyboardInterrupt:
+        print(f"\n📊 {json.dumps(simulator.snapshot())}")
+    finally:
+        simulator.server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,398 @@
+#!/usr/bin/env python3
+"""
+API local de consultas JSON sobre los trades exportados (`propreports serve`)
+Responde preguntas sobre cualquier rango de fechas sin regenerar archivos:
+resúmenes, estadísticas por símbolo, desgloses del cubo, curva de equity y
+listado paginado de trades. Los agregados salen del cubo (trade_cube) y el
+listado usa los conteos por día del cubo para abrir solo los archivos diarios
+de la página pedida. Las respuestas se guardan en una caché LRU que se vacía
+cuando se ingieren días nuevos (el cubo se re-sincroniza con exports/daily).
+
+Endpoints (todos aceptan start/end YYYY-MM-DD):
+    /api/status                      días disponibles y estado de la caché
+    /api/summary                     totales del rango, mejor y peor día
+    /api/symbols?sort=pnl            estadísticas por símbolo
+    /api/breakdown?by=hour,weekday   roll-up del cubo (filtros: symbol, side, hour, weekday, duration)
+    /api/equity                      P&L diario, acumulado y drawdown
+    /api/trades?page=1&pageSize=100  trades del rango (filtros: symbol, side)
+
+Variables de entorno:
+    PROPREPORTS_SERVE_PORT          puerto (por defecto 8765)
+    PROPREPORTS_SERVE_CACHE         respuestas en la caché LRU (por defecto 256)
+    PROPREPORTS_SERVE_SYNC_SECONDS  intervalo mínimo entre re-sincronizaciones (por defecto 2)
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import threading
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qsl
+from trade_cube import TradeCube, DIMENSIONS, MEASURES, finalize, hour_label, trade_side
+from daily_store import load_daily
+from trade_time import opened_ts
+
+DATE_RE = re.compile(r'^\d{4}-\d{2}-\d{2}$')
+MAX_PAGE_SIZE = 1000
+FILTER_DIMENSIONS = ('symbol', 'side', 'hour', 'weekday', 'duration')
+SYMBOL_SORT_FIELDS = ('symbol', 'trades', 'wins', 'losses', 'pnl', 'commission', 'netPnL',
+                      'winRate', 'avgWin', 'avgLoss', 'profitFactor', 'expectancy')
+
+
+class QueryError(ValueError):
+    """Parámetros inválidos: se responde 400 con el mensaje"""
+
+
+class LRUCache:
+    """Caché LRU de respuestas serializadas, segura entre hilos"""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self.entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self.entries.clear()
+
+    def snapshot(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'entries': len(self.entries),
+                'maxEntries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hitRatio': round(self.hits / total, 4) if total else 0
+            }
+
+
+class TradeStore:
+    """Cubo sincronizado con exports/daily más índices por día para las consultas"""
+
+    def __init__(self, base_dir=None, sync_seconds=None, cache_entries=None):
+        self.base_dir = base_dir or os.getenv('EXPORT_OUTPUT_DIR', 'exports')
+        if sync_seconds is None:
+            sync_seconds = float(os.getenv('PROPREPORTS_SERVE_SYNC_SECONDS', '2'))
+        if cache_entries is None:
+            cache_entries = int(os.getenv('PROPREPORTS_SERVE_CACHE', '256'))
+        self.sync_seconds = sync_seconds
+        self.cache = LRUCache(cache_entries)
+        self.cube = TradeCube.load()
+        self.generation = 0
+        self.day_totals = {}
+        self.last_sync = 0.0
+        # Las consultas leen el cubo mientras otro hilo podría sincronizarlo
+        self.lock = threading.RLock()
+        self.refresh(force=True)
+
+    def refresh(self, force=False):
+        """Re-sincroniza el cubo (como mucho cada sync_seconds); vacía la caché si hubo cambios"""
+        with self.lock:
+            now = time.monotonic()
+            if not force and now - self.last_sync < self.sync_seconds:
+                return False
+            self.last_sync = now
+            before = set(self.cube.days)
+            rebuilt = self.cube.sync(self.base_dir)
+            changed = rebuilt > 0 or set(self.cube.days) != before
+            if changed or force:
+                self.cube.save()
+                # Totales por día: resúmenes y equity sin recorrer celdas
+                self.day_totals = {date_str: measures for (date_str,), measures in self.cube.query(by=('date',)).items()}
+                self.generation += 1
+                self.cache.clear()
+            return changed
+
+    # --- consultas ---
+
+    def dates(self, start=None, end=None):
+        return [d for d in sorted(self.day_totals) if (start is None or d >= start) and (end is None or d <= end)]
+
+    def summary(self, start=None, end=None):
+        dates = self.dates(start, end)
+        totals = [0] * len(MEASURES)
+        for date_str in dates:
+            for i, value in enumerate(self.day_totals[date_str]):
+                totals[i] += value
+        daily = [(date_str, self.day_totals[date_str][5]) for date_str in dates if self.day_totals[date_str][0]]
+        best = max(daily, key=lambda day: day[1]) if daily else None
+        worst = min(daily, key=lambda day: day[1]) if daily else None
+        result = finalize(totals)
+        result.update({
+            'start': dates[0] if dates else start,
+            'end': dates[-1] if dates else end,
+            'tradingDays': len(daily),
+            'profitDays': sum(1 for _, pnl in daily if pnl > 0),
+            'lossDays': sum(1 for _, pnl in daily if pnl < 0),
+            'avgDailyPnL': round(result['netPnL'] / len(daily), 2) if daily else 0,
+            'bestDay': {'date': best[0], 'pnl': round(best[1], 2)} if best else None,
+            'worstDay': {'date': worst[0], 'pnl': round(worst[1], 2)} if worst else None
+        })
+        return result
+
+    def symbols(self, start=None, end=None, sort='pnl'):
+        if sort not in SYMBOL_SORT_FIELDS:
+            raise QueryError(f"Campo de orden desconocido: {sort}")
+        rows = self.cube.rollup(start, end, by=('symbol',))
+        if sort != 'symbol':
+            rows.sort(key=lambda row: row[sort], reverse=True)
+        return rows
+
+    def breakdown(self, start=None, end=None, by=(), where=None):
+        rows = self.cube.rollup(start, end, by, where)
+        for row in rows:
+            if 'hour' in row:
+                row['hour'] = hour_label(row['hour'])
+        return rows
+
+    def equity(self, start=None, end=None):
+        points = []
+        cumulative = 0
+        peak = 0
+        for date_str in self.dates(start, end):
+            measures = self.day_totals[date_str]
+            if not measures[0]:
+                continue
+            cumulative += measures[5]
+            peak = max(peak, cumulative)
+            points.append({
+                'date': date_str,
+                'trades': measures[0],
+                'pnl': round(measures[5], 2),
+                'cumulative': round(cumulative, 2),
+                'drawdown': round(peak - cumulative, 2)
+            })
+        return points
+
+    def trades(self, start=None, end=None, where=None, page=1, page_size=100):
+        """
+        Página de trades del rango en orden de fecha y apertura
+
+        Los conteos por día del cubo (con los mismos filtros) ubican la página
+        sin abrir los archivos de los días anteriores. Dentro de un día se
+        ordena por openedTs (el orden del archivo es el de la tabla de
+        PropReports); los trades sin hora de apertura van al final.
+        """
+        where = where or {}
+        counts = self.cube.query(start, end, by=('date',), where=where)
+        total = sum(measures[0] for measures in counts.values())
+        offset = (page - 1) * page_size
+        trades = []
+        for (date_str,), measures in sorted(counts.items()):
+            count = measures[0]
+            if offset >= count:
+                offset -= count
+                continue
+            data = load_daily(date_str, self.base_dir) or {}
+            matching = [t for t in data.get('trades', []) if _matches(t, where)]
+            matching.sort(key=_opened_order)
+            take = matching[offset:offset + page_size - len(trades)]
+            trades.extend(take)
+            offset = 0
+            if len(trades) >= page_size:
+                break
+        return {
+            'total': total,
+            'page': page,
+            'pageSize': page_size,
+            'pages': (total + page_size - 1) // page_size,
+            'trades': trades
+        }
+
+    def status(self):
+        dates = self.dates()
+        return {
+            'days': len(dates),
+            'first': dates[0] if dates else None,
+            'last': dates[-1] if dates else None,
+            'generation': self.generation,
+            'cache': self.cache.snapshot()
+        }
+
+
+def _opened_order(trade):
+    """Clave de orden dentro de un día: apertura, y los trades sin hora al final"""
+    ts = opened_ts(trade)
+    return (ts is None, ts or 0)
+
+
+def _matches(trade, where):
+    if 'symbol' in where and (trade.get('symbol') or 'UNKNOWN') not in where['symbol']:
+        return False
+    if 'side' in where and trade_side(trade) not in where['side']:
+        return False
+    return True
+
+
+def _date_param(params, name):
+    value = params.get(name)
+    if value and not DATE_RE.match(value):
+        raise QueryError(f"{name} debe tener formato YYYY-MM-DD")
+    return value or None
+
+
+def _int_param(params, name, default, minimum=1, maximum=None):
+    try:
+        value = int(params.get(name, default))
+    except ValueError:
+        raise QueryError(f"{name} debe ser un entero")
+    if value < minimum or (maximum and value > maximum):
+        raise QueryError(f"{name} fuera de rango")
+    return value
+
+
+def _filters(params, allowed=FILTER_DIMENSIONS):
+    where = {}
+    for dim in allowed:
+        if params.get(dim):
+            values = params[dim].split(',')
+            if dim in ('hour', 'weekday'):
+                try:
+                    values = [int(value) for value in values]
+                except ValueError:
+                    raise QueryError(f"{dim} debe ser un entero")
+            where[dim] = values
+    return where
+
+
+def handle_query(store, path, params):
+    """Resuelve un endpoint; devuelve el objeto a serializar o None si no existe"""
+    if path == '/api/status':
+        return store.status()
+
+    start = _date_param(params, 'start')
+    end = _date_param(params, 'end')
+    if path == '/api/summary':
+        return store.summary(start, end)
+    if path == '/api/symbols':
+        return store.symbols(start, end, params.get('sort', 'pnl'))
+    if path == '/api/breakdown':
+        by = tuple(dim for dim in params.get('by', 'symbol').split(',') if dim)
+        unknown = [dim for dim in by if dim not in DIMENSIONS]
+        if unknown:
+            raise QueryError(f"Dimensión desconocida: {', '.join(unknown)}")
+        return store.breakdown(start, end, by, _filters(params))
+    if path == '/api/equity':
+        return store.equity(start, end)
+    if path == '/api/trades':
+        page = _int_param(params, 'page', 1)
+        page_size = _int_param(params, 'pageSize', 100, maximum=MAX_PAGE_SIZE)
+        return store.trades(start, end, _filters(params, ('symbol', 'side')), page, page_size)
+    return None
+
+
+class _Handler(BaseHTTPRequestHandler):
+    store = None
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body, cache_status=None):
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Access-Control-Allow-Origin', '*')
+        if cache_status:
+            self.send_header('X-Cache', cache_status)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        store = self.store
+        url = urlsplit(self.path)
+        params = dict(parse_qsl(url.query))
+        store.refresh()
+
+        # La clave incluye la generación: una caché vaciada no puede recibir respuestas viejas
+        key = (store.generation, url.path, tuple(sorted(params.items())))
+        if url.path != '/api/status':
+            body = store.cache.get(key)
+            if body is not None:
+                return self._send(200, body, 'HIT')
+        try:
+            with store.lock:
+                result = handle_query(store, url.path, params)
+        except QueryError as e:
+            return self._send(400, json.dumps({'error': str(e)}, ensure_ascii=False).encode('utf-8'))
+        if result is None:
+            return self._send(404, b'{"error": "Not found"}')
+        body = json.dumps(result, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        if url.path != '/api/status':
+            store.cache.put(key, body)
+        self._send(200, body, 'MISS')
+
+
+class QueryServer:
+    """Servidor HTTP de la API en un hilo de fondo"""
+
+    def __init__(self, host='127.0.0.1', port=None, store=None):
+        port = port if port is not None else int(os.getenv('PROPREPORTS_SERVE_PORT', '8765'))
+        self.store = store or TradeStore()
+        handler = type('QueryHandler', (_Handler,), {'store': self.store})
+        self.server = ThreadingHTTPServer((host, port), handler)
+        self.server.daemon_threads = True
+        self.base_url = f"http://{host}:{self.server.server_address[1]}"
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self.base_url
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def serve(host='127.0.0.1', port=None):
+    """Sirve la API en primer plano hasta Ctrl+C"""
+    server = QueryServer(host, port)
+    status = server.store.status()
+    print(f"🔌 API de consultas en {server.base_url}/api/ "
+          f"({status['days']} días, {status['first']} a {status['last']}) (Ctrl+C para salir)")
+    try:
+        server.server.serve_forever()
+    except KeyboardInterrupt:
+        print(f"\n📊 Caché: {json.dumps(server.store.cache.snapshot())}")
+    finally:
+        server.server.server_close()
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='API local de consultas sobre los trades exportados')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int)
+    args = parser.parse_args(argv)
+    return serve(args.host, args.port)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Control de tasa y concurrencia adaptativa para las peticiones a PropReports
+Un token bucket limita las peticiones por segundo y un controlador AIMD
+ajusta el número de peticiones simultáneas según la latencia y los errores 429/5xx
+"""
+
+import os
+import time
+import random
+import threading
+from contextlib import contextmanager
+
+
+def backoff_delay(attempt: int, base: float = 1.0, cap: float = 30.0) -> float:
+    """Espera exponencial con jitter (entre la mitad y el total de base * 2^attempt, hasta cap)"""
+    delay = min(cap, base * 2 ** attempt)
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+class TokenBucket:
+    """Token bucket thread-safe: `rate` tokens por segundo con ráfagas de hasta `capacity`"""
+
+    def __init__(self, rate: float, capacity: float = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.lock = threading.Lock()
+
+    def _refill(self, now):
+        elapsed = now - self.updated
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+        self.updated = now
+
+    def acquire(self):
+        """Bloquea hasta que haya un token disponible"""
+        if self.rate <= 0:
+            return
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now < self.paused_until:
+                    wait = self.paused_until - now
+                elif self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                else:
+                    wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def pause(self, seconds: float):
+        """Detiene la emisión de tokens (p.ej. tras un 429 con Retry-After)"""
+        with self.lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+            self.tokens = 0
+
+
+class AdaptiveConcurrency:
+    """
+    Límite de peticiones en vuelo con ajuste AIMD
+
+    - Incremento aditivo: +1/limit por cada respuesta rápida y correcta
+    - Decremento multiplicativo: limit * backoff ante 429/5xx/errores o latencia
+      muy por encima de la línea base observada (un timeout cuenta como muestra lenta)
+    """
+
+    def __init__(self, max_limit: int, min_limit: int = 1, initial: int = None,
+                 backoff: float = 0.5, latency_tolerance: float = 2.0):
+        self.max_limit = max(1, max_limit)
+        self.min_limit = max(1, min(min_limit, self.max_limit))
+        self.limit = float(initial if initial is not None else self.min_limit)
+        self.limit = min(max(self.limit, self.min_limit), self.max_limit)
+        self.backoff = backoff
+        self.latency_tolerance = latency_tolerance
+        self.baseline_latency = None
+        self.in_flight = 0
+        self.last_decrease = 0.0
+        self.cond = threading.Condition()
+
+    def acquire(self):
+        with self.cond:
+            while self.in_flight >= int(self.limit):
+                self.cond.wait()
+            self.in_flight += 1
+
+    def release(self):
+        with self.cond:
+            self.in_flight -= 1
+            self.cond.notify_all()
+
+    def record(self, latency: float, status, timed_out: bool = False):
+        """Actualiza el límite según el resultado de una petición"""
+        with self.cond:
+            overloaded = status is None or status == 429 or status >= 500
+            # Un timeout no entra en la línea base: es una muestra lenta por definición
+            slow = timed_out
+
+            if not overloaded and not timed_out:
+                if self.baseline_latency is None:
+                    self.baseline_latency = latency
+                else:
+                    # Línea base: media móvil que solo sigue rápido hacia abajo
+                    weight = 0.5 if latency < self.baseline_latency else 0.05
+                    self.baseline_latency += weight * (latency - self.baseline_latency)
+                slow = latency > self.baseline_latency * self.latency_tolerance
+
+            now = time.monotonic()
+            if overloaded or slow:
+                # Como mucho un recorte por ventana de latencia para no colapsar
+                window = self.baseline_latency or latency
+                if now - self.last_decrease >= window:
+                    self.limit = max(self.min_limit, self.limit * self.backoff)
+                    self.last_decrease = now
+            else:
+                self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+            self.cond.notify_all()
+
+
+class RequestLimiter:
+    """Combina token bucket y concurrencia adaptativa para todos los workers de descarga"""
+
+    def __init__(self, rate: float, max_in_flight: int, burst: float = None):
+        self.bucket = TokenBucket(rate, burst)
+        self.concurrency = AdaptiveConcurrency(max_in_flight)
+
+    @property
+    def max_in_flight(self):
+        return self.concurrency.max_limit
+
+    @contextmanager
+    def slot(self):
+        """
+        Reserva un hueco para una petición
+
+        Uso:
+            with limiter.slot() as outcome:
+                response = session.get(...)
+                outcome['status'] = response.status_code
+
+        outcome['timeout'] = True registra la petición como muestra lenta y
+        outcome['retry_after'] pausa el bucket antes del próximo intento.
+        """
+        self.concurrency.acquire()
+        outcome = {'status': None}
+        start = time.monotonic()
+        try:
+            self.bucket.acquire()
+            start = time.monotonic()
+            yield outcome
+        finally:
+            self.concurrency.release()
+            self.concurrency.record(time.monotonic() - start, outcome['status'], outcome.get('timeout', False))
+            retry_after = outcome.get('retry_after')
+            if retry_after:
+                self.bucket.pause(retry_after)
+
+
+_shared_limiter = None
+_shared_lock = threading.Lock()
+
+
+def get_shared_limiter():
+    """Limiter único por proceso, configurado con variables de entorno"""
+    global _shared_limiter
+    with _shared_lock:
+        if _shared_limiter is None:
+            _shared_limiter = RequestLimiter(
+                rate=float(os.getenv('PROPREPORTS_RATE_LIMIT', '2')),
+                max_in_flight=int(os.getenv('PROPREPORTS_MAX_INFLIGHT', '4')),
+                burst=float(os.getenv('PROPREPORTS_BURST', '4'))
+            )
+        return _shared_limiter
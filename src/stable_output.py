@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Escritura estable de archivos generados
+Un archivo solo se reescribe si su contenido cambió, así una ejecución sin
+datos nuevos no deja cambios para commitear.
+
+Con el modo determinista activo (PROPREPORTS_DETERMINISTIC=1) además:
+
+    - los timestamps volátiles (exportDate, processedAt, generateDate,
+      lastUpdate, cleanedAt) no se escriben en cada archivo sino en un único
+      archivo de metadatos de la ejecución: exports/run_metadata.json
+    - ese archivo solo se escribe si algún archivo generado cambió: cada
+      timestamp se registra únicamente cuando su archivo se reescribió
+    - los JSON se serializan en forma canónica (claves ordenadas)
+    - el README y las páginas no llevan "Last updated" / "Generated on"
+
+Los procesos del pool acumulan sus timestamps en memoria y los vuelcan con
+flush_run_metadata(); el proceso principal lo hace al salir.
+
+Variables de entorno:
+    PROPREPORTS_DETERMINISTIC  1 para el modo determinista
+"""
+
+import os
+import json
+import atexit
+from datetime import datetime
+from state_store import state_path
+from tracing import span
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin bloqueo entre procesos
+    fcntl = None
+
+DETERMINISTIC = os.getenv('PROPREPORTS_DETERMINISTIC', '') not in ('', '0', 'false')
+VOLATILE_KEYS = ('exportDate', 'processedAt', 'generateDate', 'lastUpdate', 'cleanedAt')
+RUN_METADATA_FILE = "run_metadata.json"
+RUN_ID_ENV = "PROPREPORTS_RUN_ID"
+
+# Timestamps de esta ejecución pendientes de volcar: {ruta: {campo: valor}}
+_pending = {}
+
+
+def now_stamp(fmt='%Y-%m-%d %H:%M:%S'):
+    return datetime.now().strftime(fmt)
+
+
+def run_metadata_path():
+    return os.path.join(os.getenv('EXPORT_OUTPUT_DIR', 'exports'), RUN_METADATA_FILE)
+
+
+def split_volatile(data):
+    """Copia de data sin los campos volátiles (también en dicts anidados) y los campos quitados"""
+    clean = {}
+    stamps = {}
+    for key, value in data.items():
+        if key in VOLATILE_KEYS:
+            stamps[key] = value
+        elif isinstance(value, dict):
+            clean[key], nested = split_volatile(value)
+            stamps.update(nested)
+        else:
+            clean[key] = value
+    return clean, stamps
+
+
+def record_stamps(path, stamps):
+    """Guarda timestamps volátiles de un archivo para el archivo de metadatos de la ejecución"""
+    if stamps:
+        _pending.setdefault(path, {}).update(stamps)
+
+
+def write_bytes(path, content):
+    """Escribe content en path (tmp + rename) solo si cambió; devuelve True si escribió"""
+    try:
+        with open(path, 'rb') as f:
+            if f.read() == content:
+                return False
+    except OSError:
+        pass
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp.{os.getpid()}"
+    with span('io.write', path=path):
+        with open(tmp_path, 'wb') as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+    return True
+
+
+def write_text(path, text):
+    return write_bytes(path, text.encode('utf-8'))
+
+
+def dumps(data, indent=2):
+    """JSON como lo escriben los exportadores; canónico (claves ordenadas) en modo determinista"""
+    return json.dumps(data, indent=indent, ensure_ascii=False, sort_keys=DETERMINISTIC)
+
+
+def write_json(path, data, indent=2):
+    """
+    Escribe un JSON solo si cambió; devuelve True si escribió
+
+    En modo determinista los campos volátiles van a los metadatos de la
+    ejecución en lugar del archivo (solo si el archivo se reescribió).
+    """
+    stamps = {}
+    if DETERMINISTIC:
+        data, stamps = split_volatile(data)
+    written = write_text(path, dumps(data, indent))
+    if written:
+        record_stamps(path, stamps)
+    return written
+
+
+def flush_run_metadata():
+    """
+    Vuelca los timestamps pendientes a exports/run_metadata.json
+
+    Todos los procesos de una misma ejecución (mismo PROPREPORTS_RUN_ID,
+    heredado por los workers) combinan sus entradas; una ejecución nueva
+    reemplaza el archivo.
+    """
+    if not DETERMINISTIC or not _pending:
+        return None
+    run_id = os.environ.setdefault(RUN_ID_ENV, f"{now_stamp('%Y%m%d%H%M%S')}-{os.getpid()}")
+    path = run_metadata_path()
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(state_path(f"{RUN_METADATA_FILE}.lock"), 'w') as lock:
+        if fcntl:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                metadata = json.load(f)
+        except (OSError, ValueError):
+            metadata = {}
+        if metadata.get('runId') != run_id:
+            metadata = {'runId': run_id, 'startedAt': now_stamp(), 'files': {}}
+        metadata['updatedAt'] = now_stamp()
+        for file_path, stamps in _pending.items():
+            metadata['files'].setdefault(file_path, {}).update(stamps)
+        tmp_path = f"{path}.tmp.{os.getpid()}"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(metadata, f, indent=2, ensure_ascii=False, sort_keys=True)
+        os.replace(tmp_path, path)
+    _pending.clear()
+    return path
+
+
+def start_run():
+    """Marca el inicio de una ejecución: los workers que se creen después heredan su id"""
+    os.environ[RUN_ID_ENV] = f"{now_stamp('%Y%m%d%H%M%S')}-{os.getpid()}"
+
+
+atexit.register(flush_run_metadata)
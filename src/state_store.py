@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Almacenamiento de estado interno del exportador
+Guarda archivos JSON de control en exports/.state/ para que persistan entre ejecuciones
+"""
+
+import os
+import json
+
+
+def get_state_dir():
+    """Obtiene (y crea) el directorio de estado dentro de exports"""
+    base_dir = os.getenv('EXPORT_OUTPUT_DIR', 'exports')
+    state_dir = os.path.join(base_dir, ".state")
+    os.makedirs(state_dir, exist_ok=True)
+    return state_dir
+
+
+def state_path(name):
+    """Ruta del archivo de estado con el nombre indicado"""
+    return os.path.join(get_state_dir(), name)
+
+
+def load_state(name, default=None):
+    """Carga un archivo de estado, devuelve default si no existe o está corrupto"""
+    path = state_path(name)
+    if not os.path.exists(path):
+        return default
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"⚠️  Estado corrupto en {path}: {e}")
+        return default
+
+
+def save_state(name, data):
+    """Guarda un archivo de estado de forma atómica (tmp + rename)"""
+    path = state_path(name)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, path)
+    return path
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Índice persistente por símbolo sobre todo el historial
+Para cada día exportado guarda, por símbolo, las posiciones de sus trades
+dentro del archivo diario (offsets en la lista 'trades'), sus IDs y las
+medidas sumadas (mismo orden que trade_cube.MEASURES). Además mantiene los
+totales acumulados de cada símbolo, que se actualizan restando el aporte
+viejo y sumando el nuevo cuando un día cambia.
+
+Los símbolos afectados por días nuevos o modificados quedan en `pending`
+hasta que el generador de páginas por símbolo los procesa
+(ver generate_symbol_pages.py).
+
+Uso:
+    index = load_symbol_index()
+    index.postings(['AAPL'])  # {'AAPL': {fecha: [offsets]}}
+    index.totals('AAPL')      # medidas finalizadas de todo el historial
+"""
+
+import os
+import json
+from state_store import state_path
+from daily_store import file_source, sync_days
+from trade_cube import MEASURES, build_cells, finalize
+from trade_index import assign_trade_ids
+from tracing import span
+
+SYMBOL_INDEX_STATE_FILE = "symbol_index.json"
+SYMBOL_INDEX_VERSION = 1
+
+
+def symbol_entries(trades):
+    """Trades de un día -> {símbolo: {'offsets', 'ids', 'm'}}"""
+    # Archivos viejos sin 'id': se calcula igual que al exportar, sin tocar los trades
+    if any('id' not in trade for trade in trades):
+        ids = [trade['id'] for trade in assign_trade_ids([dict(trade) for trade in trades])]
+    else:
+        ids = [trade['id'] for trade in trades]
+
+    grouped = {}
+    for offset, trade in enumerate(trades):
+        grouped.setdefault(trade.get('symbol') or 'UNKNOWN', []).append(offset)
+
+    entries = {}
+    for symbol, offsets in grouped.items():
+        # Medidas del símbolo: sus celdas del cubo sumadas
+        measures = [0] * len(MEASURES)
+        for cell in build_cells([trades[offset] for offset in offsets]).values():
+            for i, value in enumerate(cell):
+                measures[i] += value
+        entries[symbol] = {'offsets': offsets, 'ids': [ids[offset] for offset in offsets], 'm': measures}
+    return entries
+
+
+class SymbolIndex:
+    """Días -> símbolos -> offsets, más totales por símbolo y símbolos pendientes"""
+
+    def __init__(self, days=None, symbols=None, pending=None):
+        self.days = days if days is not None else {}
+        self.symbols = symbols if symbols is not None else {}
+        self.pending = set(pending or ())
+        self.dirty = False
+
+    @classmethod
+    def load(cls):
+        path = state_path(SYMBOL_INDEX_STATE_FILE)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return cls()
+        if state.get('version') != SYMBOL_INDEX_VERSION:
+            # Formato viejo: se reconstruye desde los archivos diarios en sync()
+            return cls()
+        return cls(state.get('days', {}), state.get('symbols', {}), state.get('pending', []))
+
+    def _apply(self, entries, sign):
+        for symbol, entry in entries.items():
+            total = self.symbols.get(symbol)
+            if total is None:
+                total = self.symbols[symbol] = {'m': [0] * len(MEASURES), 'days': 0}
+            for i, value in enumerate(entry['m']):
+                total['m'][i] += sign * value
+            total['days'] += sign
+            if total['days'] <= 0:
+                del self.symbols[symbol]
+            self.pending.add(symbol)
+
+    def replace_day(self, date_str, trades, path=None, source=None):
+        """Reindexa un día: resta su aporte anterior y suma el nuevo; marca los símbolos tocados"""
+        if path and source is None:
+            source = file_source(path)
+        old = self.days.get(date_str)
+        if source is not None and old and old.get('source') == source:
+            return  # Mismo contenido: los símbolos del día no quedan pendientes
+        if old:
+            self._apply(old['symbols'], -1)
+        entries = symbol_entries(trades)
+        self._apply(entries, 1)
+        self.days[date_str] = {'source': source, 'symbols': entries}
+        self.dirty = True
+
+    def remove_day(self, date_str):
+        old = self.days.pop(date_str, None)
+        if old is not None:
+            self._apply(old['symbols'], -1)
+            self.dirty = True
+
+    def sync(self, base_dir=None):
+        """Reindexa los días cuyo contenido (suelto o archivado) cambió o falta en el índice; devuelve cuántos"""
+        with span('symbols.sync') as attrs:
+            rebuilt = sync_days(self, base_dir)
+            attrs['rebuilt'] = rebuilt
+            attrs['pending'] = len(self.pending)
+        return rebuilt
+
+    def postings(self, symbols=None):
+        """{símbolo: {fecha: [offsets]}} en orden cronológico (de todos o de `symbols`) en una pasada"""
+        wanted = set(symbols) if symbols is not None else None
+        result = {}
+        for date_str, day in sorted(self.days.items()):
+            for symbol, entry in day['symbols'].items():
+                if wanted is None or symbol in wanted:
+                    result.setdefault(symbol, {})[date_str] = entry['offsets']
+        return result
+
+    def totals(self, symbol):
+        total = self.symbols.get(symbol)
+        if total is None:
+            return None
+        return dict(finalize(total['m']), tradingDays=total['days'])
+
+    def mark_done(self, symbols):
+        """Quita de pendientes los símbolos ya regenerados"""
+        before = len(self.pending)
+        self.pending.difference_update(symbols)
+        if len(self.pending) != before:
+            self.dirty = True
+
+    def save(self):
+        if not self.dirty:
+            return None
+        path = state_path(SYMBOL_INDEX_STATE_FILE)
+        tmp_path = f"{path}.tmp.{os.getpid()}"
+        state = {
+            'version': SYMBOL_INDEX_VERSION,
+            'days': self.days,
+            'symbols': self.symbols,
+            'pending': sorted(self.pending)
+        }
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f, separators=(',', ':'), ensure_ascii=False)
+        os.replace(tmp_path, path)
+        self.dirty = False
+        return path
+
+
+def load_symbol_index(sync=True, base_dir=None):
+    """Carga el índice persistido y, por defecto, lo alinea con los archivos diarios"""
+    index = SymbolIndex.load()
+    if sync:
+        index.sync(base_dir)
+        index.save()
+    return index
@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+Generador determinista de datos sintéticos de PropReports
+Produce páginas report.php con la misma estructura que las reales (separadores
+de fecha, subtotales por sección y fila de totales) y árboles exports/ completos,
+para medir el rendimiento del parser y de los generadores sin credenciales.
+La misma semilla produce siempre exactamente los mismos bytes.
+"""
+
+import os
+import sys
+import json
+import random
+import argparse
+from datetime import datetime, timedelta
+from html import escape
+from trade_index import assign_trade_ids
+from trade_time import normalize_trades
+
+DEFAULT_SYMBOLS = (
+    'AAPL', 'TSLA', 'NVDA', 'AMD', 'SPY', 'QQQ', 'MSFT', 'META', 'AMZN', 'GOOGL',
+    'SOFI', 'PLTR', 'NIO', 'RIVN', 'MARA', 'RIOT', 'GME', 'AMC', 'BBBY', 'HOOD'
+)
+
+# Columnas de la tabla de trades de report.php (net en la columna 17)
+REPORT_COLUMNS = (
+    'Opened', 'Closed', 'Held', 'Symbol', 'Type', 'Entry', 'Exit', 'Qty',
+    'Gross', 'Comm', 'Ecn Fee', 'SEC', 'TAF', 'NSCC', 'Clr', 'Misc', 'Fees', 'Net'
+)
+
+SYNTHETIC_ACCOUNT = 'SYNTH0001'
+SYNTHETIC_TIMESTAMP = '2000-01-01 00:00:00'
+
+
+def trading_days(start_date, count):
+    """Devuelve `count` días hábiles (lunes a viernes) a partir de start_date"""
+    if isinstance(start_date, str):
+        start_date = datetime.strptime(start_date, '%Y-%m-%d')
+    days = []
+    current = start_date
+    while len(days) < count:
+        if current.weekday() < 5:
+            days.append(current.strftime('%Y-%m-%d'))
+        current += timedelta(days=1)
+    return days
+
+
+def _format_money(value):
+    """Formato de PropReports: separador de miles y negativos entre paréntesis"""
+    text = f"{abs(value):,.2f}"
+    return f"({text})" if value < 0 else text
+
+
+def _format_seconds(seconds):
+    return f"{seconds // 3600:02d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+
+
+def generate_day_trades(rng, date_str, count, symbols, account=SYNTHETIC_ACCOUNT):
+    """Genera los trades de un día con horarios, precios y P&L verosímiles"""
+    trades = []
+    for _ in range(count):
+        opened_at = rng.randint(9 * 3600 + 30 * 60, 15 * 3600 + 50 * 60)
+        held = int(rng.expovariate(1 / 300)) + 1
+        closed_at = min(opened_at + held, 16 * 3600)
+        held = closed_at - opened_at
+
+        trade_type = 'Long' if rng.random() < 0.6 else 'Short'
+        entry = round(rng.uniform(1, 500), 2)
+        move = rng.gauss(0.0005, 0.01) * entry
+        exit_price = round(max(0.01, entry + move), 2)
+        size = rng.choice((10, 25, 50, 100, 200, 500, 1000))
+        direction = 1 if trade_type == 'Long' else -1
+        pnl = round((exit_price - entry) * size * direction, 2)
+        commission = round(size * 0.005 + 0.5, 2)
+        fees = round(size * 0.0003, 2)
+
+        trades.append({
+            'date': date_str,
+            'opened': _format_seconds(opened_at),
+            'closed': _format_seconds(closed_at),
+            'held': _format_seconds(held),
+            'symbol': rng.choice(symbols),
+            'type': trade_type,
+            'entry': entry,
+            'exit': exit_price,
+            'size': float(size),
+            'pnl': pnl,
+            'commission': commission,
+            'fees': fees,
+            'net': round(pnl - commission - fees, 2),
+            'account': account,
+            'side': 'BUY' if trade_type == 'Long' else 'SELL',
+            'quantity': float(size),
+            'price': entry
+        })
+    trades.sort(key=lambda t: (t['opened'], t['symbol']))
+    return normalize_trades(trades)
+
+
+def generate_trades(start_date, days, trades_per_day, symbols=DEFAULT_SYMBOLS, seed=42,
+                    account=SYNTHETIC_ACCOUNT):
+    """Genera trades agrupados por día: {fecha: [trades]} (con IDs estables)"""
+    rng = random.Random(seed)
+    trades_by_day = {}
+    for date_str in trading_days(start_date, days):
+        trades_by_day[date_str] = assign_trade_ids(
+            generate_day_trades(rng, date_str, trades_per_day, symbols, account)
+        )
+    return trades_by_day
+
+
+def trades_for_date(date_str, trades_per_day, symbols=DEFAULT_SYMBOLS, seed=42, account=SYNTHETIC_ACCOUNT):
+    """
+    Trades de un solo día, independientes del rango pedido
+
+    La semilla se deriva de la fecha, así cualquier rango que incluya el día
+    devuelve los mismos trades (lo que necesita el simulador de report.php).
+    Fines de semana sin trades.
+    """
+    if datetime.strptime(date_str, '%Y-%m-%d').weekday() >= 5:
+        return []
+    rng = random.Random(f"{seed}:{account}:{date_str}")
+    return generate_day_trades(rng, date_str, trades_per_day, symbols, account)
+
+
+def _trade_row(trade):
+    fees = trade.get('fees', 0)
+    cells = [
+        trade['opened'], trade['closed'], trade['held'], trade['symbol'], trade['type'],
+        f"{trade['entry']:.2f}", f"{trade['exit']:.2f}", f"{int(trade['size'])}",
+        _format_money(trade['pnl']), _format_money(trade['commission']),
+        _format_money(fees * 0.4), _format_money(fees * 0.3), _format_money(fees * 0.1),
+        _format_money(fees * 0.1), _format_money(fees * 0.1), '0.00',
+        _format_money(fees), _format_money(trade['net'])
+    ]
+    return '<tr>' + ''.join(f'<td>{escape(cell)}</td>' for cell in cells) + '</tr>'
+
+
+def _subtotal_row(label, trades):
+    """Fila de subtotal: tiene las 18 columnas pero sin hora en 'Opened'"""
+    gross = sum(t['pnl'] for t in trades)
+    comm = sum(t['commission'] for t in trades)
+    fees = sum(t.get('fees', 0) for t in trades)
+    net = sum(t['net'] for t in trades)
+    cells = [label, '', '', '', '', '', '', str(int(sum(t['size'] for t in trades))),
+             _format_money(gross), _format_money(comm), '', '', '', '', '', '',
+             _format_money(fees), _format_money(net)]
+    return '<tr class="subtotal">' + ''.join(f'<td>{escape(cell)}</td>' for cell in cells) + '</tr>'
+
+
+def render_report_html(trades_by_day, subtotals=True):
+    """Renderiza una página report.php con la tabla class="report" de trades"""
+    colspan = len(REPORT_COLUMNS)
+    parts = [
+        '<!DOCTYPE html>\n<html><head><title>PropReports - Trades</title></head><body>\n',
+        '<div id="content">\n<table class="report">\n',
+        '<tr class="summary">' + ''.join(f'<th>{col}</th>' for col in REPORT_COLUMNS) + '</tr>\n'
+    ]
+    all_trades = []
+    for date_str in sorted(trades_by_day):
+        trades = trades_by_day[date_str]
+        label = datetime.strptime(date_str, '%Y-%m-%d').strftime('%a, %b %d, %Y')
+        parts.append(f'<tr class="sectionSeparator"><td colspan="{colspan}">{label}</td></tr>\n')
+        for trade in trades:
+            parts.append(_trade_row(trade))
+            parts.append('\n')
+        if subtotals and trades:
+            parts.append(_subtotal_row('Equities', trades))
+            parts.append('\n')
+        all_trades.extend(trades)
+
+    if subtotals and all_trades:
+        parts.append(_subtotal_row('Totals:', all_trades).replace('class="subtotal"', 'class="summary"'))
+        parts.append('\n')
+    parts.append('</table>\n</div>\n</body></html>\n')
+    return ''.join(parts)
+
+
+def generate_report_html(start_date, days, trades_per_day, symbols=DEFAULT_SYMBOLS, seed=42,
+                         subtotals=True):
+    """Atajo: genera trades y devuelve el HTML de report.php"""
+    return render_report_html(generate_trades(start_date, days, trades_per_day, symbols, seed), subtotals)
+
+
+def daily_file_data(date_str, trades, account=SYNTHETIC_ACCOUNT):
+    """Mismo formato que write_daily_file, con marcas de tiempo fijas"""
+    return {
+        'exportDate': SYNTHETIC_TIMESTAMP,
+        'account': account,
+        'date': date_str,
+        'trades': trades,
+        'summary': {
+            'totalTrades': len(trades),
+            'totalPnL': round(sum(t.get('pnl', 0) for t in trades), 2),
+            'totalCommissions': round(sum(t.get('commission', 0) for t in trades), 2),
+            'netPnL': round(sum(t.get('net', 0) for t in trades), 2),
+            'winningTrades': len([t for t in trades if t.get('pnl', 0) > 0]),
+            'losingTrades': len([t for t in trades if t.get('pnl', 0) < 0]),
+            'symbols': sorted(set(t.get('symbol', '') for t in trades if t.get('symbol')))
+        },
+        'metadata': {
+            'reprocessed': False,
+            'processedAt': SYNTHETIC_TIMESTAMP,
+            'source': 'synthetic'
+        }
+    }
+
+
+def write_exports_tree(base_dir, start_date, days, trades_per_day, symbols=DEFAULT_SYMBOLS, seed=42):
+    """
+    Escribe un árbol exports/ sintético (solo archivos diarios)
+
+    Los resúmenes semanales/mensuales se generan después con los scripts
+    normales. Devuelve el número total de trades escritos.
+    """
+    daily_dir = os.path.join(base_dir, "daily")
+    os.makedirs(daily_dir, exist_ok=True)
+    total = 0
+    for date_str, trades in generate_trades(start_date, days, trades_per_day, symbols, seed).items():
+        with open(os.path.join(daily_dir, f"{date_str}.json"), 'w', encoding='utf-8') as f:
+            json.dump(daily_file_data(date_str, trades), f, indent=2, ensure_ascii=False)
+        total += len(trades)
+    return total
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Genera datos sintéticos de PropReports')
+    parser.add_argument('kind', choices=['html', 'tree'], help='html: página report.php; tree: árbol exports/')
+    parser.add_argument('output', help='Archivo HTML o directorio exports de destino')
+    parser.add_argument('--start', default='2024-01-02')
+    parser.add_argument('--days', type=int, default=5, help='Días hábiles a generar')
+    parser.add_argument('--trades-per-day', type=int, default=50)
+    parser.add_argument('--symbols', type=int, default=len(DEFAULT_SYMBOLS),
+                        help=f'Cantidad de símbolos (máx. {len(DEFAULT_SYMBOLS)})')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--no-subtotals', action='store_true', help='Omitir filas de subtotal y totales')
+    args = parser.parse_args(argv)
+
+    symbols = DEFAULT_SYMBOLS[:max(1, args.symbols)]
+    if args.kind == 'html':
+        html = generate_report_html(args.start, args.days, args.trades_per_day, symbols, args.seed,
+                                    subtotals=not args.no_subtotals)
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(html)
+        print(f"✅ {args.days * args.trades_per_day} trades en {args.output} ({len(html) / 1024:.0f} KB)")
+    else:
+        total = write_exports_tree(args.output, args.start, args.days, args.trades_per_day, symbols, args.seed)
+        print(f"✅ {total} trades en {args.output}/daily ({args.days} días)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+"""
+Trazas por fase: spans con duración para saber dónde se va el tiempo
+Cada fase (login, descarga, parseo, resúmenes, serialización, lectura y
+escritura de archivos) se envuelve en un span. Al final de la ejecución se
+imprime una tabla resumen y, si se configuró, se escribe la traza en JSON
+estructurado y/o en formato Chrome trace-event (chrome://tracing, Perfetto).
+
+Uso:
+    with span('http.report', days=7) as attrs:
+        ...
+        attrs['bytes'] = len(html)
+
+Con el perfilado de memoria activo (--profile-memory o
+PROPREPORTS_PROFILE_MEMORY=1) cada span del hilo principal registra además
+el pico de memoria asignada durante el span (tracemalloc).
+
+Variables de entorno:
+    PROPREPORTS_TRACE           ruta del JSON de la traza
+    PROPREPORTS_TRACE_CHROME    ruta de la traza en formato Chrome
+    PROPREPORTS_PROFILE_MEMORY  1 para medir el pico de memoria por span
+"""
+
+import os
+import json
+import time
+import threading
+import tracemalloc
+from functools import wraps
+from contextlib import contextmanager
+from datetime import datetime
+
+# Máximo de spans individuales guardados para el archivo de traza
+# (el resumen por nombre se acumula siempre, sin límite)
+MAX_EVENTS = int(os.getenv('PROPREPORTS_TRACE_MAX_EVENTS', '200000'))
+
+
+class Tracer:
+    """Acumula spans de todos los hilos del proceso"""
+
+    def __init__(self):
+        self.started_at = datetime.now()
+        self.origin = time.perf_counter()
+        self.events = []
+        self.totals = {}
+        self.dropped = 0
+        self.listeners = []
+        self.profile_memory = os.getenv('PROPREPORTS_PROFILE_MEMORY', '') not in ('', '0', 'false')
+        self._memory_stack = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _stack(self):
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    @contextmanager
+    def span(self, name, **attrs):
+        stack = self._stack()
+        parent = stack[-1][0] if stack else None
+        stack.append((name, attrs))
+        # tracemalloc es global al proceso: solo se atribuye a spans del hilo principal
+        memory = self.profile_memory and threading.current_thread() is threading.main_thread()
+        if memory:
+            self._memory_enter()
+        started = time.perf_counter()
+        try:
+            yield attrs
+        finally:
+            duration = time.perf_counter() - started
+            if memory:
+                attrs['peakBytes'] = self._memory_exit()
+            stack.pop()
+            self.record(name, started - self.origin, duration, parent, attrs)
+
+    def _memory_enter(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        current, peak = tracemalloc.get_traced_memory()
+        # El pico hasta ahora pertenece a los spans abiertos; se reinicia para medir el nuevo
+        for frame in self._memory_stack:
+            frame['peak'] = max(frame['peak'], peak)
+        tracemalloc.reset_peak()
+        self._memory_stack.append({'base': current, 'peak': current})
+
+    def _memory_exit(self):
+        """Pico de memoria por encima de lo asignado al abrir el span"""
+        _, peak = tracemalloc.get_traced_memory()
+        frame = self._memory_stack.pop()
+        frame_peak = max(frame['peak'], peak)
+        for parent in self._memory_stack:
+            parent['peak'] = max(parent['peak'], frame_peak)
+        tracemalloc.reset_peak()
+        return max(0, frame_peak - frame['base'])
+
+    def record(self, name, start, duration, parent=None, attrs=None,
+               pid=None, thread=None):
+        event = {
+            'name': name,
+            'start': round(start, 6),
+            'duration': round(duration, 6),
+            'parent': parent,
+            'pid': pid or os.getpid(),
+            'thread': thread or threading.current_thread().name,
+            'attrs': attrs or {}
+        }
+        with self._lock:
+            total = self.totals.setdefault(name, {'calls': 0, 'seconds': 0.0, 'max': 0.0, 'peakBytes': None})
+            total['calls'] += 1
+            total['seconds'] += duration
+            total['max'] = max(total['max'], duration)
+            if event['attrs'].get('peakBytes') is not None:
+                total['peakBytes'] = max(total['peakBytes'] or 0, event['attrs']['peakBytes'])
+            if len(self.events) < MAX_EVENTS:
+                self.events.append(event)
+            else:
+                self.dropped += 1
+        for listener in self.listeners:
+            listener(event)
+
+    def annotate(self, **attrs):
+        """Agrega atributos al span abierto más interno de este hilo"""
+        stack = self._stack()
+        if stack:
+            stack[-1][1].update(attrs)
+
+    def drain_events(self):
+        """
+        Entrega y descarta los spans de este proceso, con tiempos absolutos (epoch)
+
+        Pensado para workers de un pool: con fork heredan los spans del padre,
+        que se filtran por pid para no duplicarlos al hacer merge.
+        """
+        offset = self.started_at.timestamp()
+        pid = os.getpid()
+        with self._lock:
+            events = [dict(event, start=event['start'] + offset) for event in self.events if event['pid'] == pid]
+            self.events = []
+            self.totals = {}
+        return events
+
+    def merge(self, events):
+        """Incorpora spans exportados por un worker (p. ej. del pool de procesos)"""
+        offset = self.started_at.timestamp()
+        for event in events:
+            self.record(event['name'], event['start'] - offset, event['duration'],
+                        event['parent'], event['attrs'], event['pid'], event['thread'])
+
+    def wall_seconds(self):
+        return time.perf_counter() - self.origin
+
+    def summary(self):
+        with self._lock:
+            rows = [
+                {
+                    'name': name,
+                    'calls': total['calls'],
+                    'seconds': round(total['seconds'], 4),
+                    'meanMs': round(total['seconds'] / total['calls'] * 1000, 2),
+                    'maxMs': round(total['max'] * 1000, 2),
+                    'peakMB': round(total['peakBytes'] / 1048576, 2) if total.get('peakBytes') is not None else None
+                }
+                for name, total in self.totals.items()
+            ]
+        return sorted(rows, key=lambda row: row['seconds'], reverse=True)
+
+    def print_summary(self, title=None):
+        rows = self.summary()
+        if not rows:
+            return
+        wall = self.wall_seconds()
+        memory = any(row['peakMB'] is not None for row in rows)
+        print(f"\n🔎 Traza{f' de {title}' if title else ''} ({wall:.2f}s)")
+        print(f"  {'Span':<28} {'Llamadas':>8} {'Total s':>9} {'Media ms':>9} {'Máx ms':>9} {'% run':>6}"
+              + (f" {'Pico MB':>8}" if memory else ''))
+        print(f"  {'-' * 28} {'-' * 8} {'-' * 9} {'-' * 9} {'-' * 9} {'-' * 6}" + (f" {'-' * 8}" if memory else ''))
+        for row in rows:
+            share = row['seconds'] / wall * 100 if wall else 0
+            peak = ''
+            if memory:
+                peak = f" {row['peakMB']:>8.1f}" if row['peakMB'] is not None else f" {'-':>8}"
+            print(f"  {row['name']:<28} {row['calls']:>8} {row['seconds']:>9.2f} "
+                  f"{row['meanMs']:>9.1f} {row['maxMs']:>9.1f} {share:>5.0f}%{peak}")
+        if self.dropped:
+            print(f"  ({self.dropped} spans no guardados en la traza por PROPREPORTS_TRACE_MAX_EVENTS)")
+
+    def write_json(self, path, title=None):
+        data = {
+            'run': title,
+            'startedAt': self.started_at.strftime('%Y-%m-%d %H:%M:%S'),
+            'wallSeconds': round(self.wall_seconds(), 4),
+            'pid': os.getpid(),
+            'summary': self.summary(),
+            'droppedSpans': self.dropped,
+            'spans': self.events
+        }
+        _write(path, data)
+
+    def write_chrome(self, path):
+        """Formato trace-event: eventos completos ('X') en microsegundos"""
+        events = [
+            {
+                'name': event['name'],
+                'cat': event['name'].split('.')[0],
+                'ph': 'X',
+                'ts': int(event['start'] * 1e6),
+                'dur': int(event['duration'] * 1e6),
+                'pid': event['pid'],
+                'tid': event['thread'],
+                'args': event['attrs']
+            }
+            for event in self.events
+        ]
+        _write(path, {'traceEvents': events, 'displayTimeUnit': 'ms'})
+
+
+def _write(path, data):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=1, ensure_ascii=False, default=str)
+
+
+_tracer = Tracer()
+
+
+def get_tracer():
+    return _tracer
+
+
+def enable_memory_profiling():
+    """Activa tracemalloc y el pico de memoria por span (también en workers vía entorno)"""
+    os.environ['PROPREPORTS_PROFILE_MEMORY'] = '1'
+    _tracer.profile_memory = True
+
+
+def annotate(**attrs):
+    """Agrega atributos al span en curso (p. ej. filas parseadas)"""
+    _tracer.annotate(**attrs)
+
+
+def add_listener(listener):
+    """Registra una función que recibe cada span al cerrarse (ver metrics.py)"""
+    if listener not in _tracer.listeners:
+        _tracer.listeners.append(listener)
+
+
+def span(name, **attrs):
+    """Context manager que mide un bloque; devuelve el dict de atributos (editable)"""
+    return _tracer.span(name, **attrs)
+
+
+def traced(name):
+    """Decorador: mide cada llamada a la función como un span"""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with _tracer.span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def finish_run(title=None, trace_path=None, chrome_path=None):
+    """Imprime el resumen y escribe la traza si se pidió (argumentos o entorno)"""
+    _tracer.print_summary(title)
+    trace_path = trace_path or os.getenv('PROPREPORTS_TRACE')
+    chrome_path = chrome_path or os.getenv('PROPREPORTS_TRACE_CHROME')
+    if trace_path:
+        _tracer.write_json(trace_path, title)
+        print(f"💾 Traza JSON: {trace_path}")
+    if chrome_path:
+        _tracer.write_chrome(chrome_path)
+        print(f"💾 Traza Chrome: {chrome_path}")
@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""
+Cubo de agregados precalculado por (fecha, símbolo, hora, día de la semana, lado, duración)
+Cada día exportado se reduce a celdas con las medidas sumables de sus trades;
+cualquier desglose (por hora, por símbolo, por día de la semana...) sobre
+cualquier rango de fechas se obtiene sumando celdas, sin volver a leer ni
+recorrer los trades.
+
+El cubo se actualiza al ingerir (los exportadores llaman a replace_day al
+escribir el archivo diario) y sync() lo alinea con exports/daily para días
+escritos por otras vías, usando el hash del contenido de cada día (sueltos o
+archivados, ver daily_store.sync_days).
+
+Uso:
+    cube = load_cube()
+    by_hour = cube.rollup('2025-01-01', '2025-03-31', by=('hour',))
+    losers = cube.rollup(by=('symbol', 'side'), where={'weekday': 0})
+"""
+
+import os
+import json
+from datetime import datetime
+from state_store import state_path
+from daily_store import file_source, sync_days
+from trade_time import opened_hour, held_seconds
+from tracing import span
+
+CUBE_STATE_FILE = "trade_cube.json"
+CUBE_VERSION = 1
+
+DIMENSIONS = ('date', 'symbol', 'hour', 'weekday', 'side', 'duration')
+MEASURES = ('trades', 'wins', 'losses', 'pnl', 'commission', 'net', 'winPnL', 'lossPnL')
+WEEKDAYS = ('Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun')
+DURATION_BUCKETS = ('<5min', '5-15min', '15-60min', '>60min')
+
+_weekdays = {}
+
+
+def duration_bucket(seconds):
+    """Categoría de duración (mismos cortes que el análisis semanal); '' si se desconoce"""
+    if seconds is None:
+        return ''
+    if seconds < 5 * 60:
+        return '<5min'
+    if seconds < 15 * 60:
+        return '5-15min'
+    if seconds < 60 * 60:
+        return '15-60min'
+    return '>60min'
+
+
+def weekday_of(date_str):
+    weekday = _weekdays.get(date_str)
+    if weekday is None:
+        weekday = _weekdays[date_str] = datetime.strptime(date_str, '%Y-%m-%d').weekday()
+    return weekday
+
+
+def trade_side(trade):
+    side = trade.get('side')
+    if side:
+        return side
+    return 'BUY' if str(trade.get('type', '')).lower() == 'long' else 'SELL'
+
+
+def cell_key(trade):
+    """Clave de celda dentro de un día: (símbolo, hora, lado, duración)"""
+    hour = opened_hour(trade)
+    return (
+        trade.get('symbol') or 'UNKNOWN',
+        -1 if hour is None else hour,
+        trade_side(trade),
+        duration_bucket(held_seconds(trade))
+    )
+
+
+def _encode(key):
+    return '|'.join(str(part) for part in key)
+
+
+def _decode(text):
+    symbol, hour, side, duration = text.rsplit('|', 3)
+    return symbol, int(hour), side, duration
+
+
+def build_cells(trades):
+    """Reduce los trades de un día a {clave: [medidas]}"""
+    cells = {}
+    for trade in trades:
+        key = _encode(cell_key(trade))
+        cell = cells.get(key)
+        if cell is None:
+            cell = cells[key] = [0] * len(MEASURES)
+        pnl = trade.get('pnl', 0)
+        net = trade.get('net', 0)
+        cell[0] += 1
+        if pnl > 0:
+            cell[1] += 1
+            cell[6] += pnl
+        elif pnl < 0:
+            cell[2] += 1
+            cell[7] += pnl
+        cell[3] += pnl
+        cell[4] += trade.get('commission', 0)
+        cell[5] += net if net != 0 else pnl - trade.get('commission', 0)
+    return cells
+
+
+def finalize(measures):
+    """Medidas sumadas -> fila con totales redondeados y métricas derivadas"""
+    trades, wins, losses, pnl, commission, net, win_pnl, loss_pnl = measures
+    return {
+        'trades': trades,
+        'wins': wins,
+        'losses': losses,
+        'pnl': round(pnl, 2),
+        'commission': round(commission, 2),
+        'netPnL': round(net, 2),
+        'winRate': round(wins / trades, 4) if trades else 0,
+        'avgWin': round(win_pnl / wins, 2) if wins else 0,
+        'avgLoss': round(loss_pnl / losses, 2) if losses else 0,
+        'profitFactor': round(abs(win_pnl / loss_pnl), 2) if loss_pnl else 0,
+        'expectancy': round((win_pnl + loss_pnl) / trades, 2) if trades and wins and losses else 0
+    }
+
+
+class TradeCube:
+    """Celdas por día, persistidas en exports/.state/trade_cube.json"""
+
+    def __init__(self, days=None):
+        self.days = days if days is not None else {}
+        self.dirty = False
+
+    @classmethod
+    def load(cls):
+        path = state_path(CUBE_STATE_FILE)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return cls()
+        if state.get('version') != CUBE_VERSION:
+            # Formato viejo: se reconstruye desde los archivos diarios en sync()
+            return cls()
+        return cls(state.get('days', {}))
+
+    @classmethod
+    def from_trades(cls, trades):
+        """Cubo en memoria (sin persistir) a partir de una lista de trades"""
+        cube = cls()
+        by_date = {}
+        for trade in trades:
+            by_date.setdefault(trade.get('date', ''), []).append(trade)
+        for date_str, day_trades in by_date.items():
+            cube.days[date_str] = {'source': None, 'cells': build_cells(day_trades)}
+        return cube
+
+    def replace_day(self, date_str, trades, path=None, source=None):
+        """Recalcula las celdas de un día (al ingerir); path registra el archivo de origen"""
+        if path and source is None:
+            source = file_source(path)
+        entry = self.days.get(date_str)
+        if source is not None and entry and entry.get('source') == source:
+            return  # Mismo contenido: nada que recalcular
+        self.days[date_str] = {'source': source, 'cells': build_cells(trades)}
+        self.dirty = True
+
+    def remove_day(self, date_str):
+        if self.days.pop(date_str, None) is not None:
+            self.dirty = True
+
+    def sync(self, base_dir=None):
+        """Reconstruye los días cuyo contenido (suelto o archivado) cambió o falta en el cubo; devuelve cuántos"""
+        with span('cube.sync') as attrs:
+            rebuilt = sync_days(self, base_dir)
+            attrs['rebuilt'] = rebuilt
+        return rebuilt
+
+    def dates(self, start=None, end=None):
+        return sorted(d for d in self.days if (start is None or d >= start) and (end is None or d <= end))
+
+    def query(self, start=None, end=None, by=(), where=None):
+        """
+        Suma las celdas del rango agrupando por las dimensiones de `by`
+
+        Args:
+            start/end: fechas YYYY-MM-DD (inclusive); None = sin límite
+            by: dimensiones de DIMENSIONS por las que agrupar
+            where: {dimensión: valor o conjunto de valores} para filtrar
+
+        Returns:
+            {tupla de valores de `by`: lista de medidas en el orden de MEASURES}
+        """
+        for dim in list(by) + list(where or {}):
+            if dim not in DIMENSIONS:
+                raise ValueError(f"Dimensión desconocida: {dim}")
+        filters = {}
+        for dim, value in (where or {}).items():
+            filters[dim] = set(value) if isinstance(value, (set, list, tuple)) else {value}
+        # Fecha y día de la semana se filtran por día; el resto, por celda
+        day_filters = {dim: values for dim, values in filters.items() if dim in ('date', 'weekday')}
+        cell_filters = {dim: values for dim, values in filters.items() if dim not in day_filters}
+
+        result = {}
+        for date_str in self.dates(start, end):
+            day = {'date': date_str, 'weekday': weekday_of(date_str)}
+            if any(day[dim] not in values for dim, values in day_filters.items()):
+                continue
+            for key, measures in self.days[date_str]['cells'].items():
+                symbol, hour, side, duration = _decode(key)
+                row = {'symbol': symbol, 'hour': hour, 'side': side, 'duration': duration, **day}
+                if any(row[dim] not in values for dim, values in cell_filters.items()):
+                    continue
+                group = tuple(row[dim] for dim in by)
+                total = result.get(group)
+                if total is None:
+                    total = result[group] = [0] * len(MEASURES)
+                for i, value in enumerate(measures):
+                    total[i] += value
+        return result
+
+    def rollup(self, start=None, end=None, by=(), where=None):
+        """Como query(), pero devuelve filas {dimensión: valor, ...medidas finalizadas} ordenadas"""
+        rows = []
+        for group, measures in sorted(self.query(start, end, by, where).items()):
+            row = dict(zip(by, group))
+            row.update(finalize(measures))
+            rows.append(row)
+        return rows
+
+    def save(self):
+        if not self.dirty:
+            return None
+        path = state_path(CUBE_STATE_FILE)
+        # Varios procesos (pool de generadores) pueden sincronizar a la vez
+        tmp_path = f"{path}.tmp.{os.getpid()}"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': CUBE_VERSION, 'days': self.days}, f, separators=(',', ':'), ensure_ascii=False)
+        os.replace(tmp_path, path)
+        self.dirty = False
+        return path
+
+
+def load_cube(sync=True, base_dir=None):
+    """Carga el cubo persistido y, por defecto, lo alinea con los archivos diarios"""
+    cube = TradeCube.load()
+    if sync:
+        cube.sync(base_dir)
+        cube.save()
+    return cube
+
+
+def record_day(date_str, trades, path, cube=None):
+    """Hook de ingesta: actualiza el día en el cubo y lo guarda si no se pasó uno compartido"""
+    shared = cube is not None
+    cube = cube or TradeCube.load()
+    cube.replace_day(date_str, trades, path)
+    if not shared:
+        cube.save()
+    return cube
+
+
+def hour_label(hour):
+    return f"{hour:02d}" if hour >= 0 else 'unknown'
+
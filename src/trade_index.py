@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Identidad estable de trades e índice persistente de deduplicación
+Cada trade recibe un ID determinista (hash de sus campos) y el índice
+recuerda qué IDs tiene cada día ya exportado, para que las descargas
+solapadas solo escriban los días que realmente cambiaron.
+"""
+
+import os
+import json
+import hashlib
+from state_store import load_state, save_state
+
+INDEX_STATE_FILE = "trade_index.json"
+
+# Campos que identifican un trade de forma única
+ID_FIELDS = ('account', 'date', 'opened', 'closed', 'symbol', 'type', 'entry', 'exit', 'size')
+
+
+def trade_key(trade):
+    """Clave canónica del trade a partir de los campos de identidad"""
+    return '|'.join(str(trade.get(field, '')) for field in ID_FIELDS)
+
+
+def trade_id(trade, occurrence=0):
+    """ID determinista del trade; occurrence distingue trades idénticos del mismo día"""
+    key = trade_key(trade)
+    if occurrence:
+        key = f"{key}#{occurrence}"
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]
+
+
+def assign_trade_ids(trades):
+    """Asigna 'id' a cada trade (in-place) y devuelve la lista"""
+    seen = {}
+    for trade in trades:
+        key = trade_key(trade)
+        occurrence = seen.get(key, 0)
+        seen[key] = occurrence + 1
+        trade['id'] = trade_id(trade, occurrence)
+    return trades
+
+
+class TradeIndex:
+    """
+    Índice persistente día -> IDs de trades
+
+    Se guarda en exports/.state/trade_index.json; en memoria se mantiene
+    también el mapa inverso ID -> día para búsquedas O(1).
+    """
+
+    def __init__(self):
+        self.days = load_state(INDEX_STATE_FILE, {}).get('days', {})
+        self.by_id = {}
+        for date_str, ids in self.days.items():
+            for tid in ids:
+                self.by_id[tid] = date_str
+        self.dirty = False
+
+    def __contains__(self, tid):
+        return tid in self.by_id
+
+    def date_of(self, tid):
+        return self.by_id.get(tid)
+
+    def ids_for(self, date_str):
+        return self.days.get(date_str)
+
+    def seed_from_file(self, date_str, filename):
+        """Indexa un archivo diario previo al índice (archivos antiguos sin IDs)"""
+        if date_str in self.days or not os.path.exists(filename):
+            return
+        try:
+            with open(filename, 'r', encoding='utf-8') as f:
+                existing = json.load(f).get('trades', [])
+        except Exception:
+            return
+        self.upsert_day(date_str, assign_trade_ids(existing))
+
+    def diff_day(self, date_str, trades):
+        """
+        Compara los trades descargados de un día con los ya indexados
+
+        Returns:
+            dict con 'added' (trades nuevos), 'removed' (IDs que ya no están),
+            'changed' (bool) y 'known' (si el día ya estaba indexado)
+        """
+        for trade in trades:
+            if 'id' not in trade:
+                assign_trade_ids(trades)
+                break
+
+        known_ids = self.days.get(date_str)
+        known = set(known_ids) if known_ids is not None else set()
+        fetched = {t['id'] for t in trades}
+
+        added = [t for t in trades if t['id'] not in known]
+        removed = sorted(known - fetched)
+        return {
+            'added': added,
+            'removed': removed,
+            'changed': known_ids is None or bool(added) or bool(removed),
+            'known': known_ids is not None
+        }
+
+    def upsert_day(self, date_str, trades):
+        """Registra el conjunto de IDs vigente para el día (la descarga es la fuente de verdad)"""
+        for tid in self.days.get(date_str, []):
+            if self.by_id.get(tid) == date_str:
+                del self.by_id[tid]
+        ids = [t['id'] for t in trades]
+        self.days[date_str] = ids
+        for tid in ids:
+            self.by_id[tid] = date_str
+        self.dirty = True
+
+    def save(self):
+        if self.dirty:
+            save_state(INDEX_STATE_FILE, {'days': self.days})
+            self.dirty = False
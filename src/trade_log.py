@@ -0,0 +1,426 @@
+#!/usr/bin/env python3
+"""
+Log de trades append-only con índice de offsets
+Todos los trades exportados van a un único archivo JSONL
+(exports/.state/trade_log.jsonl), un registro por línea:
+
+    {"date": "2025-03-12", "source": "..."}               cabecera del día
+    {"date": "2025-03-12", "id": "...", "trade": {...}}   trade
+    {"date": "2025-03-12", "tombstone": true}             anula lo anterior del día
+
+La cabecera y los trades de un día se escriben juntos, así que cada día es un
+rango contiguo de bytes. Cuando un día cambia (reproceso, re-exportación) se agrega
+un tombstone y el reemplazo al final del log; nunca se reescribe en el lugar.
+El índice (trade_log.index.json) guarda por día el offset y largo de su rango
+y el offset de cada trade por ID, más los bytes muertos. Cuando los bytes
+muertos superan PROPREPORTS_TRADE_LOG_COMPACT_RATIO del log (por defecto
+0.5), save() lo reescribe en orden de fecha sin los registros anulados.
+
+Los lectores mapean el log en memoria (mmap) y leen solo los rangos de los
+días pedidos, sin abrir un archivo por día. Si el índice falta o quedó atrás
+del log (p. ej. un corte entre el append y el guardado del índice), se
+reconstruye reproduciendo el log: un tombstone descarta lo anterior del día.
+
+Los exportadores agregan el día al escribir el archivo diario y sync() alinea
+el log con exports/daily (sueltos y archivados) igual que el cubo, por hash
+del contenido de cada día. Un día cuyos trades no cambiaron (mismo hash de
+sus líneas) no se vuelve a agregar aunque cambie su archivo. Si el rango del
+día es lo último del log, append_trades() le agrega solo los trades nuevos
+(modo watch) y save(index=False) no reescribe el índice: la cola del log se
+reproduce al cargarlo.
+
+El daemon watch y el pipeline pueden escribir el mismo log. Cada escritura
+toma un bloqueo exclusivo (trade_log.jsonl.lock) y, con el bloqueo tomado,
+compara el tamaño real del log con el del índice en memoria: si otro proceso
+agregó registros (o compactó el log), se recarga el índice hasta el final
+real y se vuelven a aplicar las operaciones pendientes de este proceso. El
+log solo se trunca en esa recuperación, para descartar la línea a medio
+escribir de un proceso cortado.
+
+Uso:
+    log = load_trade_log()
+    for date_str, trades in log.read_range('2025-01-01', '2025-03-31'):
+        ...
+    log.trade('2025-03-12', trade_id)
+"""
+
+import os
+import json
+import mmap
+import hashlib
+from contextlib import contextmanager
+from state_store import state_path
+from daily_store import file_source, sync_days
+from trade_index import assign_trade_ids
+from tracing import span
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin bloqueo entre procesos
+    fcntl = None
+
+TRADE_LOG_FILE = "trade_log.jsonl"
+TRADE_LOG_INDEX_FILE = "trade_log.index.json"
+TRADE_LOG_VERSION = 1
+COMPACT_RATIO = float(os.getenv('PROPREPORTS_TRADE_LOG_COMPACT_RATIO', '0.5'))
+# Por debajo de este tamaño de bytes muertos no vale la pena reescribir el log
+COMPACT_MIN_BYTES = 1 << 20
+
+
+def _line(record):
+    return (json.dumps(record, separators=(',', ':'), ensure_ascii=False) + '\n').encode('utf-8')
+
+
+def day_records(date_str, trades):
+    """Líneas del log para los trades de un día y sus IDs (en el orden del archivo diario)"""
+    # Archivos viejos sin 'id': se calcula igual que al exportar, sin tocar los trades
+    if any('id' not in trade for trade in trades):
+        ids = [trade['id'] for trade in assign_trade_ids([dict(trade) for trade in trades])]
+    else:
+        ids = [trade['id'] for trade in trades]
+    return [(trade_id, _line({'date': date_str, 'id': trade_id, 'trade': trade})) for trade_id, trade in zip(ids, trades)]
+
+
+def _tombstone(date_str):
+    return _line({'date': date_str, 'tombstone': True})
+
+
+class TradeLog:
+    """Log JSONL de trades más el índice fecha -> rango de bytes y ID -> offset"""
+
+    def __init__(self, days=None, size=0, dead=0):
+        # days: {fecha: {'source', 'offset', 'length', 'ids': {id: offset}, 'digest': sha1 de las líneas}}
+        self.days = days if days is not None else {}
+        self.size = size
+        self.dead = dead
+        self.pending = []
+        # Operaciones que generaron `pending`, para re-aplicarlas si otro proceso escribió antes
+        self.ops = []
+        self.dirty = False
+        self._lock = None
+
+    @staticmethod
+    def log_path():
+        return state_path(TRADE_LOG_FILE)
+
+    @classmethod
+    def load(cls):
+        try:
+            with open(state_path(TRADE_LOG_INDEX_FILE), 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            state = {}
+        try:
+            log_size = os.path.getsize(cls.log_path())
+        except OSError:
+            log_size = 0
+        if state.get('version') != TRADE_LOG_VERSION or state.get('size', 0) > log_size:
+            # Sin índice válido (o el log se truncó): se reconstruye reproduciendo el log
+            log = cls()
+        else:
+            log = cls(state.get('days', {}), state['size'], state.get('dead', 0))
+        if log.size < log_size:
+            log._replay(log.size, log_size)
+        return log
+
+    def _replay(self, start, end):
+        """Aplica al índice los registros del log entre start y end (bytes)"""
+        digests = {}
+        with span('trade_log.replay', bytes=end - start):
+            with open(self.log_path(), 'rb') as f:
+                f.seek(start)
+                offset = start
+                for line in f:
+                    if offset + len(line) > end or not line.endswith(b'\n'):
+                        break  # Línea a medio escribir: se descarta con el próximo append
+                    record = json.loads(line)
+                    date_str = record['date']
+                    day = self.days.get(date_str)
+                    if record.get('tombstone'):
+                        if day:
+                            self.dead += day['length']
+                            del self.days[date_str]
+                        self.dead += len(line)
+                    elif 'trade' not in record:
+                        # Cabecera: empieza el rango del día
+                        if day:
+                            self.dead += day['length']
+                        self.days[date_str] = {'source': record.get('source'), 'offset': offset,
+                                               'length': len(line), 'ids': {}}
+                        digests[date_str] = hashlib.sha1()
+                    elif day is not None:
+                        day['length'] += len(line)
+                        day['ids'][record['id']] = offset
+                        if date_str in digests:
+                            digests[date_str].update(line)
+                        else:
+                            # Trades agregados a un día del índice: su hash se recalcula si hace falta
+                            day['digest'] = None
+                    offset += len(line)
+        for date_str, digest in digests.items():
+            if date_str in self.days:
+                self.days[date_str]['digest'] = digest.hexdigest()
+        self.size = offset
+        self.dirty = True
+
+    def replace_day(self, date_str, trades, path=None, source=None):
+        """
+        Agrega el día al final del log (con tombstone si ya estaba); se escribe en save()
+
+        Si el contenido del día no cambió (mismo origen, o mismas líneas de
+        trades) no se agrega nada: solo se actualiza el origen en el índice.
+        """
+        if path and source is None:
+            source = file_source(path)
+        old = self.days.get(date_str)
+        if source is not None and old and old.get('source') == source:
+            return
+        records = day_records(date_str, trades)
+        digest = hashlib.sha1(b''.join(line for _, line in records)).hexdigest()
+        if old and not old.get('digest'):
+            # El hash se calcula del log: primero se escribe lo pendiente (puede recargar el índice)
+            self._flush()
+            old = self.days.get(date_str)
+        if old and self._digest(old) == digest:
+            old['source'] = source
+            self.ops.append(('replace_day', date_str, trades, None, source))
+            self.dirty = True
+            return
+        offset = self.size + sum(len(line) for line in self.pending)
+        if old is not None:
+            tombstone = _tombstone(date_str)
+            self.pending.append(tombstone)
+            self.dead += old['length'] + len(tombstone)
+            offset += len(tombstone)
+        # El origen va en la cabecera para que una reconstrucción del índice no relea el día
+        header = _line({'date': date_str, 'source': source})
+        self.pending.append(header)
+        entry = {'source': source, 'offset': offset, 'length': len(header), 'ids': {}, 'digest': digest}
+        for trade_id, line in records:
+            self.pending.append(line)
+            entry['ids'][trade_id] = offset + entry['length']
+            entry['length'] += len(line)
+        self.days[date_str] = entry
+        self.ops.append(('replace_day', date_str, trades, None, source))
+        self.dirty = True
+
+    def append_trades(self, date_str, trades, source=None):
+        """
+        Agrega trades nuevos a un día en O(trades nuevos)
+
+        Solo si el rango del día es lo último del log (el día que se está
+        vigilando); si no, el día se reemplaza completo con tombstone.
+        """
+        entry = self.days.get(date_str)
+        end = self.size + sum(len(line) for line in self.pending)
+        if entry is None or entry['offset'] + entry['length'] != end:
+            self._flush()
+            existing = dict(self.iter_days([date_str])).get(date_str, [])
+            return self.replace_day(date_str, existing + list(trades), source=source)
+        for trade_id, line in day_records(date_str, trades):
+            self.pending.append(line)
+            entry['ids'][trade_id] = entry['offset'] + entry['length']
+            entry['length'] += len(line)
+        entry['source'] = source
+        entry['digest'] = None
+        self.ops.append(('append_trades', date_str, trades, source))
+        self.dirty = True
+
+    def _digest(self, entry):
+        """Hash de las líneas de trades de un día (sin 'digest' guardado: se calcula del log ya escrito)"""
+        if not entry.get('digest'):
+            with open(self.log_path(), 'rb') as f:
+                f.seek(entry['offset'])
+                f.readline()  # Cabecera
+                entry['digest'] = hashlib.sha1(f.read(entry['length'] - (f.tell() - entry['offset']))).hexdigest()
+        return entry['digest']
+
+    def remove_day(self, date_str):
+        old = self.days.pop(date_str, None)
+        if old is not None:
+            tombstone = _tombstone(date_str)
+            self.pending.append(tombstone)
+            self.dead += old['length'] + len(tombstone)
+            self.ops.append(('remove_day', date_str))
+            self.dirty = True
+
+    def sync(self, base_dir=None):
+        """Alinea el log con los días cuyo contenido (suelto o archivado) cambió o falta; devuelve cuántos releyó"""
+        with span('trade_log.sync') as attrs:
+            rebuilt = sync_days(self, base_dir)
+            attrs['rebuilt'] = rebuilt
+        return rebuilt
+
+    def dates(self, start=None, end=None):
+        return sorted(d for d in self.days if (start is None or d >= start) and (end is None or d <= end))
+
+    def iter_days(self, dates):
+        """Genera (fecha, trades) de los días del log, en el orden pedido, con un solo mmap"""
+        entries = [(date_str, self.days[date_str]) for date_str in dates if date_str in self.days]
+        if not entries:
+            return
+        with open(self.log_path(), 'rb') as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                for date_str, entry in entries:
+                    start = entry['offset']
+                    # La primera línea del rango es la cabecera del día
+                    lines = mm[start:start + entry['length']].splitlines()[1:]
+                    yield date_str, [json.loads(line)['trade'] for line in lines]
+
+    def read_range(self, start=None, end=None):
+        """Genera (fecha, trades) de los días entre start y end (YYYY-MM-DD, inclusive) en orden"""
+        return self.iter_days(self.dates(start, end))
+
+    def trade(self, date_str, trade_id):
+        """Un trade por fecha e ID (un seek); None si no está en el log"""
+        offset = self.days.get(date_str, {}).get('ids', {}).get(trade_id)
+        if offset is None:
+            return None
+        with open(self.log_path(), 'rb') as f:
+            f.seek(offset)
+            return json.loads(f.readline())['trade']
+
+    def needs_compaction(self):
+        return self.dead >= COMPACT_MIN_BYTES and self.dead > COMPACT_RATIO * self.size
+
+    def compact(self):
+        """Reescribe el log en orden de fecha sin registros anulados (tmp + rename)"""
+        with self._locked():
+            self._realign()
+            self._flush()
+            self._compact()
+
+    def _compact(self):
+        path = self.log_path()
+        tmp_path = f"{path}.tmp.{os.getpid()}"
+        days = {}
+        offset = 0
+        with span('trade_log.compact', dead=self.dead, size=self.size):
+            with open(tmp_path, 'wb') as out:
+                if self.size:
+                    with open(path, 'rb') as f:
+                        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                            for date_str in sorted(self.days):
+                                entry = self.days[date_str]
+                                start = entry['offset']
+                                out.write(mm[start:start + entry['length']])
+                                shift = offset - start
+                                days[date_str] = {
+                                    'source': entry['source'],
+                                    'offset': offset,
+                                    'length': entry['length'],
+                                    'ids': {trade_id: pos + shift for trade_id, pos in entry['ids'].items()},
+                                    'digest': entry.get('digest')
+                                }
+                                offset += entry['length']
+            os.replace(tmp_path, path)
+        self.days = days
+        self.size = offset
+        self.dead = 0
+        self.dirty = True
+        self._save_index()
+
+    @contextmanager
+    def _locked(self):
+        """Bloqueo exclusivo del log entre procesos (reentrante dentro del proceso); True si lo tomó"""
+        if self._lock is not None:
+            yield False
+            return
+        with open(state_path(f"{TRADE_LOG_FILE}.lock"), 'w') as lock:
+            if fcntl:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            self._lock = lock
+            try:
+                yield True
+            finally:
+                self._lock = None
+
+    def _realign(self):
+        """
+        Con el bloqueo tomado: si el log no termina donde cree el índice en
+        memoria (otro proceso agregó o compactó), recarga el índice hasta el
+        final real y vuelve a aplicar las operaciones pendientes
+        """
+        try:
+            log_size = os.path.getsize(self.log_path())
+        except OSError:
+            log_size = 0
+        if log_size == self.size:
+            return
+        ops = self.ops
+        fresh = TradeLog.load()
+        if fresh.size < log_size:
+            # Línea a medio escribir de un proceso cortado: nadie más escribe mientras dure el bloqueo
+            with open(self.log_path(), 'r+b') as f:
+                f.truncate(fresh.size)
+        self.days, self.size, self.dead = fresh.days, fresh.size, fresh.dead
+        self.pending = []
+        self.ops = []
+        self.dirty = True
+        for name, *args in ops:
+            getattr(self, name)(*args)
+
+    def _flush(self):
+        """Agrega al log los registros pendientes (con el bloqueo tomado)"""
+        if not self.pending:
+            return
+        with self._locked() as acquired:
+            if acquired:
+                self._realign()
+            path = self.log_path()
+            with span('io.write', path=path):
+                with open(path, 'ab') as f:
+                    for line in self.pending:
+                        f.write(line)
+                        self.size += len(line)
+        self.pending = []
+        self.ops = []
+
+    def _save_index(self):
+        path = state_path(TRADE_LOG_INDEX_FILE)
+        tmp_path = f"{path}.tmp.{os.getpid()}"
+        state = {'version': TRADE_LOG_VERSION, 'size': self.size, 'dead': self.dead, 'days': self.days}
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f, separators=(',', ':'), ensure_ascii=False)
+        os.replace(tmp_path, path)
+        self.dirty = False
+
+    def save(self, index=True):
+        """
+        Escribe los registros pendientes y el índice
+
+        Con index=False solo se agrega al log (O(registros nuevos)); el índice
+        queda atrás y load() reproduce la cola.
+        """
+        if not self.dirty:
+            return None
+        with self._locked():
+            self._realign()
+            # Primero el log y después el índice: un corte en el medio se repara con _replay()
+            self._flush()
+            if not index:
+                return self.log_path()
+            if self.needs_compaction():
+                self._compact()
+            else:
+                self._save_index()
+        return self.log_path()
+
+
+def load_trade_log(sync=True, base_dir=None):
+    """Carga el log y su índice y, por defecto, lo alinea con los archivos diarios"""
+    log = TradeLog.load()
+    if sync:
+        log.sync(base_dir)
+        log.save()
+    return log
+
+
+def record_day(date_str, trades, path, log=None):
+    """Hook de ingesta: agrega el día al log y lo guarda si no se pasó uno compartido"""
+    shared = log is not None
+    log = log or TradeLog.load()
+    log.replace_day(date_str, trades, path)
+    if not shared:
+        log.save()
+    return log
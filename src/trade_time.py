@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Normalización de horarios de trades
+El parser guarda 'opened', 'closed' y 'held' tal como los muestra PropReports
+("09:30:15", "07/21/2025 09:30:15", "0:05:12"). Aquí se convierten una sola vez
+a enteros que se guardan junto a los originales:
+
+    openedTs / closedTs  epoch en segundos (hora del exchange)
+    tzOffset             offset UTC del exchange ese día, en segundos
+    heldSeconds          duración del trade en segundos
+
+Con eso cualquier análisis por hora o duración es aritmética entera; los
+helpers opened_hour() y held_seconds() caen al parseo de texto para archivos
+diarios escritos antes de que existieran estos campos.
+
+Variables de entorno:
+    PROPREPORTS_TIMEZONE  zona horaria del exchange (por defecto America/New_York)
+"""
+
+import os
+from datetime import datetime, date, timezone
+
+try:
+    from zoneinfo import ZoneInfo
+except ImportError:  # pragma: no cover - Python < 3.9
+    ZoneInfo = None
+
+EXCHANGE_TIMEZONE = os.getenv('PROPREPORTS_TIMEZONE', 'America/New_York')
+
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+DATE_FORMATS = ('%m/%d/%Y', '%Y-%m-%d', '%m/%d/%y')
+
+_offsets = {}
+
+
+def _exchange_tz():
+    try:
+        return ZoneInfo(EXCHANGE_TIMEZONE)
+    except Exception:
+        # Sin base de datos de zonas (p. ej. Windows sin tzdata): se asume UTC
+        return timezone.utc
+
+
+_tz = _exchange_tz() if ZoneInfo else timezone.utc
+
+
+def utc_offset(date_str):
+    """Offset UTC del exchange para una fecha YYYY-MM-DD (cacheado por día)"""
+    offset = _offsets.get(date_str)
+    if offset is None:
+        # Mediodía local: los cambios de horario ocurren de madrugada, fuera de sesión
+        noon = datetime.strptime(date_str, '%Y-%m-%d').replace(hour=12, tzinfo=_tz)
+        offset = _offsets[date_str] = int(noon.utcoffset().total_seconds())
+    return offset
+
+
+def parse_clock(text):
+    """'09:30:15', '9:30', '01:05:00 PM' -> segundos desde medianoche; None si no es una hora"""
+    text = text.strip()
+    meridiem = None
+    upper = text.upper()
+    if upper.endswith(('AM', 'PM')):
+        meridiem = upper[-2:]
+        text = text[:-2].strip()
+    parts = text.split(':')
+    if len(parts) < 2 or len(parts) > 3:
+        return None
+    try:
+        hours, minutes = int(parts[0]), int(parts[1])
+        seconds = int(float(parts[2])) if len(parts) == 3 else 0
+    except ValueError:
+        return None
+    if meridiem == 'PM' and hours < 12:
+        hours += 12
+    elif meridiem == 'AM' and hours == 12:
+        hours = 0
+    return hours * 3600 + minutes * 60 + seconds
+
+
+def parse_duration(text):
+    """'0:05:12' -> 312; con dos partes se interpreta H:MM como el análisis semanal"""
+    if not text:
+        return None
+    parts = text.strip().split(':')
+    try:
+        values = [int(float(part)) for part in parts]
+    except ValueError:
+        return None
+    if len(values) == 3:
+        return values[0] * 3600 + values[1] * 60 + values[2]
+    if len(values) == 2:
+        return values[0] * 3600 + values[1] * 60
+    return None
+
+
+def _split_datetime(text, date_str):
+    """Separa 'fecha hora' en (YYYY-MM-DD, segundos); sin fecha usa la del trade"""
+    text = text.strip()
+    pieces = text.split(' ', 1)
+    if len(pieces) == 2 and ':' not in pieces[0]:
+        for fmt in DATE_FORMATS:
+            try:
+                date_str = datetime.strptime(pieces[0], fmt).strftime('%Y-%m-%d')
+                break
+            except ValueError:
+                continue
+        text = pieces[1]
+    return date_str, parse_clock(text)
+
+
+def to_epoch(date_str, clock_seconds):
+    """Fecha local del exchange + segundos desde medianoche -> epoch (aritmética entera)"""
+    days = datetime.strptime(date_str, '%Y-%m-%d').toordinal() - EPOCH_ORDINAL
+    return days * 86400 + clock_seconds - utc_offset(date_str)
+
+
+def normalize_trade_times(trade):
+    """Agrega openedTs, closedTs, tzOffset y heldSeconds al trade (in-place)"""
+    date_str = trade.get('date')
+    if not date_str:
+        return trade
+    try:
+        opened_date, opened_clock = _split_datetime(trade.get('opened', ''), date_str)
+        if opened_clock is not None:
+            trade['openedTs'] = to_epoch(opened_date, opened_clock)
+            trade['tzOffset'] = utc_offset(opened_date)
+        closed_date, closed_clock = _split_datetime(trade.get('closed', ''), opened_date)
+        if closed_clock is not None:
+            closed_ts = to_epoch(closed_date, closed_clock)
+            if 'openedTs' in trade and closed_ts < trade['openedTs'] and closed_date == opened_date:
+                # Solo la hora y cierra "antes" de abrir: cruzó la medianoche
+                closed_ts += 86400
+            trade['closedTs'] = closed_ts
+    except ValueError:
+        # Fecha no reconocida: se conservan solo los textos originales
+        pass
+
+    held = parse_duration(trade.get('held', ''))
+    if held is None and 'openedTs' in trade and 'closedTs' in trade:
+        held = trade['closedTs'] - trade['openedTs']
+    if held is not None:
+        trade['heldSeconds'] = held
+    return trade
+
+
+def normalize_trades(trades):
+    for trade in trades:
+        normalize_trade_times(trade)
+    return trades
+
+
+def opened_ts(trade):
+    """Epoch de apertura; sin openedTs (archivos anteriores) se calcula de `opened`, None si no se puede"""
+    if 'openedTs' in trade:
+        return trade['openedTs']
+    date_str = trade.get('date')
+    if not date_str or not trade.get('opened'):
+        return None
+    try:
+        opened_date, clock = _split_datetime(trade['opened'], date_str)
+        return to_epoch(opened_date, clock) if clock is not None else None
+    except ValueError:
+        return None
+
+
+def opened_hour(trade):
+    """Hora local (0-23) de apertura; None si no se puede determinar"""
+    if 'openedTs' in trade:
+        return (trade['openedTs'] + trade.get('tzOffset', 0)) % 86400 // 3600
+    opened = trade.get('opened')
+    if not opened:
+        return None
+    clock = _split_datetime(opened, trade.get('date', ''))[1]
+    return clock // 3600 if clock is not None else None
+
+
+def held_seconds(trade):
+    """Duración del trade en segundos; None si no se puede determinar"""
+    if 'heldSeconds' in trade:
+        return trade['heldSeconds']
+    return parse_duration(trade.get('held', ''))
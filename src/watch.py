@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Modo watch: polling intradía de PropReports con ingesta incremental
+Cada ciclo hace una sola petición a report.php para el día de hoy, agrega
+al archivo diario solo los trades no vistos y actualiza los agregados
+diarios/semanales/mensuales en O(trades nuevos); en el cubo de desgloses
+solo se recalcula el día de hoy.
+
+Por ciclo solo se persisten deltas: los trades nuevos se agregan al final del
+log de trades (sin reescribir su índice) y el bucket de hoy al journal de los
+agregados. El índice de trades, el cubo y los índices completos se guardan
+cada PROPREPORTS_WATCH_CHECKPOINT_SECONDS (por defecto 900) y al salir; si el
+proceso se corta antes, se realinean desde el archivo diario por hash.
+
+Un archivo de hoy reescrito por otro proceso se detecta por el hash de su
+contenido (no por la cantidad de trades) y se vuelve a cargar completo.
+"""
+
+import os
+import sys
+import json
+import time
+from datetime import datetime
+from propreports_exporter import PropReportsExporter
+from daily_exporter import obfuscate_account, ensure_directory_structure
+from daily_store import file_source
+from trade_index import TradeIndex, assign_trade_ids
+from aggregates import load_aggregates, bucket_summary, period_keys
+from trade_cube import TradeCube
+from trade_log import TradeLog
+from tracing import traced
+from metrics import enable_metrics, serve_metrics, write_textfile
+from stable_output import write_json
+
+
+def load_day_trades(filename):
+    """Carga los trades ya guardados de un día"""
+    if not os.path.exists(filename):
+        return []
+    try:
+        with open(filename, 'r', encoding='utf-8') as f:
+            return json.load(f).get('trades', [])
+    except Exception:
+        return []
+
+
+def write_day(filename, date_str, trades, day_bucket, username):
+    """Escribe el archivo diario usando el resumen incremental del día"""
+    daily_data = {
+        'exportDate': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'account': obfuscate_account(username),
+        'date': date_str,
+        'trades': trades,
+        'summary': bucket_summary(day_bucket),
+        'metadata': {
+            'source': 'watch',
+            'processedAt': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        }
+    }
+    write_json(filename, daily_data)
+
+
+class TradeWatcher:
+    """Estado del daemon: exportador con sesión abierta, índice, agregados, cubo y log de trades"""
+
+    def __init__(self, exporter, checkpoint_seconds=None):
+        self.exporter = exporter
+        self.index = TradeIndex()
+        # Sincronizados al arrancar: semana y mes incluyen los días exportados por otras vías
+        self.aggregates = load_aggregates()
+        self.cube = TradeCube.load()
+        self.trade_log = TradeLog.load()
+        self.daily_dir = os.path.join(ensure_directory_structure(), "daily")
+        self.logged_in = False
+        # Origen (hash) del archivo de cada día tal como lo reflejan los índices en memoria
+        self.synced = {}
+        if checkpoint_seconds is None:
+            checkpoint_seconds = int(os.getenv('PROPREPORTS_WATCH_CHECKPOINT_SECONDS', '900'))
+        self.checkpoint_seconds = checkpoint_seconds
+        self.last_checkpoint = time.monotonic()
+
+    def _sync_day(self, date_str, filename):
+        """Recarga el día en índice, agregados, cubo y log si el archivo no es el que escribió este proceso"""
+        source = file_source(filename)
+        if source is None or self.synced.get(date_str) == source:
+            return
+        trades = assign_trade_ids(load_day_trades(filename))
+        self.index.upsert_day(date_str, trades)
+        # Cada uno se saltea el día si ya lo tiene con el mismo origen
+        self.aggregates.replace_day(date_str, trades, source=source)
+        self.cube.replace_day(date_str, trades, source=source)
+        self.trade_log.replace_day(date_str, trades, source=source)
+        self.synced[date_str] = source
+
+    def checkpoint(self, force=False):
+        """Guarda índice, cubo, log (con su índice) y foto de agregados cada checkpoint_seconds"""
+        if not force and time.monotonic() - self.last_checkpoint < self.checkpoint_seconds:
+            return False
+        self.index.save()
+        self.cube.save()
+        self.trade_log.save()
+        self.aggregates.save(checkpoint=True)
+        self.last_checkpoint = time.monotonic()
+        return True
+
+    @traced('watch.poll')
+    def poll_once(self):
+        """Un ciclo de polling; devuelve el número de trades nuevos"""
+        if not self.logged_in:
+            self.logged_in = self.exporter.login()
+            if not self.logged_in:
+                return 0
+
+        today = datetime.now().strftime('%Y-%m-%d')
+        filename = os.path.join(self.daily_dir, f"{today}.json")
+        self._sync_day(today, filename)
+
+        html_content = self.exporter.get_trades_page(today, today)
+        if not html_content:
+            # Posible sesión expirada: volver a autenticar en el próximo ciclo
+            self.logged_in = False
+            return 0
+
+        fetched = [t for t in self.exporter.parse_trades_html(html_content) if t.get('date') == today]
+        diff = self.index.diff_day(today, fetched)
+        if not diff['changed']:
+            return 0
+
+        existing = assign_trade_ids(load_day_trades(filename))
+        removed = set(diff['removed'])
+        removed_trades = [t for t in existing if t['id'] in removed]
+
+        # Solo los trades nuevos/eliminados tocan los agregados
+        self.aggregates.add_trades(today, diff['added'])
+        day_bucket = self.aggregates.add_trades(today, removed_trades, sign=-1)
+
+        kept = [t for t in existing if t['id'] not in removed]
+        trades = kept + diff['added']
+        write_day(filename, today, trades, day_bucket, self.exporter.username)
+        source = file_source(filename)
+        self.synced[today] = source
+        self.aggregates.mark_source(today, source)
+
+        self.index.upsert_day(today, trades)
+        self.cube.replace_day(today, trades, source=source)
+        if removed:
+            self.trade_log.replace_day(today, trades, source=source)
+        else:
+            self.trade_log.append_trades(today, diff['added'], source=source)
+
+        # Deltas por ciclo; lo completo en el checkpoint
+        self.trade_log.save(index=False)
+        self.aggregates.save()
+
+        week_key, month_key = period_keys(today)
+        week = self.aggregates.weekly[week_key]
+        month = self.aggregates.monthly[month_key]
+        print(f"🆕 {len(diff['added'])} trades nuevos ({today}) | "
+              f"Día: ${day_bucket['netPnL']:.2f} | Semana {week_key}: ${week['netPnL']:.2f} | "
+              f"Mes {month_key}: ${month['netPnL']:.2f}")
+        return len(diff['added'])
+
+
+def watch(interval=None, once=False):
+    """Bucle principal del daemon de polling"""
+    DOMAIN = os.getenv('PROPREPORTS_DOMAIN', 'zim.propreports.com')
+    USERNAME = os.getenv('PROPREPORTS_USER', 'ZIMDASE9C64')
+    PASSWORD = os.getenv('PROPREPORTS_PASS', 'Xby6lDWqAs')
+    if interval is None:
+        interval = int(os.getenv('PROPREPORTS_POLL_SECONDS', '300'))
+
+    enable_metrics()
+    serve_metrics()
+    watcher = TradeWatcher(PropReportsExporter(DOMAIN, USERNAME, PASSWORD))
+    print(f"👀 Vigilando trades de {obfuscate_account(USERNAME)} cada {interval}s (Ctrl+C para salir)")
+
+    try:
+        while True:
+            started = time.monotonic()
+            try:
+                watcher.poll_once()
+                watcher.checkpoint()
+            except Exception as e:
+                print(f"⚠️  Error en ciclo de polling: {e}")
+            write_textfile(run='watch')
+            if once:
+                break
+            time.sleep(max(0, interval - (time.monotonic() - started)))
+    except KeyboardInterrupt:
+        print("\n👋 Watch detenido")
+    finally:
+        watcher.checkpoint(force=True)
+
+
+if __name__ == "__main__":
+    once = '--once' in sys.argv
+    args = [arg for arg in sys.argv[1:] if arg != '--once']
+    watch(int(args[0]) if args else None, once=once)
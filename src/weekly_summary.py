@@ -5,10 +5,13 @@ Consolida los datos diarios en un resumen semanal
 """
 
 import os
-import json
-import glob
 from datetime import datetime, timedelta
-from collections import defaultdict
+from build_cache import BuildCache, daily_paths
+from tracing import traced
+from trade_cube import TradeCube, DURATION_BUCKETS, hour_label, load_cube
+from aggregates import load_aggregates, empty_bucket, period_keys
+from stable_output import write_json
+from daily_store import iter_daily, date_range
 
 def get_week_dates(date=None):
     """Obtiene las fechas de inicio y fin de la semana"""
@@ -24,33 +27,35 @@ def get_week_dates(date=None):
     
     return start_of_week, end_of_week
 
+@traced('io.read')
 def load_daily_files(week_start, week_end):
-    """Carga todos los archivos diarios de la semana"""
+    """Carga todos los archivos diarios de la semana (sueltos o archivados)"""
     base_dir = os.getenv('EXPORT_OUTPUT_DIR', 'exports')
-    daily_dir = os.path.join(base_dir, "daily")
-    daily_data = []
-    
-    # Iterar por cada día de la semana
-    current_date = week_start
-    while current_date <= week_end:
-        date_str = current_date.strftime('%Y-%m-%d')
-        file_path = os.path.join(daily_dir, f"{date_str}.json")
-        
-        if os.path.exists(file_path):
-            with open(file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                daily_data.append(data)
-        
-        current_date += timedelta(days=1)
-    
-    return daily_data
+    return [data for _, data in iter_daily(date_range(week_start, week_end), base_dir)]
 
-def analyze_trading_patterns(trades):
-    """Analiza patrones de trading"""
+def analyze_trading_patterns(trades, cube=None, start=None, end=None):
+    """
+    Analiza patrones de trading
+    
+    Los desgloses por hora, símbolo y duración se leen del cubo de agregados
+    (trade_cube) para el rango start..end; sin cubo se arma uno en memoria con
+    los trades. Las rachas dependen del orden y se calculan recorriendo los trades.
+    """
+    cube = cube or TradeCube.from_trades(trades)
+    by_duration = {row['duration']: row for row in cube.rollup(start, end, by=('duration',))}
     patterns = {
-        'by_hour': defaultdict(lambda: {'count': 0, 'pnl': 0}),
-        'by_symbol': defaultdict(lambda: {'count': 0, 'pnl': 0, 'win_rate': 0}),
-        'by_duration': defaultdict(lambda: {'count': 0, 'pnl': 0}),
+        'by_hour': {
+            hour_label(row['hour']): {'count': row['trades'], 'pnl': row['pnl']}
+            for row in cube.rollup(start, end, by=('hour',)) if row['hour'] >= 0
+        },
+        'by_symbol': {
+            row['symbol']: {'count': row['trades'], 'pnl': row['pnl'], 'win_rate': row['winRate']}
+            for row in cube.rollup(start, end, by=('symbol',))
+        },
+        'by_duration': {
+            bucket: {'count': by_duration[bucket]['trades'], 'pnl': by_duration[bucket]['pnl']}
+            for bucket in DURATION_BUCKETS if bucket in by_duration
+        },
         'consecutive_wins': 0,
         'consecutive_losses': 0,
         'max_consecutive_wins': 0,
@@ -61,45 +66,6 @@ def analyze_trading_patterns(trades):
     streak_type = None
     
     for trade in trades:
-        # Por hora del día
-        if trade.get('opened'):
-            try:
-                # Manejar diferentes formatos de fecha/hora
-                opened = trade['opened']
-                if ' ' in opened:
-                    time_part = opened.split(' ')[1]
-                else:
-                    time_part = opened
-                
-                if ':' in time_part:
-                    hour = time_part.split(':')[0]
-                    patterns['by_hour'][hour]['count'] += 1
-                    patterns['by_hour'][hour]['pnl'] += trade.get('pnl', 0)
-            except:
-                pass  # Ignorar si no se puede parsear
-        
-        # Por símbolo
-        symbol = trade.get('symbol', 'UNKNOWN')
-        patterns['by_symbol'][symbol]['count'] += 1
-        patterns['by_symbol'][symbol]['pnl'] += trade.get('pnl', 0)
-        
-        # Por duración de trade
-        if trade.get('held'):
-            duration_parts = trade['held'].split(':')
-            if len(duration_parts) >= 2:
-                minutes = int(duration_parts[0]) * 60 + int(duration_parts[1])
-                if minutes < 5:
-                    duration_category = '<5min'
-                elif minutes < 15:
-                    duration_category = '5-15min'
-                elif minutes < 60:
-                    duration_category = '15-60min'
-                else:
-                    duration_category = '>60min'
-                
-                patterns['by_duration'][duration_category]['count'] += 1
-                patterns['by_duration'][duration_category]['pnl'] += trade.get('pnl', 0)
-        
         # Rachas de wins/losses
         pnl = trade.get('pnl', 0)
         if pnl > 0:
@@ -117,20 +83,38 @@ def analyze_trading_patterns(trades):
                 streak_type = 'loss'
             patterns['max_consecutive_losses'] = max(patterns['max_consecutive_losses'], current_streak)
     
-    # Calcular win rates por símbolo
-    for symbol, data in patterns['by_symbol'].items():
-        symbol_trades = [t for t in trades if t.get('symbol') == symbol]
-        wins = len([t for t in symbol_trades if t.get('pnl', 0) > 0])
-        data['win_rate'] = round(wins / len(symbol_trades), 4) if symbol_trades else 0
-    
     return patterns
 
-def generate_weekly_summary(week_date=None):
-    """Genera resumen semanal consolidando datos diarios"""
+@traced('summary.weekly')
+def generate_weekly_summary(week_date=None, force=False, cube=None, aggregates=None):
+    """
+    Genera resumen semanal consolidando datos diarios
+    
+    Si los archivos diarios de la semana no cambiaron desde la última
+    generación (ver build_cache), no se regenera salvo con force=True.
+    Los totales salen de los agregados semanales (`aggregates`) y los
+    desgloses de `cube`; quien genera varias semanas pasa ambos ya
+    sincronizados. Si no se pasan se cargan y sincronizan aquí (la caché de
+    build solo mira los archivos diarios).
+    """
     # Obtener fechas de la semana
     week_start, week_end = get_week_dates(week_date)
     week_str = f"{week_start.strftime('%Y-%m-%d')} to {week_end.strftime('%Y-%m-%d')}"
     
+    # Nombre del archivo: YYYY-WXX.json
+    base_dir = os.getenv('EXPORT_OUTPUT_DIR', 'exports')
+    weekly_dir = os.path.join(base_dir, "weekly")
+    year = week_start.year
+    week_num = week_start.isocalendar()[1]
+    filename = os.path.join(weekly_dir, f"{year}-W{week_num:02d}.json")
+    
+    cache = BuildCache()
+    artifact = f"weekly:{year}-W{week_num:02d}"
+    inputs = daily_paths(week_start, week_end, base_dir)
+    if not force and cache.is_fresh(artifact, inputs, [filename]):
+        print(f"⏭️  Resumen semanal sin cambios: {week_str}")
+        return filename
+    
     print(f"📅 Generando resumen semanal: {week_str}")
     
     # Cargar archivos diarios
@@ -153,11 +137,14 @@ def generate_weekly_summary(week_date=None):
             'symbols': day_data.get('summary', {}).get('symbols', [])
         })
     
-    # Calcular estadísticas semanales
-    total_pnl = sum(t.get('pnl', 0) for t in all_trades)
-    total_commissions = sum(t.get('commission', 0) for t in all_trades)
-    winning_trades = [t for t in all_trades if t.get('pnl', 0) > 0]
-    losing_trades = [t for t in all_trades if t.get('pnl', 0) < 0]
+    # Totales de la semana desde los agregados incrementales
+    aggregates = aggregates or load_aggregates()
+    week = aggregates.weekly.get(period_keys(week_start.strftime('%Y-%m-%d'))[0]) or empty_bucket()
+    total_pnl = week['grossPnL']
+    total_commissions = week['commissions']
+    total_trades = week['trades']
+    winning_trades = week['winningTrades']
+    losing_trades = week['losingTrades']
     
     # Mejores y peores trades
     best_trade = max(all_trades, key=lambda x: x.get('pnl', 0)) if all_trades else None
@@ -167,8 +154,9 @@ def generate_weekly_summary(week_date=None):
     best_day = max(daily_summaries, key=lambda x: x['pnl']) if daily_summaries else None
     worst_day = min(daily_summaries, key=lambda x: x['pnl']) if daily_summaries else None
     
-    # Analizar patrones
-    patterns = analyze_trading_patterns(all_trades)
+    # Analizar patrones (desgloses desde el cubo de agregados)
+    patterns = analyze_trading_patterns(all_trades, cube or load_cube(),
+                                        week_start.strftime('%Y-%m-%d'), week_end.strftime('%Y-%m-%d'))
     
     # Estructura del resumen semanal
     weekly_summary = {
@@ -179,18 +167,18 @@ def generate_weekly_summary(week_date=None):
         'account': daily_data[0].get('account') if daily_data else 'UNKNOWN',
         'summary': {
             'totalTradingDays': len(daily_data),
-            'totalTrades': len(all_trades),
+            'totalTrades': total_trades,
             'grossPnL': round(total_pnl, 2),
             'totalCommissions': round(total_commissions, 2),
             'netPnL': round(total_pnl - total_commissions, 2),
             'avgDailyPnL': round((total_pnl - total_commissions) / len(daily_data), 2) if daily_data else 0,
-            'avgTradePerDay': round(len(all_trades) / len(daily_data), 2) if daily_data else 0,
-            'winningTrades': len(winning_trades),
-            'losingTrades': len(losing_trades),
-            'winRate': round(len(winning_trades) / len(all_trades), 4) if all_trades else 0,
-            'avgWin': round(sum(t['pnl'] for t in winning_trades) / len(winning_trades), 2) if winning_trades else 0,
-            'avgLoss': round(sum(t['pnl'] for t in losing_trades) / len(losing_trades), 2) if losing_trades else 0,
-            'profitFactor': round(abs(sum(t['pnl'] for t in winning_trades) / sum(t['pnl'] for t in losing_trades)), 2) if losing_trades and sum(t['pnl'] for t in losing_trades) != 0 else 0
+            'avgTradePerDay': round(total_trades / len(daily_data), 2) if daily_data else 0,
+            'winningTrades': winning_trades,
+            'losingTrades': losing_trades,
+            'winRate': round(winning_trades / total_trades, 4) if total_trades else 0,
+            'avgWin': round(week['winPnL'] / winning_trades, 2) if winning_trades else 0,
+            'avgLoss': round(week['lossPnL'] / losing_trades, 2) if losing_trades else 0,
+            'profitFactor': round(abs(week['winPnL'] / week['lossPnL']), 2) if losing_trades and week['lossPnL'] != 0 else 0
         },
         'extremes': {
             'bestTrade': {
@@ -221,17 +209,10 @@ def generate_weekly_summary(week_date=None):
     }
     
     # Guardar resumen semanal
-    base_dir = os.getenv('EXPORT_OUTPUT_DIR', 'exports')
-    weekly_dir = os.path.join(base_dir, "weekly")
     os.makedirs(weekly_dir, exist_ok=True)
     
-    # Nombre del archivo: YYYY-WXX.json
-    year = week_start.year
-    week_num = week_start.isocalendar()[1]
-    filename = os.path.join(weekly_dir, f"{year}-W{week_num:02d}.json")
-    
-    with open(filename, 'w', encoding='utf-8') as f:
-        json.dump(weekly_summary, f, indent=2, ensure_ascii=False)
+    write_json(filename, weekly_summary)
+    cache.record(artifact, inputs, [filename])
     
     print(f"✅ Resumen semanal generado: {filename}")
     print(f"📊 Resumen: {weekly_summary['summary']['totalTrades']} trades, "
@@ -240,20 +221,23 @@ def generate_weekly_summary(week_date=None):
     
     return filename
 
+def generate_default_weekly_summary(cube=None, aggregates=None):
+    """Genera la semana anterior si es lunes, o la actual si es otro día"""
+    today = datetime.now()
+    if today.weekday() == 0:  # Si es lunes
+        # Generar resumen de la semana anterior
+        last_week = today - timedelta(days=7)
+        return generate_weekly_summary(last_week, cube=cube, aggregates=aggregates)
+    # Generar resumen de la semana actual
+    return generate_weekly_summary(cube=cube, aggregates=aggregates)
+
 if __name__ == "__main__":
     import sys
     
     if len(sys.argv) > 1:
         # Si se pasa una fecha, generar para esa semana
         date_str = sys.argv[1]
-        generate_weekly_summary(date_str)
+        generate_weekly_summary(date_str, cube=load_cube(), aggregates=load_aggregates())
     else:
         # Por defecto, generar para la semana anterior si es lunes, o la actual si es otro día
-        today = datetime.now()
-        if today.weekday() == 0:  # Si es lunes
-            # Generar resumen de la semana anterior
-            last_week = today - timedelta(days=7)
-            generate_weekly_summary(last_week)
-        else:
-            # Generar resumen de la semana actual
-            generate_weekly_summary()
\ No newline at end of file
+        generate_default_weekly_summary(load_cube(), load_aggregates())
\ No newline at end of file
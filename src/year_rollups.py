@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+Agregados precalculados por año y su combinación en estadísticas históricas
+Cada año con trades se reduce una vez (desde el cubo de agregados, sin leer
+archivos diarios) a sus medidas sumables: totales de trades, días con
+ganancia/pérdida, mejor y peor día, primer/último día, totales por mes y
+por día (lo que dibuja el calendario). Un año solo se recalcula cuando
+cambia alguno de sus días (firma por el contenido de las celdas del cubo, así
+que un checkout nuevo no recalcula los años cerrados).
+
+Las vistas históricas (all-time) y año contra año combinan esos agregados,
+así que cuestan O(años) en lugar de recorrer todo el historial.
+
+Uso:
+    rollups = load_rollups()
+    rollups.years()            # [2024, 2025]
+    rollups.all_time_stats()   # mismo formato que calculate_year_stats
+    rollups.year_over_year()   # una fila por año con la variación contra el anterior
+"""
+
+import os
+import json
+import hashlib
+from datetime import datetime
+from state_store import state_path
+from trade_cube import MEASURES, finalize, load_cube
+from tracing import span
+
+ROLLUPS_STATE_FILE = "year_rollups.json"
+ROLLUPS_VERSION = 2
+
+
+def _day_measures(cells):
+    measures = [0] * len(MEASURES)
+    for cell in cells.values():
+        for i, value in enumerate(cell):
+            measures[i] += value
+    return measures
+
+
+def year_signature(cube, year):
+    """Firma de los días del año en el cubo (por el contenido de sus celdas)"""
+    digest = hashlib.sha1()
+    for date_str in cube.dates(f"{year}-01-01", f"{year}-12-31"):
+        cells = cube.days[date_str]['cells']
+        digest.update(json.dumps([date_str, cells], sort_keys=True, separators=(',', ':')).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def rollup_year(cube, year):
+    """Reduce los días del año en el cubo a un agregado combinable"""
+    measures = [0] * len(MEASURES)
+    rollup = {
+        'measures': measures,
+        'tradingDays': 0,
+        'profitDays': 0,
+        'lossDays': 0,
+        'best': None,
+        'worst': None,
+        'firstDate': None,
+        'lastDate': None,
+        'months': {},
+        'days': {}
+    }
+    for date_str in cube.dates(f"{year}-01-01", f"{year}-12-31"):
+        day = _day_measures(cube.days[date_str]['cells'])
+        if not day[0]:
+            continue
+        for i, value in enumerate(day):
+            measures[i] += value
+        pnl = round(day[5], 2)
+        rollup['tradingDays'] += 1
+        if pnl > 0:
+            rollup['profitDays'] += 1
+        elif pnl < 0:
+            rollup['lossDays'] += 1
+        if rollup['best'] is None or pnl > rollup['best'][1]:
+            rollup['best'] = [date_str, pnl]
+        if rollup['worst'] is None or pnl < rollup['worst'][1]:
+            rollup['worst'] = [date_str, pnl]
+        rollup['firstDate'] = rollup['firstDate'] or date_str
+        rollup['lastDate'] = date_str
+        rollup['days'][date_str] = [day[0], day[1], pnl]
+        month = rollup['months'].setdefault(date_str[5:7], [0, 0, 0])
+        month[0] += day[0]
+        month[1] += day[5]
+        month[2] += 1
+    return rollup
+
+
+def merge_rollups(rollups):
+    """Combina agregados de varios años en uno (sin 'months' ni 'days', que son por año)"""
+    merged = {
+        'measures': [0] * len(MEASURES),
+        'tradingDays': 0,
+        'profitDays': 0,
+        'lossDays': 0,
+        'best': None,
+        'worst': None,
+        'firstDate': None,
+        'lastDate': None
+    }
+    for rollup in rollups:
+        for i, value in enumerate(rollup['measures']):
+            merged['measures'][i] += value
+        for key in ('tradingDays', 'profitDays', 'lossDays'):
+            merged[key] += rollup[key]
+        if rollup['best'] and (merged['best'] is None or rollup['best'][1] > merged['best'][1]):
+            merged['best'] = rollup['best']
+        if rollup['worst'] and (merged['worst'] is None or rollup['worst'][1] < merged['worst'][1]):
+            merged['worst'] = rollup['worst']
+        if rollup['firstDate'] and (merged['firstDate'] is None or rollup['firstDate'] < merged['firstDate']):
+            merged['firstDate'] = rollup['firstDate']
+        if rollup['lastDate'] and (merged['lastDate'] is None or rollup['lastDate'] > merged['lastDate']):
+            merged['lastDate'] = rollup['lastDate']
+    return merged
+
+
+def rollup_stats(rollup):
+    """Agregado -> estadísticas con las claves de calculate_year_stats (y algunas de trades)"""
+    days = rollup['tradingDays']
+    pnl = rollup['measures'][5]
+    trades = finalize(rollup['measures'])
+    best = rollup['best'] or ['', 0]
+    worst = rollup['worst'] or ['', 0]
+    return {
+        'trading_days': days,
+        'total_trades': trades['trades'],
+        'total_pnl': round(pnl, 2),
+        'win_rate': round(rollup['profitDays'] / days * 100, 2) if days else 0,
+        'profit_days': rollup['profitDays'],
+        'profit_days_pct': round(rollup['profitDays'] / days * 100, 2) if days else 0,
+        'loss_days': rollup['lossDays'],
+        'loss_days_pct': round(rollup['lossDays'] / days * 100, 2) if days else 0,
+        'best_day': best[0],
+        'best_day_pnl': round(best[1], 2),
+        'worst_day': worst[0],
+        'worst_day_pnl': round(worst[1], 2),
+        'daily_avg': round(pnl / days, 2) if days else 0,
+        'trade_win_rate': round(trades['winRate'] * 100, 2),
+        'profit_factor': trades['profitFactor'],
+        'total_fees': trades['commission'],
+        'first_day': rollup['firstDate'] or '',
+        'last_day': rollup['lastDate'] or ''
+    }
+
+
+class YearRollups:
+    """Agregados por año persistidos en exports/.state/year_rollups.json"""
+
+    def __init__(self, years=None):
+        self.rollups = years if years is not None else {}
+        self.dirty = False
+
+    @classmethod
+    def load(cls):
+        path = state_path(ROLLUPS_STATE_FILE)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return cls()
+        if state.get('version') != ROLLUPS_VERSION:
+            return cls()
+        return cls(state.get('years', {}))
+
+    def refresh(self, cube):
+        """Recalcula los años cuyos días cambiaron en el cubo; devuelve los años recalculados"""
+        years = sorted({date_str[:4] for date_str in cube.days})
+        rebuilt = []
+        with span('rollups.refresh') as attrs:
+            for year in years:
+                signature = year_signature(cube, year)
+                entry = self.rollups.get(year)
+                if entry and entry.get('signature') == signature:
+                    continue
+                rollup = rollup_year(cube, year)
+                rollup['signature'] = signature
+                self.rollups[year] = rollup
+                rebuilt.append(int(year))
+            for year in [y for y in self.rollups if y not in years]:
+                del self.rollups[year]
+                rebuilt.append(int(year))
+            attrs['rebuilt'] = len(rebuilt)
+        if rebuilt:
+            self.dirty = True
+        return rebuilt
+
+    def years(self):
+        """Años con al menos un día operado, en orden"""
+        return sorted(int(year) for year, rollup in self.rollups.items() if rollup['tradingDays'])
+
+    def year(self, year):
+        return self.rollups.get(str(year))
+
+    def year_stats(self, year):
+        rollup = self.year(year)
+        return rollup_stats(rollup) if rollup else rollup_stats(merge_rollups([]))
+
+    def all_time(self):
+        return merge_rollups(self.rollups[str(year)] for year in self.years())
+
+    def all_time_stats(self):
+        return rollup_stats(self.all_time())
+
+    def year_over_year(self):
+        """Una fila por año con totales y variación del P&L contra el año anterior"""
+        rows = []
+        previous = None
+        for year in self.years():
+            stats = rollup_stats(self.rollups[str(year)])
+            rows.append({
+                'year': year,
+                'tradingDays': stats['trading_days'],
+                'trades': stats['total_trades'],
+                'pnl': stats['total_pnl'],
+                'winRate': stats['trade_win_rate'],
+                'profitDaysPct': stats['profit_days_pct'],
+                'dailyAvg': stats['daily_avg'],
+                'change': round(stats['total_pnl'] - previous, 2) if previous is not None else None
+            })
+            previous = stats['total_pnl']
+        return rows
+
+    def month_totals(self, year):
+        """{mes: {'trades', 'pnl', 'tradingDays'}} del año"""
+        rollup = self.year(year) or {'months': {}}
+        return {
+            int(month): {'trades': values[0], 'pnl': round(values[1], 2), 'tradingDays': values[2]}
+            for month, values in sorted(rollup['months'].items())
+        }
+
+    def day_totals(self, year):
+        """{fecha: {'trades', 'pnl', 'winRate'}} de los días operados del año"""
+        rollup = self.year(year) or {'days': {}}
+        return {
+            date_str: {'trades': trades, 'pnl': pnl, 'winRate': wins / trades if trades else 0}
+            for date_str, (trades, wins, pnl) in rollup['days'].items()
+        }
+
+    def signature(self):
+        """Firma de todos los años (para cachés de artefactos que dependen del historial)"""
+        return hashlib.sha1('|'.join(
+            f"{year}:{self.rollups[year]['signature']}" for year in sorted(self.rollups)
+        ).encode('utf-8')).hexdigest()
+
+    def save(self):
+        if not self.dirty:
+            return None
+        path = state_path(ROLLUPS_STATE_FILE)
+        tmp_path = f"{path}.tmp.{os.getpid()}"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': ROLLUPS_VERSION, 'years': self.rollups}, f, separators=(',', ':'), ensure_ascii=False)
+        os.replace(tmp_path, path)
+        self.dirty = False
+        return path
+
+
+def load_rollups(cube=None, sync=True):
+    """Carga los agregados por año y los alinea con el cubo (que se sincroniza si no se pasa)"""
+    rollups = YearRollups.load()
+    if sync:
+        rollups.refresh(cube or load_cube())
+        rollups.save()
+    return rollups
+
+
+def default_year(years, today=None):
+    """Año a mostrar por defecto: el actual si tiene datos, si no el último con datos"""
+    current = (today or datetime.now()).year
+    if not years or current in years:
+        return current
+    return max(years)
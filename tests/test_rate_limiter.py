@@ -0,0 +1,150 @@
+"""
+Tests de rate_limiter con un reloj falso
+El reloj reemplaza a `time` dentro del módulo: sleep() avanza el tiempo en
+lugar de esperar, así los tests son deterministas e instantáneos.
+"""
+
+import pytest
+
+import rate_limiter
+from rate_limiter import TokenBucket, AdaptiveConcurrency, RequestLimiter, backoff_delay
+
+
+class FakeClock:
+    def __init__(self, start=1000.0):
+        self.now = start
+        self.slept = 0.0
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+        self.slept += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(rate_limiter, 'time', fake)
+    return fake
+
+
+def test_bucket_allows_burst_then_refills_at_rate(clock):
+    bucket = TokenBucket(rate=2, capacity=2)
+    bucket.acquire()
+    bucket.acquire()
+    assert clock.slept == 0
+    # Sin tokens: el tercero espera 1/rate
+    bucket.acquire()
+    assert clock.slept == pytest.approx(0.5)
+
+
+def test_bucket_refill_is_capped_at_capacity(clock):
+    bucket = TokenBucket(rate=2, capacity=2)
+    bucket.acquire()
+    bucket.acquire()
+    clock.now += 60
+    for _ in range(2):
+        bucket.acquire()
+    assert clock.slept == 0
+    bucket.acquire()
+    assert clock.slept == pytest.approx(0.5)
+
+
+def test_bucket_pause_delays_next_token(clock):
+    bucket = TokenBucket(rate=10, capacity=10)
+    bucket.pause(3)
+    bucket.acquire()
+    assert clock.slept >= 3
+
+
+def test_concurrency_halves_on_429(clock):
+    concurrency = AdaptiveConcurrency(8, initial=8)
+    concurrency.record(0.1, 429)
+    assert concurrency.limit == 4
+
+
+def test_concurrency_halves_on_timeout_without_touching_baseline(clock):
+    concurrency = AdaptiveConcurrency(8, initial=8)
+    concurrency.record(0.1, 200)
+    baseline = concurrency.baseline_latency
+    clock.now += 10
+    concurrency.record(30.0, None, timed_out=True)
+    assert concurrency.limit == 4
+    assert concurrency.baseline_latency == baseline
+
+
+def test_concurrency_halves_on_slow_response(clock):
+    concurrency = AdaptiveConcurrency(8, initial=8)
+    concurrency.record(0.1, 200)
+    clock.now += 10
+    concurrency.record(1.0, 200)
+    assert concurrency.limit == 4
+
+
+def test_concurrency_cuts_once_per_latency_window(clock):
+    concurrency = AdaptiveConcurrency(8, initial=8)
+    concurrency.record(1.0, 200)
+    concurrency.limit = 8
+    clock.now += 10
+    concurrency.record(1.0, 429)
+    concurrency.record(1.0, 429)
+    assert concurrency.limit == 4
+    clock.now += 1.0
+    concurrency.record(1.0, 429)
+    assert concurrency.limit == 2
+
+
+def test_concurrency_never_drops_below_minimum(clock):
+    concurrency = AdaptiveConcurrency(4, min_limit=1, initial=1)
+    concurrency.record(0.1, 503)
+    assert concurrency.limit == 1
+
+
+def test_concurrency_recovers_additively(clock):
+    concurrency = AdaptiveConcurrency(8, initial=8)
+    concurrency.record(0.1, 429)
+    assert concurrency.limit == 4
+    # +1/limit por respuesta rápida: unas 4 respuestas para subir 1
+    for _ in range(4):
+        concurrency.record(0.1, 200)
+    assert 4.9 < concurrency.limit < 5
+    for _ in range(100):
+        concurrency.record(0.1, 200)
+    assert concurrency.limit == 8
+
+
+def test_slot_feeds_timeout_and_pauses_bucket(clock):
+    limiter = RequestLimiter(rate=100, max_in_flight=8)
+    limiter.concurrency.limit = 8
+    with limiter.slot() as outcome:
+        clock.sleep(5)
+        outcome['timeout'] = True
+        outcome['retry_after'] = 2.0
+    assert limiter.concurrency.limit == 4
+    assert limiter.concurrency.baseline_latency is None
+    slept = clock.slept
+    with limiter.slot() as outcome:
+        outcome['status'] = 200
+    assert clock.slept - slept >= 2.0
+
+
+def test_slot_records_latency_of_successful_requests(clock):
+    limiter = RequestLimiter(rate=100, max_in_flight=8)
+    with limiter.slot() as outcome:
+        clock.sleep(0.25)
+        outcome['status'] = 200
+    assert limiter.concurrency.baseline_latency == pytest.approx(0.25)
+
+
+@pytest.mark.parametrize('attempt', range(8))
+def test_backoff_delay_is_jittered_within_bounds(attempt):
+    delay = min(30.0, 2 ** attempt)
+    samples = [backoff_delay(attempt) for _ in range(50)]
+    assert all(delay / 2 <= sample <= delay for sample in samples)
+    assert len(set(samples)) > 1
+
+
+def test_backoff_delay_respects_cap():
+    assert all(backoff_delay(20, base=1.0, cap=5.0) <= 5.0 for _ in range(50))